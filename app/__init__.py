@@ -1,24 +1,55 @@
 import os
 
 from flask import Flask, flash, redirect, url_for
+from flask_migrate import Migrate
 from flask_socketio import SocketIO
 from flask_sqlalchemy import SQLAlchemy
-from googleapiclient.discovery import build, Resource
-from typing import Union
+
+from app.cache import FragmentCache, SearchCache
+from app.fetcher import BookFetcher
+from app.presence import Presence
+from app.readers import ReaderIndex
+from app.taste import TasteIndex
+from app.throttle import ChatThrottle
+from app.worker import BackgroundWorker
+from app.google_books import DISCOVERY_PATH
 
 # Created SQLAlchemy object
 db: SQLAlchemy = SQLAlchemy()
 
+# Define the schema migrations
+migrate: Migrate = Migrate()
+
 # Define Flask SocketIO and related variables
 socketio: SocketIO = SocketIO()
 
-# Define Google API client
-api_key: Union[str, None] = os.environ.get("GOOGLE_BOOKS_API_KEY", None)
+# Define the Google Books search result cache
+search_cache: SearchCache = SearchCache()
+
+# Define the rendered template fragment cache
+fragment_cache: FragmentCache = FragmentCache()
+
+# Define the concurrent Google Books fetcher
+fetcher: BookFetcher = BookFetcher()
+
+# Define the in-memory index of the readers of every book
+reader_index: ReaderIndex = ReaderIndex()
+
+# Define the approximate nearest neighbour index of user tastes
+taste_index: TasteIndex = TasteIndex()
+
+# Define the worker recomputing the match scores of changed saved books
+match_worker: BackgroundWorker = BackgroundWorker("match_worker")
+
+# Define the write-behind buffer of chat messages
+message_buffer: BackgroundWorker = BackgroundWorker("message_buffer",
+                                                    coalesce=False)
 
-if api_key is None:
-    raise ValueError("Missing API key")
+# Define the rate limits and outboxes of chat connections
+chat_throttle: ChatThrottle = ChatThrottle()
 
-service: Resource = build("books", "v1", developerKey=api_key)
+# Define the registry of the users connected right now
+presence_registry: Presence = Presence()
 
 
 def create_app(config: dict = None) -> Flask:
@@ -39,33 +70,118 @@ def create_app(config: dict = None) -> Flask:
     app.config.from_mapping(SECRET_KEY=os.environ.get("SECRET_KEY", "dev"),
                             SQLALCHEMY_DATABASE_URI=database_url,
                             SQLALCHEMY_TRACK_MODIFICATIONS=False,
-                            TESTING=os.environ.get("TESTING", False))
+                            TESTING=os.environ.get("TESTING", False),
+                            SEARCH_CACHE_SIZE=256,
+                            SEARCH_CACHE_TTL=86400,
+                            SEARCH_CACHE_PATH=os.path.join(
+                                app.instance_path, "search_cache.sqlite"),
+                            GOOGLE_BOOKS_API_KEY=os.environ.get(
+                                "GOOGLE_BOOKS_API_KEY", None),
+                            GOOGLE_BOOKS_DISCOVERY_PATH=DISCOVERY_PATH,
+                            GOOGLE_BOOKS_SERVICE=None,
+                            GOOGLE_BOOKS_PAGES=2,
+                            GOOGLE_BOOKS_PAGE_SIZE=20,
+                            GOOGLE_BOOKS_DEADLINE=3.0,
+                            GOOGLE_BOOKS_WORKERS=4,
+                            GOOGLE_BOOKS_POLL_INTERVAL=0.01,
+                            THUMBNAIL_CACHE_DIR=os.path.join(
+                                app.instance_path, "thumbs"),
+                            THUMBNAIL_SMALL_SIZE=(128, 192),
+                            THUMBNAIL_MAX_AGE=30 * 24 * 60 * 60,
+                            THUMBNAIL_TIMEOUT=5,
+                            THUMBNAIL_MAX_BYTES=1024 * 1024,
+                            BROWSE_PAGE_SIZE=20,
+                            LIBRARY_PAGE_SIZE=20,
+                            FRAGMENT_CACHE_SIZE=1024,
+                            FRAGMENT_CACHE_TTL=24 * 60 * 60,
+                            MATCH_RESULTS=10,
+                            MATCH_CANDIDATES=100,
+                            MATCH_READER_INDEX=False,
+                            MATCH_READER_INDEX_TTL=5 * 60,
+                            MATCH_WORKER_SYNCHRONOUS=False,
+                            MATCH_WORKER_BATCH_SIZE=100,
+                            MATCH_WORKER_LINGER=0,
+                            CHAT_BUFFER_SYNCHRONOUS=False,
+                            CHAT_BUFFER_BATCH_SIZE=500,
+                            CHAT_BUFFER_LINGER=0.5,
+                            CHAT_HISTORY_PAGE_SIZE=50,
+                            CHAT_RATE=5,
+                            CHAT_BURST=10,
+                            CHAT_MAX_MESSAGE_LENGTH=2000,
+                            CHAT_MAX_PAYLOAD=64 * 1024,
+                            CHAT_OUTBOX_SIZE=100,
+                            CHAT_OUTBOX_BACKLOG=50,
+                            CHAT_OUTBOX_INTERVAL=0.1,
+                            PRESENCE_TTL=60,
+                            PRESENCE_HEARTBEAT=20,
+                            SOCKETIO_MESSAGE_QUEUE=os.environ.get(
+                                "SOCKETIO_MESSAGE_QUEUE", None),
+                            SOCKETIO_CHANNEL="flask-socketio",
+                            TASTE_INDEX_PATH=os.path.join(
+                                app.instance_path, "taste_index.npz"),
+                            TASTE_DIMENSIONS=32,
+                            TASTE_INDEX_TABLES=8,
+                            TASTE_INDEX_BITS=12,
+                            SCHEMA_CHECK=True,
+                            SQLITE_PRAGMAS={
+                                # Wait for locks before switching to WAL
+                                "busy_timeout": 5000,
+                                "journal_mode": "WAL",
+                                "synchronous": "NORMAL",
+                                "cache_size": -16000,
+                                "mmap_size": 128 * 1024 * 1024,
+                                "temp_store": "MEMORY"
+                            },
+                            DATABASE_POOL_SIZE=10,
+                            DATABASE_POOL_OVERFLOW=20,
+                            DATABASE_POOL_RECYCLE=30 * 60,
+                            DATABASE_POOL_TIMEOUT=10)
 
     if config is not None:
         app.config.update(config)
 
     # Register blueprints
 
-    from app import auth, books, friends, match
+    from app import auth, books, database, friends, match, messages, pubsub, recommendations, schema, thumbs
 
     app.register_blueprint(auth.bp)
     app.register_blueprint(books.bp)
     app.register_blueprint(friends.bp)
     app.register_blueprint(match.bp)
+    app.register_blueprint(thumbs.bp)
 
     # Database and socketio configuration
 
+    database.configure_engine(app)
     db.init_app(app)
-    socketio.init_app(app)
-
-    try:
-        os.makedirs(app.instance_path)
-        # Drop and create the table if not exist
-        with app.app_context():
-            db.drop_all()
-            db.create_all()
-    except OSError:
-        pass
+    database.init_engine(app)
+    # Share the events of the workers through the message queue, if any
+    socketio.init_app(app,
+                      client_manager=pubsub.client_manager(
+                          app.config["SOCKETIO_MESSAGE_QUEUE"],
+                          app.config["SOCKETIO_CHANNEL"]),
+                      max_http_buffer_size=app.config["CHAT_MAX_PAYLOAD"])
+    chat_throttle.init_app(app)
+    presence_registry.init_app(app)
+    search_cache.init_app(app)
+    fragment_cache.init_app(app)
+    fetcher.init_app(app, socketio.sleep)
+    reader_index.init_app(app)
+    taste_index.init_app(app)
+    match_worker.init_app(app, recommendations.refresh_scores, "MATCH_WORKER")
+    message_buffer.init_app(app, messages.store_messages, "CHAT_BUFFER")
+
+    migrate.init_app(app,
+                     db,
+                     directory=schema.MIGRATIONS_PATH,
+                     render_as_batch=True)
+
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    # Report a database behind the migrations instead of rebuilding it, on
+    # the first request so creating the app needs no database connection
+    if app.config["SCHEMA_CHECK"]:
+        app.before_first_request(lambda: schema.check_schema(app))
 
     # Define middlewares
 
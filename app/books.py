@@ -1,13 +1,23 @@
+import click
+import hashlib
 import os
 import json
+import time
 
-from flask import Blueprint, flash, redirect, render_template, request, session, url_for
-from googleapiclient.discovery import build, Resource
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+from markupsafe import Markup
+from sqlalchemy.orm import joinedload
 from typing import Union
 
-from app import db, service
+from app import db, fetcher, fragment_cache, match_worker, reader_index, search_cache
 from .auth import login_required
-from .models import Book, User, SavedBook
+from .google_books import get_service
+from .ingest import backfill_taxonomy, import_volumes, ingest_volumes, insert_ignore, merge_duplicate_books
+from .models import Author, Book, BookStats, Category, User, SavedBook, book_author, book_category
+from .pagination import keyset_page
+from .ratings import rate, rebuild_stats, verify_stats
+from .search import rebuild_index, search_books
+from .sentiment import backfill_sentiment
 
 bp: Blueprint = Blueprint("books", __name__)
 
@@ -70,89 +80,93 @@ def browse():
             flash("Invalid request.")
             return redirect(url_for("books.browse"))
 
-        books += Book.query.filter(Book.bookname.contains(
-            bookname.lower())).limit(10).all()
+        books += search_books(bookname, limit=10)
 
         if len(books) < 10:
-            fetched_books: Union[list, None] = None
-
-            fetched_books = service.volumes().list(q=bookname).execute().get(
-                "items", None)
+            fetched_books: Union[list, None] = search_cache.get(bookname)
 
             if fetched_books is None:
+                try:
+                    fetched_books, complete = fetcher.fetch(
+                        get_service(), bookname)
+                except ValueError as error:
+                    flash(f"Google Books is unavailable: {error}.")
+                    fetched_books, complete = [], False
+
+                # Partial results are shown but not cached
+                if complete:
+                    search_cache.set(bookname, fetched_books)
+
+            if len(fetched_books) == 0:
                 flash("No books found.")
             else:
-                for i, book in enumerate(fetched_books):
-                    book_title: Union[str, None] = book[
-                        "volumeInfo"]["title"] if book["volumeInfo"].get(
-                            "title", None) is not None else None
-
-                    author: Union[str, None] = ", ".join(
-                        book["volumeInfo"]
-                        ["authors"]) if book["volumeInfo"].get(
-                            "authors", None) is not None else None
-
-                    isbn: Union[
-                        str, None] = book["volumeInfo"]["industryIdentifiers"][
-                            0]["identifier"] if book["volumeInfo"].get(
-                                "industryIdentifiers", None
-                            ) is not None and "ISBN" in book["volumeInfo"][
-                                "industryIdentifiers"][0]["type"] else None
-
-                    description: Union[str, None] = book["volumeInfo"].get(
-                        "description", None)
-
-                    categories: Union[str, None] = ",".join(
-                        book["volumeInfo"]
-                        ["categories"]) if book["volumeInfo"].get(
-                            "categories", None) is not None else None
-
-                    thumbnail: Union[str, None] = book["volumeInfo"][
-                        "imageLinks"]["thumbnail"] if book["volumeInfo"].get(
-                            "imageLinks",
-                            None) and book["volumeInfo"]["imageLinks"].get(
-                                "thumbnail") is not None else None
-
-                    if book_title is not None and db.session.query(
-                            Book.query.filter_by(
-                                bookname=book_title).exists()).scalar():
-                        fetched_books[i] = Book.query.filter_by(
-                            bookname=book_title).first_or_404()
-                        continue
-
-                    if isbn is not None and db.session.query(
-                            Book.query.filter_by(
-                                bookname=isbn).exists()).scalar():
-                        fetched_books[i] = Book.query.filter_by(
-                            isbn=isbn).first_or_404()
-                        continue
-
-                    if all(
-                            map(lambda x: x is not None,
-                                (book_title, author, isbn))):
-                        created_book: Book = Book(bookname=book_title,
-                                                  author=author,
-                                                  isbn=isbn,
-                                                  description=description,
-                                                  categories=categories,
-                                                  thumbnail=thumbnail)
-
-                        db.session.add(created_book)
-                        db.session.commit()
-
-                        fetched_books[i] = created_book
-
-                books += fetched_books
-                books = [
-                    book for book in books
-                    if book is not None and not isinstance(book, dict)
-                ]
-                books = list(set(books))
-                books = books[:10]
+                books += ingest_volumes(fetched_books)
+                books = list(dict.fromkeys(books))[:10]
 
     return render_template("books/browse.html", books=books)
 
 
+def paginate_books(association: db.Table, column: str, value: int):
+    """
+    Return a page of the books linked to an author or category.
+    The association table is scanned through its (column, book_id) index.
+
+    :param db.Table association: book_author or book_category
+    :param str column: The author_id or category_id column
+    :param int value: The author or category ID
+
+    :return: Pagination
+    """
+    query = Book.query.join(association,
+                            association.c.book_id == Book.id).filter(
+                                association.c[column] == value)
+
+    return query.order_by(association.c.book_id).paginate(
+        page=request.args.get("page", 1, type=int),
+        per_page=current_app.config["BROWSE_PAGE_SIZE"],
+        error_out=False)
+
+
+@bp.route("/browse/category/<path:name>", methods=["GET"])
+@login_required
+def browse_category(name: str):
+    """
+    Browse the books of a category, one page at a time.
+
+    :param str name: The category name
+
+    :return: Render template
+    """
+    category: Category = Category.query.filter_by(name=name).first_or_404()
+
+    return render_template("books/listing.html",
+                           heading=category.name,
+                           page=paginate_books(book_category, "category_id",
+                                               category.id),
+                           endpoint="books.browse_category",
+                           arguments={"name": category.name})
+
+
+@bp.route("/browse/author/<int:id>", methods=["GET"])
+@login_required
+def browse_author(id: int):
+    """
+    Browse the books of an author, one page at a time.
+
+    :param int id: The author ID
+
+    :return: Render template
+    """
+    author: Author = Author.query.filter_by(id=id).first_or_404()
+
+    return render_template("books/listing.html",
+                           heading=author.name,
+                           page=paginate_books(book_author, "author_id",
+                                               author.id),
+                           endpoint="books.browse_author",
+                           arguments={"id": author.id})
+
+
 @bp.route("/save", methods=["POST"])
 @login_required
 def save_book():
@@ -171,52 +185,125 @@ def save_book():
 
     book: Book = Book.query.filter_by(id=book_id).first_or_404()
 
-    save_book: SavedBook = SavedBook(book_id=book_id,
-                                     user_id=session.get("user_id"))
-
-    db.session.add(save_book)
+    # Saving a book twice keeps the existing saved book
+    insert_ignore(SavedBook.__table__, [{
+        "book_id": book.id,
+        "user_id": session.get("user_id"),
+        "to_be_read": False
+    }])
     db.session.commit()
 
+    reader_index.add(book.id, session.get("user_id"))
+    match_worker.submit(session.get("user_id"), book.id)
+
     return redirect(url_for("books.book", id=book_id))
 
 
+def render_book_details(book: Book) -> Markup:
+    """
+    Render the shared details of a book, reusing the cached fragment of its
+    current version.
+    The version of a book moves on every update of its row, including the
+    rating changes copied from its stats.
+
+    :param Book book: The book
+
+    :return: Markup of the rendered details
+    """
+    key: str = f"book:{book.id}:{book.version}"
+    details: Union[str, None] = fragment_cache.get(key)
+
+    if details is None:
+        stats: Union[BookStats, None] = BookStats.query.get(book.id)
+
+        details = render_template(
+            "books/_book_details.html",
+            book_id=book.id,
+            bookname=book.bookname,
+            authors=book.authors,
+            isbn=book.isbn,
+            description=book.description,
+            categories=book.genres or None,
+            thumbnail=book.thumbnail,
+            average_rating=book.average_rating,
+            histogram=stats.histogram
+            if stats and stats.rating_count else None,
+            total_ratings=stats.rating_count if stats else 0)
+
+        fragment_cache.set(key, details)
+
+    return Markup(details)
+
+
 @bp.route("/book/<int:id>", methods=["GET"])
 @login_required
 def book(id: int):
     """
     See the details of a book.
+    Answers revalidations with 304 before rendering, and renders only the
+    user's review around the cached details of the book.
 
     :param int id: The book ID
 
-    :return: Render template
+    :return: Render template or an empty 304 response
     """
     book: Book = Book.query.filter_by(id=id).first_or_404()
     saved_book: SavedBook = SavedBook.query.filter_by(
         book_id=id, user_id=session.get("user_id")).first_or_404()
 
+    validator: str = f"{book.id}:{book.version}:{saved_book.id}:{saved_book.rating}:{saved_book.review}"
+
+    response: Response = Response()
+    response.set_etag(hashlib.sha1(validator.encode("utf-8")).hexdigest())
+    response.last_modified = max(
+        (updated for updated in (book.updated, saved_book.updated)
+         if updated is not None),
+        default=None)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    # Pending flashed messages are only shown by a full render
+    if "_flashes" not in session:
+        response.make_conditional(request)
+
+        if response.status_code == 304:
+            return response
+
     bookname: str = book.bookname
-    author: list = book.author.split(", ")
-    isbn: str = book.isbn
-    description: Union[list, None] = book.description
-    categories: Union[list, None] = book.categories.split(
-        ",") if book.categories != None else None
-    thumbnail: Union[str, None] = book.thumbnail
-    average_rating: Union[float, None] = book.average_rating
 
     my_rating: Union[int, None] = saved_book.rating
     my_review: Union[str, None] = saved_book.review
 
-    return render_template("books/book.html",
-                           book_id=id,
-                           bookname=bookname,
-                           author=author,
-                           isbn=isbn,
-                           description=description,
-                           categories=categories,
-                           thumbnail=thumbnail,
-                           average_rating=average_rating,
-                           my_rating=my_rating,
-                           my_review=my_review)
+    response.set_data(
+        render_template("books/book.html",
+                        book_id=id,
+                        bookname=bookname,
+                        details=render_book_details(book),
+                        my_rating=my_rating,
+                        my_review=my_review))
+
+    return response
+
+
+def library_page(user_id: int, to_be_read: Union[bool, None] = None) -> tuple:
+    """
+    Return the page of a user's saved books after the cursor of the request.
+    Pages are read through the (user_id, id) index.
+
+    :param int user_id: The user ID
+    :param Union[bool, None] to_be_read: Only the reading list if True
+
+    :return: tuple of the SavedBook instances and the next cursor or None
+    """
+    query = SavedBook.query.options(joinedload(
+        SavedBook.book)).filter_by(user_id=user_id)
+
+    if to_be_read is not None:
+        query = query.filter_by(to_be_read=to_be_read)
+
+    return keyset_page(query, SavedBook.id,
+                       request.args.get("after", None, type=int),
+                       current_app.config["LIBRARY_PAGE_SIZE"])
 
 
 @bp.route("/mybooks", methods=["GET"])
@@ -231,20 +318,46 @@ def my_books():
     """
     user: User = User.query.filter_by(id=session.get("user_id")).first_or_404()
 
-    saved_books: Union[list, None] = SavedBook.query.filter_by(
-        user_id=user.id).all()
+    saved_books, next_after = library_page(user.id)
 
-    books: Union[list, None] = []
-
-    if len(saved_books) == 0 or saved_books is None:
+    if len(saved_books) == 0 and "after" not in request.args:
         flash("No saved books found.")
-    else:
-        for saved_book in saved_books:
-            books.append(Book.query.filter_by(id=saved_book.book_id).first())
 
     return render_template("books/mybooks.html",
-                           books=books,
-                           saved_books=saved_books)
+                           saved_books=saved_books,
+                           next_after=next_after)
+
+
+@bp.route("/mybooks.json", methods=["GET"])
+@login_required
+def my_books_json():
+    """
+    Return a page of the books of a given user for infinite scrolling.
+
+    :param: None
+
+    :return: JSON of the books and the cursor of the next page
+    """
+    saved_books, next_after = library_page(session.get("user_id"))
+
+    books: list = []
+
+    for saved_book in saved_books:
+        toggle: str = "remove_from_reading_list" if saved_book.to_be_read else "add_to_reading_list"
+
+        books.append(
+            dict(id=saved_book.book_id,
+                 bookname=saved_book.book.bookname,
+                 to_be_read=saved_book.to_be_read,
+                 url=url_for("books.book", id=saved_book.book_id),
+                 reading_list_url=url_for(f"books.{toggle}",
+                                          id=saved_book.book_id)))
+
+    next_url: Union[str, None] = url_for(
+        "books.my_books_json",
+        after=next_after) if next_after is not None else None
+
+    return jsonify(books=books, next=next_url)
 
 
 @bp.route("/book/<int:id>/review", methods=["GET", "POST"])
@@ -276,15 +389,12 @@ def review(id: int):
         else:
             rating = float(rating)
 
-            saved_book.rating = rating
-            saved_book.review = review
-
-            book.average_rating = ((book.average_rating * book.total_ratings) +
-                                   rating) / (book.total_ratings + 1)
-            book.total_ratings += 1
+            rate(saved_book, rating, review)
 
             db.session.commit()
 
+            match_worker.submit(session.get("user_id"), id)
+
             return redirect(url_for("books.book", id=id))
 
     return render_template("books/review.html",
@@ -315,6 +425,8 @@ def add_to_reading_list(id: int):
 
         db.session.commit()
 
+        match_worker.submit(session.get("user_id"), id)
+
     return redirect(url_for("books.my_books"))
 
 
@@ -335,4 +447,163 @@ def remove_from_reading_list(id: int):
 
     db.session.commit()
 
+    match_worker.submit(session.get("user_id"), id)
+
     return redirect(url_for("books.my_books"))
+
+
+@bp.cli.command("reindex")
+def reindex_command() -> None:
+    """
+    Rebuild the full-text search index over the book table.
+
+    :param: None
+
+    :return: None
+    """
+    rebuild_index()
+
+    click.echo("Rebuilt the search index.")
+
+
+@bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size",
+              default=500,
+              show_default=True,
+              help="Number of lines committed per transaction.")
+@click.option("--restart",
+              is_flag=True,
+              help="Start from the beginning instead of the saved offset.")
+def import_command(path: str, chunk_size: int, restart: bool) -> None:
+    """
+    Import a JSONL dump of Google Books volumes into the catalogue.
+
+    :param str path: The path of the dump
+    :param int chunk_size: The number of lines per transaction
+    :param bool restart: Whether to ignore the saved offset
+
+    :return: None
+    """
+    size: int = os.path.getsize(path)
+    started: float = time.monotonic()
+    read: int = 0
+    inserted: int = 0
+
+    for progress in import_volumes(path, chunk_size, restart):
+        read += progress["read"]
+        inserted += progress["inserted"]
+        elapsed: float = max(time.monotonic() - started, 1e-9)
+
+        click.echo(f"{progress['offset'] / max(size, 1):6.1%} "
+                   f"{progress['lines']} lines, {inserted} new books, "
+                   f"{read / elapsed:.0f} lines/s")
+
+    click.echo(f"Imported {read} lines and {inserted} new books "
+               f"in {time.monotonic() - started:.1f}s.")
+
+
+@bp.cli.command("backfill-taxonomy")
+@click.option("--batch-size",
+              default=500,
+              show_default=True,
+              help="Number of books committed per transaction.")
+def backfill_taxonomy_command(batch_size: int) -> None:
+    """
+    Link every stored book to its author and category rows.
+
+    :param int batch_size: The number of books per transaction
+
+    :return: None
+    """
+    linked: int = 0
+
+    for linked in backfill_taxonomy(batch_size):
+        click.echo(f"Linked {linked} books.")
+
+    click.echo(f"Backfilled the authors and categories of {linked} books.")
+
+
+@bp.cli.command("merge-duplicates")
+@click.option("--batch-size",
+              default=500,
+              show_default=True,
+              help="Number of books committed per transaction.")
+def merge_duplicates_command(batch_size: int) -> None:
+    """
+    Fill in the canonical ISBN-13 of every stored book and merge the editions
+    stored twice.
+
+    :param int batch_size: The number of books per transaction
+
+    :return: None
+    """
+    progress: dict = {"scanned": 0, "merged": 0, "invalid": 0}
+
+    for progress in merge_duplicate_books(batch_size):
+        click.echo(f"Scanned {progress['scanned']} books.")
+
+    if progress["merged"] > 0:
+        rebuild_stats()
+        db.session.commit()
+
+    click.echo(f"Merged {progress['merged']} duplicate books, "
+               f"{progress['invalid']} books have no valid ISBN.")
+
+
+@bp.cli.command("rebuild-stats")
+@click.option("--verify",
+              is_flag=True,
+              help="Only report the books whose stats are out of date.")
+def rebuild_stats_command(verify: bool) -> None:
+    """
+    Recompute the rating stats of every book from the saved books.
+
+    :param bool verify: Whether to only compare the stats
+
+    :return: None
+    """
+    if verify:
+        stale: list = verify_stats()
+
+        for book_id in stale:
+            click.echo(f"Book {book_id} has out of date stats.")
+
+        click.echo(f"Found {len(stale)} books with out of date stats.")
+
+        if len(stale) != 0:
+            raise SystemExit(1)
+
+        return
+
+    rated: int = rebuild_stats()
+    db.session.commit()
+
+    click.echo(f"Rebuilt the rating stats of {rated} books.")
+
+
+@bp.cli.command("score-reviews")
+@click.option("--batch-size",
+              default=500,
+              show_default=True,
+              help="Number of reviews committed per transaction.")
+@click.option("--workers",
+              default=None,
+              type=int,
+              help="Number of processes, one per CPU by default.")
+def score_reviews_command(batch_size: int, workers: Union[int, None]) -> None:
+    """
+    Store the rating component and sentiment of the reviews saved before
+    they were scored at review time.
+
+    :param int batch_size: The number of reviews per transaction
+    :param Union[int, None] workers: The number of processes
+
+    :return: None
+    """
+    scored: int = 0
+
+    for scored in backfill_sentiment(batch_size, workers):
+        click.echo(f"Scored {scored} reviews.")
+
+    click.echo(f"Scored {scored} reviews in total.")
@@ -0,0 +1,345 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import Flask
+from typing import Any, Iterator, Union
+
+
+class LRUCache:
+    """
+    Define an in-memory least recently used cache with expiring entries.
+
+    :attribute int max_size: The maximum number of entries held in memory
+    :attribute float ttl: The number of seconds an entry stays valid
+    :attribute int hits: The number of lookups answered by the cache
+    :attribute int misses: The number of lookups not answered by the cache
+    :attribute int evictions: The number of entries pushed out by the size bound
+
+    :method get: Return a cached value or None
+    :method set: Store a value
+    :method clear: Drop every entry
+    :method stats: Return the cache counters
+    """
+    def __init__(self, max_size: int = 256, ttl: float = 3600) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: str) -> Union[Any, None]:
+        """
+        Return an unexpired in-memory value and mark it as recently used.
+
+        :param str key: The cache key
+
+        :return: The cached value or None
+        """
+        entry: Union[tuple, None] = self._entries.get(key, None)
+
+        if entry is None:
+            return None
+
+        stored, value = entry
+
+        if time.time() - stored > self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+
+        return value
+
+    def _insert(self, key: str, value: Any, stored: float) -> None:
+        """
+        Insert a value in memory and evict the least recently used entries.
+
+        :param str key: The cache key
+        :param Any value: The value to cache
+        :param float stored: The time the value was produced
+
+        :return: None
+        """
+        self._entries[key] = (stored, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Union[Any, None]:
+        """
+        Return a cached value.
+
+        :param str key: The cache key
+
+        :return: The cached value or None
+        """
+        with self._lock:
+            value: Union[Any, None] = self._lookup(key)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value.
+
+        :param str key: The cache key
+        :param Any value: The value to cache
+
+        :return: None
+        """
+        with self._lock:
+            self._insert(key, value, time.time())
+
+    def clear(self) -> None:
+        """
+        Drop every entry and reset the counters.
+
+        :param: None
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        :param: None
+
+        :return: dict of the hit, miss and eviction counters and the size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries)
+        }
+
+
+class SearchCache(LRUCache):
+    """
+    Define the cache for Google Books search results.
+    Entries are kept in memory and written through to a SQLite file so they
+    survive restarts. The lock only guards the memory, so a slow disk never
+    holds up the lookups of other requests. The SQLite file is created on
+    first use, so configuring an app touches no disk.
+
+    :attribute Union[str, None] path: The path of the SQLite file
+
+    :method init_app: Configure the cache from a Flask app
+    :method normalize: Normalize a search query into a cache key
+    """
+    def __init__(self,
+                 path: Union[str, None] = None,
+                 max_size: int = 256,
+                 ttl: float = 86400) -> None:
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.path: Union[str, None] = path
+        self._created: bool = False
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the cache with the SEARCH_CACHE_* settings of an app.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.max_size = app.config["SEARCH_CACHE_SIZE"]
+            self.ttl = app.config["SEARCH_CACHE_TTL"]
+            self.path = app.config["SEARCH_CACHE_PATH"]
+            self._created = False
+            self._entries.clear()
+
+        app.extensions["search_cache"] = self
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalize a search query into a cache key.
+
+        :param str query: The search query
+
+        :return: str of the lowercased query with collapsed whitespace
+        """
+        return re.sub(r"\s+", " ", query).strip().lower()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection to the disk store.
+        The transaction is committed and the connection closed on exit.
+
+        :param: None
+
+        :return: A SQLite connection
+        """
+        connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5)
+
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _store(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection to the disk store, creating its table on first use.
+
+        :param: None
+
+        :return: A SQLite connection
+        """
+        if not self._created:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                        exist_ok=True)
+
+        with self._connect() as connection:
+            if not self._created:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache ("
+                    "query TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                    "stored REAL NOT NULL)")
+                self._created = True
+
+            yield connection
+
+    def get(self, key: str) -> Union[Any, None]:
+        """
+        Return cached search results from memory or from the disk store.
+
+        :param str key: The search query
+
+        :return: The cached results or None
+        """
+        key = self.normalize(key)
+
+        with self._lock:
+            value: Union[Any, None] = self._lookup(key)
+
+            if value is not None:
+                self.hits += 1
+                return value
+
+        row: Union[tuple, None] = None
+
+        if self.path is not None:
+            with self._store() as connection:
+                row = connection.execute(
+                    "SELECT payload, stored FROM search_cache "
+                    "WHERE query = ? AND stored > ?",
+                    (key, time.time() - self.ttl)).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+
+            value = json.loads(row[0])
+            self._insert(key, value, row[1])
+            self.hits += 1
+
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store search results in memory and in the disk store.
+        Expired rows are pruned from the disk store on write.
+
+        :param str key: The search query
+        :param Any value: JSON serializable search results
+
+        :return: None
+        """
+        key = self.normalize(key)
+        stored: float = time.time()
+
+        with self._lock:
+            self._insert(key, value, stored)
+
+        if self.path is not None:
+            with self._store() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO search_cache "
+                    "(query, payload, stored) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), stored))
+                connection.execute(
+                    "DELETE FROM search_cache WHERE stored <= ?",
+                    (stored - self.ttl, ))
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters and the number of rows in the disk store.
+
+        :param: None
+
+        :return: dict of the cache counters
+        """
+        stats: dict = super().stats()
+
+        if self.path is not None:
+            with self._store() as connection:
+                stats["stored"] = connection.execute(
+                    "SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+        return stats
+
+    def clear(self) -> None:
+        """
+        Drop every entry from memory and from the disk store.
+
+        :param: None
+
+        :return: None
+        """
+        super().clear()
+
+        if self.path is not None:
+            with self._store() as connection:
+                connection.execute("DELETE FROM search_cache")
+
+
+class FragmentCache(LRUCache):
+    """
+    Define the cache for rendered template fragments.
+    Keys carry the version of the rendered rows, so changed rows miss the
+    cache and the stale entries age out.
+
+    :method init_app: Configure the cache from a Flask app
+    """
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the cache with the FRAGMENT_CACHE_* settings of an app.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.max_size = app.config["FRAGMENT_CACHE_SIZE"]
+            self.ttl = app.config["FRAGMENT_CACHE_TTL"]
+            self._entries.clear()
+
+        app.extensions["fragment_cache"] = self
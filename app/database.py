@@ -0,0 +1,64 @@
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+
+from app import db
+
+
+def backend(app: Flask) -> str:
+    """
+    Return the database backend of an app.
+
+    :param Flask app: A Flask app instance
+
+    :return: str of the backend name such as sqlite or postgresql
+    """
+    return make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+
+
+def configure_engine(app: Flask) -> None:
+    """
+    Apply the pool settings of the DATABASE_POOL_* config to Postgres.
+    Must run before the engine is first created. Explicit
+    SQLALCHEMY_ENGINE_OPTIONS take precedence.
+
+    :param Flask app: A Flask app instance
+
+    :return: None
+    """
+    if backend(app) not in ("postgres", "postgresql"):
+        return
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": app.config["DATABASE_POOL_SIZE"],
+        "max_overflow": app.config["DATABASE_POOL_OVERFLOW"],
+        "pool_recycle": app.config["DATABASE_POOL_RECYCLE"],
+        "pool_timeout": app.config["DATABASE_POOL_TIMEOUT"],
+        "pool_pre_ping": True,
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    }
+
+
+def init_engine(app: Flask) -> None:
+    """
+    Apply the SQLITE_PRAGMAS config to every new SQLite connection.
+
+    :param Flask app: A Flask app instance
+
+    :return: None
+    """
+    pragmas: dict = app.config["SQLITE_PRAGMAS"]
+
+    if backend(app) != "sqlite" or len(pragmas) == 0:
+        return
+
+    def set_pragmas(connection, record) -> None:
+        cursor = connection.cursor()
+
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", set_pragmas)
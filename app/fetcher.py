@@ -0,0 +1,153 @@
+import httplib2
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import Flask
+from typing import Any, Callable, Union
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class BookFetcher:
+    """
+    Define a concurrent, paginated Google Books volume fetcher.
+    Pages are requested in parallel through a bounded thread pool and
+    whatever has arrived when the deadline passes is returned. The pool is
+    polled between calls to a sleep function, so under eventlet the wait
+    yields to the hub instead of blocking every other greenlet.
+
+    :attribute int pages: The number of pages requested per search
+    :attribute int page_size: The number of volumes per page, at most 40
+    :attribute float deadline: The number of seconds to wait for the pages
+    :attribute int workers: The size of the thread pool
+    :attribute float poll_interval: The seconds between polls of the pool
+    :attribute Callable sleep: The function to wait between polls with
+
+    :method init_app: Configure the fetcher from a Flask app
+    :method fetch: Fetch the volumes matching a query
+    """
+    def __init__(self,
+                 pages: int = 2,
+                 page_size: int = 20,
+                 deadline: float = 3.0,
+                 workers: int = 4,
+                 poll_interval: float = 0.01) -> None:
+        self.pages: int = pages
+        self.page_size: int = page_size
+        self.deadline: float = deadline
+        self.workers: int = workers
+        self.poll_interval: float = poll_interval
+        self.sleep: Callable[[float], None] = time.sleep
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="google-books")
+
+    def init_app(self,
+                 app: Flask,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        """
+        Configure the fetcher with the GOOGLE_BOOKS_* settings of an app.
+
+        :param Flask app: A Flask app instance
+        :param Callable sleep: The sleep function of the async mode in use
+
+        :return: None
+        """
+        self.pages = app.config["GOOGLE_BOOKS_PAGES"]
+        self.page_size = min(app.config["GOOGLE_BOOKS_PAGE_SIZE"], 40)
+        self.deadline = app.config["GOOGLE_BOOKS_DEADLINE"]
+        self.poll_interval = app.config["GOOGLE_BOOKS_POLL_INTERVAL"]
+        self.sleep = sleep
+
+        if self.workers != app.config["GOOGLE_BOOKS_WORKERS"]:
+            self.workers = app.config["GOOGLE_BOOKS_WORKERS"]
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="google-books")
+
+        app.extensions["book_fetcher"] = self
+
+    def _fetch_page(self, service: Any, query: str, start_index: int) -> list:
+        """
+        Fetch a single page of volumes.
+        Each call uses its own HTTP connection as httplib2 is not thread-safe.
+
+        :param Any service: The Google Books client
+        :param str query: The search query
+        :param int start_index: The index of the first volume of the page
+
+        :return: list of volumes
+        """
+        response: dict = service.volumes().list(
+            q=query, startIndex=start_index,
+            maxResults=self.page_size).execute(
+                http=httplib2.Http(timeout=self.deadline))
+
+        return response.get("items", [])
+
+    def fetch(self, service: Any, query: str) -> tuple:
+        """
+        Fetch the volumes matching a query.
+        Volumes are deduplicated by their Google Books ID and kept in page order.
+
+        :param Any service: The Google Books client
+        :param str query: The search query
+
+        :return: tuple of the volumes and whether every page arrived in time
+        """
+        started: float = time.monotonic()
+
+        futures: dict = {
+            self._executor.submit(self._fetch_page, service, query,
+                                  page * self.page_size): page
+            for page in range(self.pages)
+        }
+
+        pages: dict = {}
+        complete: bool = True
+        pending: set = set(futures)
+
+        while len(pending) > 0:
+            done, pending = wait(pending, timeout=0)
+
+            for future in done:
+                try:
+                    pages[futures[future]] = future.result()
+                except Exception as error:
+                    logger.warning("Google Books page %s failed: %s",
+                                   futures[future], error)
+                    complete = False
+
+            if len(pending) == 0:
+                break
+
+            remaining: float = started + self.deadline - time.monotonic()
+
+            if remaining <= 0:
+                logger.warning("Google Books deadline passed after %.2fs",
+                               time.monotonic() - started)
+                complete = False
+
+                for future in pending:
+                    future.cancel()
+
+                break
+
+            self.sleep(min(self.poll_interval, remaining))
+
+        volumes: list = []
+        seen: set = set()
+
+        for page in sorted(pages):
+            for volume in pages[page]:
+                volume_id: Union[str, None] = volume.get("id", None)
+
+                if volume_id is not None:
+                    if volume_id in seen:
+                        continue
+
+                    seen.add(volume_id)
+
+                volumes.append(volume)
+
+        return volumes, complete
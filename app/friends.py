@@ -1,13 +1,15 @@
 import functools
 
-from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, session, url_for
 from flask_socketio import disconnect
 from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
 from typing import Union
 
-from app import db
+from app import db, presence_registry, socketio
 from .auth import login_required
-from .models import Book, MessageSession, SavedBook, User
+from .books import library_page
+from .models import MessageSession, User
 
 bp: Blueprint = Blueprint("friends", __name__, url_prefix="/friends")
 
@@ -28,43 +30,63 @@ def profile(id: int):
     display_name: str = user.display_name
     bio: Union[str, None] = user.bio
 
-    saved_books: Union[list, None] = SavedBook.query.filter_by(
-        user_id=user.id).all()
-
-    books: Union[list, None] = []
-
-    if len(saved_books) != 0 or saved_books is not None:
-        for saved_book in saved_books:
-            books.append(Book.query.filter_by(id=saved_book.book_id).first())
+    saved_books, next_after = library_page(user.id, to_be_read=True)
 
     is_logged_in_user: bool = user.id == session.get("user_id")
 
-    other_user_ids: Union[list, None] = MessageSession.query.filter(
-        or_(MessageSession.user_a_id == user.id,
-            MessageSession.user_b_id == user.id)).order_by(
-                MessageSession.count.desc()).all()[:10]
+    message_sessions: list = MessageSession.query.options(
+        joinedload(MessageSession.user_a),
+        joinedload(MessageSession.user_b)).filter(
+            or_(MessageSession.user_a_id == user.id,
+                MessageSession.user_b_id == user.id)).order_by(
+                    MessageSession.count.desc()).limit(10).all()
 
-    for i, other_user_id in enumerate(other_user_ids):
-        if other_user_id.user_a_id == user.id:
-            other_user_ids[i] = other_user_id.user_b_id
-        else:
-            other_user_ids[i] = other_user_id.user_a_id
+    other_users: list = [
+        message_session.partner(user.id)
+        for message_session in message_sessions
+    ]
 
-    other_users: list = []
-
-    for other_user_id in other_user_ids:
-        other_users.append(User.query.filter_by(id=other_user_id).first())
+    online: set = presence_registry.online(
+        [user.id, *(other_user.id for other_user in other_users)])
 
     return render_template("friends/profile.html",
                            username=username,
                            display_name=display_name,
                            bio=bio,
                            other_users=other_users,
+                           online=online,
+                           user_id=user.id,
                            saved_books=saved_books,
-                           books=books,
+                           next_after=next_after,
                            is_logged_in_user=is_logged_in_user)
 
 
+@bp.route("/profile/<int:id>/reading", methods=["GET"])
+@login_required
+def reading_list(id: int):
+    """
+    Return a page of a user's reading list for infinite scrolling.
+
+    :param int id: The user ID
+
+    :return: JSON of the books and the cursor of the next page
+    """
+    saved_books, next_after = library_page(id, to_be_read=True)
+
+    books: list = [
+        dict(id=saved_book.book_id,
+             bookname=saved_book.book.bookname,
+             url=url_for("books.book", id=saved_book.book_id))
+        for saved_book in saved_books
+    ]
+
+    next_url: Union[str, None] = url_for(
+        "friends.reading_list", id=id,
+        after=next_after) if next_after is not None else None
+
+    return jsonify(books=books, next=next_url)
+
+
 @bp.route("/", methods=["GET", "POST"])
 @login_required
 def edit():
@@ -94,3 +116,45 @@ def edit():
                 url_for('friends.profile', id=session.get("user_id")))
 
     return render_template("friends/edit.html", bio=bio)
+
+
+@socketio.on("connect", namespace="/presence")
+def handle_presence_connect():
+    """
+    Register the connection of a signed in user.
+    Connections without a signed in user are refused.
+
+    :param: None
+
+    :return: False to refuse the connection or None
+    """
+    user_id: Union[int, None] = session.get("user_id")
+
+    if user_id is None:
+        return False
+
+    presence_registry.connect(request.sid, user_id)
+
+
+@socketio.on("heartbeat", namespace="/presence")
+def handle_heartbeat():
+    """
+    Keep the user of a connection online.
+
+    :param: None
+
+    :return: None
+    """
+    presence_registry.heartbeat(request.sid)
+
+
+@socketio.on("disconnect", namespace="/presence")
+def handle_presence_disconnect():
+    """
+    Forget a closed connection.
+
+    :param: None
+
+    :return: None
+    """
+    presence_registry.disconnect(request.sid)
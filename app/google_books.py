@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+
+from flask import current_app
+from googleapiclient.discovery import build_from_document
+from typing import Any, Union
+
+# Define the vendored discovery document of the Books API
+DISCOVERY_PATH: str = os.path.join(os.path.dirname(__file__), "discovery",
+                                   "books_v1.json")
+
+_lock: threading.Lock = threading.Lock()
+
+
+class OfflineService:
+    """
+    Define a local stand-in for the Google Books client.
+    Serves volumes from memory or from a JSONL file of volumes, matching the
+    query against the titles and authors.
+
+    :attribute list volumes: The volumes to serve
+
+    :method volumes: Return the volumes resource
+    :method list: Prepare a search request
+    :method execute: Execute the prepared search request
+    """
+    def __init__(self,
+                 volumes: Union[list, None] = None,
+                 path: Union[str, None] = None) -> None:
+        self._volumes: list = list(volumes or [])
+        self._query: dict = {}
+
+        if path is not None:
+            with open(path, encoding="utf-8") as dump:
+                self._volumes += [
+                    json.loads(line) for line in dump if line.strip()
+                ]
+
+    def volumes(self) -> "OfflineService":
+        """
+        Return the volumes resource.
+
+        :param: None
+
+        :return: OfflineService
+        """
+        return self
+
+    def list(self,
+             q: str,
+             startIndex: int = 0,
+             maxResults: int = 10,
+             **kwargs) -> "OfflineService":
+        """
+        Prepare a search request.
+
+        :param str q: The search query
+        :param int startIndex: The index of the first volume
+        :param int maxResults: The number of volumes per page
+
+        :return: OfflineService holding the request
+        """
+        request: OfflineService = OfflineService(self._volumes)
+        request._query = {"q": q, "start": startIndex, "size": maxResults}
+
+        return request
+
+    def execute(self, **kwargs) -> dict:
+        """
+        Execute the prepared search request.
+
+        :param: None
+
+        :return: dict shaped like a volumes().list response
+        """
+        terms: list = self._query["q"].lower().split()
+
+        matches: list = [
+            volume for volume in self._volumes if all(
+                term in " ".join([
+                    volume.get("volumeInfo", {}).get("title", ""), *volume.get(
+                        "volumeInfo", {}).get("authors", [])
+                ]).lower() for term in terms)
+        ]
+
+        start: int = self._query["start"]
+
+        return {
+            "totalItems": len(matches),
+            "items": matches[start:start + self._query["size"]]
+        }
+
+
+def get_service() -> Any:
+    """
+    Return the Google Books client of the current app.
+    The client is built on first use from the vendored discovery document,
+    unless GOOGLE_BOOKS_SERVICE provides a stand-in.
+
+    :param: None
+
+    :return: A Google Books client
+    """
+    service: Any = current_app.config["GOOGLE_BOOKS_SERVICE"]
+
+    if service is not None:
+        return service
+
+    with _lock:
+        service = current_app.extensions.get("google_books", None)
+
+        if service is None:
+            api_key: Union[str, None] = current_app.config[
+                "GOOGLE_BOOKS_API_KEY"]
+
+            if api_key is None:
+                raise ValueError("Missing API key")
+
+            with open(current_app.config["GOOGLE_BOOKS_DISCOVERY_PATH"],
+                      encoding="utf-8") as document:
+                service = build_from_document(document.read(),
+                                              developerKey=api_key)
+
+            current_app.extensions["google_books"] = service
+
+    return service
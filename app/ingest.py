@@ -0,0 +1,529 @@
+import itertools
+import json
+import os
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.sql.schema import Table
+from typing import BinaryIO, Iterator, Union
+
+from app import db
+from .isbn import to_isbn13
+from .models import Author, Book, BookStats, Category, ImportCheckpoint, SavedBook, book_author, book_category
+
+# Define the number of records per IN query, two parameters each
+RESOLVE_BATCH_SIZE: int = 250
+
+
+def parse_volume(volume: dict) -> Union[dict, None]:
+    """
+    Extract the Book columns from a Google Books volume.
+
+    :param dict volume: A volume from the items of a volumes().list response
+
+    :return: dict of Book columns or None without a title, authors or valid ISBN
+    """
+    volume_info: dict = volume.get("volumeInfo", {})
+
+    bookname: Union[str, None] = volume_info.get("title", None)
+
+    author: Union[str,
+                  None] = ", ".join(volume_info["authors"]) if volume_info.get(
+                      "authors", None) else None
+
+    isbns: list = [
+        identifier.get("identifier", None)
+        for identifier in volume_info.get("industryIdentifiers", [])
+        if "ISBN" in identifier.get("type", "")
+    ]
+
+    isbn: Union[str, None] = isbns[0] if len(isbns) != 0 else None
+
+    isbn13: Union[str, None] = next(
+        (canonical
+         for canonical in map(to_isbn13, isbns) if canonical is not None),
+        None)
+
+    if not all((bookname, author, isbn, isbn13)):
+        return None
+
+    categories: Union[str, None] = ",".join(
+        volume_info["categories"]) if volume_info.get("categories",
+                                                      None) else None
+
+    thumbnail: Union[str, None] = volume_info.get("imageLinks",
+                                                  {}).get("thumbnail", None)
+
+    return {
+        "bookname": bookname,
+        "author": author,
+        "isbn": isbn,
+        "isbn13": isbn13,
+        "description": volume_info.get("description", None),
+        "categories": categories,
+        "thumbnail": thumbnail
+    }
+
+
+def insert_ignore(table: Table, rows: list) -> None:
+    """
+    Insert rows in a single statement, skipping rows that violate a unique
+    constraint.
+    The caller owns the transaction.
+
+    :param Table table: The table to insert into
+    :param list rows: dicts of column values
+
+    :return: None
+    """
+    if len(rows) == 0:
+        return
+
+    dialect: str = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        statement = postgresql_insert(table).on_conflict_do_nothing()
+    elif dialect == "mysql":
+        statement = table.insert().prefix_with("IGNORE")
+    else:
+        statement = table.insert().prefix_with("OR IGNORE")
+
+    db.session.execute(statement, rows)
+
+
+def resolve_books(records: list) -> dict:
+    """
+    Find the stored books matching the given records by canonical ISBN-13.
+    Large batches are split to stay under the bound parameter limit of SQLite.
+
+    :param list records: dicts of Book columns
+
+    :return: dict mapping ISBN-13s to Book instances
+    """
+    isbn13s: list = list({record["isbn13"] for record in records})
+    resolved: dict = {}
+
+    for start in range(0, len(isbn13s), RESOLVE_BATCH_SIZE):
+        books: list = Book.query.filter(
+            Book.isbn13.in_(isbn13s[start:start + RESOLVE_BATCH_SIZE])).all()
+
+        resolved.update((book.isbn13, book) for book in books)
+
+    return resolved
+
+
+def resolve_titles(records: list) -> dict:
+    """
+    Find the stored books matching the given records by title.
+    Used for the records whose insert was skipped because another edition
+    already holds the title.
+
+    :param list records: dicts of Book columns
+
+    :return: dict mapping ISBN-13s to Book instances
+    """
+    resolved: dict = {}
+
+    for start in range(0, len(records), RESOLVE_BATCH_SIZE):
+        batch: list = records[start:start + RESOLVE_BATCH_SIZE]
+
+        books: dict = {
+            book.bookname: book
+            for book in Book.query.filter(
+                Book.bookname.in_({record["bookname"]
+                                   for record in batch})).all()
+        }
+
+        resolved.update((record["isbn13"], books[record["bookname"]])
+                        for record in batch if record["bookname"] in books)
+
+    return resolved
+
+
+def split_names(names: Union[str, None], separator: str) -> list:
+    """
+    Split a joined author or category string into distinct names.
+
+    :param Union[str, None] names: The joined names
+    :param str separator: The separator of the names
+
+    :return: list of names in their original order
+    """
+    if not names:
+        return []
+
+    return list(
+        dict.fromkeys(name.strip() for name in names.split(separator)
+                      if name.strip()))
+
+
+def upsert_names(model: db.Model, names: set) -> dict:
+    """
+    Insert the missing Author or Category names and return their IDs.
+
+    :param db.Model model: Author or Category
+    :param set names: The names
+
+    :return: dict mapping names to IDs
+    """
+    ids: dict = {}
+    names = sorted(names)
+
+    for start in range(0, len(names), RESOLVE_BATCH_SIZE):
+        batch: list = names[start:start + RESOLVE_BATCH_SIZE]
+
+        insert_ignore(model.__table__, [{"name": name} for name in batch])
+
+        ids.update(
+            db.session.execute(
+                select([model.name,
+                        model.id]).where(model.name.in_(batch))).fetchall())
+
+    return ids
+
+
+def link_taxonomy(books: list) -> None:
+    """
+    Link books to their Author and Category rows.
+    Existing links are kept. The caller owns the transaction.
+
+    :param list books: tuples of a book ID, joined authors and joined categories
+
+    :return: None
+    """
+    authors: dict = {
+        book_id: split_names(author, ", ")
+        for book_id, author, _ in books
+    }
+    categories: dict = {
+        book_id: split_names(category, ",")
+        for book_id, _, category in books
+    }
+
+    author_ids: dict = upsert_names(
+        Author, {name
+                 for names in authors.values() for name in names})
+    category_ids: dict = upsert_names(
+        Category, {name
+                   for names in categories.values() for name in names})
+
+    author_rows: list = []
+    category_rows: list = []
+
+    for book_id, names in authors.items():
+        for position, name in enumerate(names):
+            author_rows.append({
+                "book_id": book_id,
+                "author_id": author_ids[name],
+                "position": position
+            })
+
+    for book_id, names in categories.items():
+        for name in names:
+            category_rows.append({
+                "book_id": book_id,
+                "category_id": category_ids[name]
+            })
+
+    insert_ignore(book_author, author_rows)
+    insert_ignore(book_category, category_rows)
+
+
+def link_records(records: list) -> None:
+    """
+    Link newly inserted book records to their Author and Category rows.
+    The caller owns the transaction.
+
+    :param list records: dicts of Book columns
+
+    :return: None
+    """
+    for start in range(0, len(records), RESOLVE_BATCH_SIZE):
+        batch: list = records[start:start + RESOLVE_BATCH_SIZE]
+
+        link_taxonomy(
+            db.session.execute(
+                select([Book.id, Book.author, Book.categories]).where(
+                    Book.isbn13.in_({record["isbn13"]
+                                     for record in batch}))).fetchall())
+
+
+def backfill_taxonomy(batch_size: int = 500) -> Iterator[int]:
+    """
+    Link every stored book to its Author and Category rows.
+    Books are walked in ID order and each batch is committed.
+
+    :param int batch_size: The number of books per transaction
+
+    :return: Iterator of the number of books linked so far
+    """
+    last_id: int = 0
+    linked: int = 0
+
+    while True:
+        books: list = db.session.execute(
+            select([Book.id, Book.author,
+                    Book.categories]).where(Book.id > last_id).order_by(
+                        Book.id).limit(batch_size)).fetchall()
+
+        if len(books) == 0:
+            break
+
+        link_taxonomy(books)
+
+        # Bump the version of the books so their cached pages are rebuilt
+        db.session.execute(Book.__table__.update().where(
+            and_(Book.id > last_id,
+                 Book.id <= books[-1][0])).values(updated=func.now()))
+        db.session.commit()
+
+        last_id = books[-1][0]
+        linked += len(books)
+
+        yield linked
+
+
+def upsert_books(records: list, resolved: Union[dict, None] = None) -> int:
+    """
+    Insert the records whose ISBN-13 is not stored yet and link them to their
+    authors and categories.
+    Duplicates inside the batch are dropped before inserting.
+    The caller owns the transaction.
+
+    :param list records: dicts of Book columns
+    :param Union[dict, None] resolved: The result of resolve_books if known
+
+    :return: int of the number of records sent to the database
+    """
+    if resolved is None:
+        resolved = resolve_books(records)
+
+    missing: list = []
+    seen: set = set()
+
+    for record in records:
+        keys: tuple = (("isbn13", record["isbn13"]), ("bookname",
+                                                      record["bookname"]))
+
+        if record["isbn13"] in resolved or any(key in seen for key in keys):
+            continue
+
+        seen.update(keys)
+        missing.append(record)
+
+    insert_ignore(Book.__table__, missing)
+    link_records(missing)
+
+    return len(missing)
+
+
+def ingest_volumes(volumes: list) -> list:
+    """
+    Store the fetched Google Books volumes and return their Book rows.
+    Existing books are resolved with one indexed ISBN-13 probe and the
+    missing ones are inserted in one batch inside a single transaction.
+
+    :param list volumes: The items of a volumes().list response
+
+    :return: list of Book instances in the order of the volumes
+    """
+    records: list = [
+        record for record in map(parse_volume, volumes) if record is not None
+    ]
+
+    resolved: dict = resolve_books(records)
+
+    if upsert_books(records, resolved) > 0:
+        db.session.commit()
+        resolved = resolve_books(records)
+
+    unresolved: list = [
+        record for record in records if record["isbn13"] not in resolved
+    ]
+
+    if len(unresolved) != 0:
+        resolved.update(resolve_titles(unresolved))
+
+    books: list = []
+
+    for record in records:
+        book: Union[Book, None] = resolved.get(record["isbn13"], None)
+
+        if book is not None and book not in books:
+            books.append(book)
+
+    return books
+
+
+def read_volumes(dump: BinaryIO, offset: int = 0) -> Iterator[tuple]:
+    """
+    Stream the volumes of a JSONL dump.
+    Blank and malformed lines are skipped.
+
+    :param BinaryIO dump: The dump opened in binary mode
+    :param int offset: The byte offset to start reading from
+
+    :return: Iterator of tuples of a volume and the offset after its line
+    """
+    dump.seek(offset)
+
+    for line in dump:
+        offset += len(line)
+
+        try:
+            volume: Union[dict,
+                          None] = json.loads(line) if line.strip() else None
+        except ValueError:
+            volume = None
+
+        yield volume, offset
+
+
+def import_volumes(path: str,
+                   chunk_size: int = 500,
+                   restart: bool = False) -> Iterator[dict]:
+    """
+    Import a JSONL dump of Google Books volumes in chunks.
+    Each chunk is committed together with the byte offset reached, so an
+    interrupted import resumes after the last committed chunk.
+
+    :param str path: The path of the dump
+    :param int chunk_size: The number of lines per transaction
+    :param bool restart: Whether to ignore the saved offset
+
+    :return: Iterator of dicts of the progress after each chunk
+    """
+    source: str = os.path.abspath(path)
+
+    checkpoint: Union[ImportCheckpoint,
+                      None] = ImportCheckpoint.query.filter_by(
+                          source=source).first()
+
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(source=source, offset=0, lines=0)
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.offset = checkpoint.lines = 0
+
+    with open(path, "rb") as dump:
+        lines: Iterator[tuple] = read_volumes(dump, checkpoint.offset)
+
+        while True:
+            chunk: list = list(itertools.islice(lines, chunk_size))
+
+            if len(chunk) == 0:
+                break
+
+            records: list = [
+                record for record in (parse_volume(volume)
+                                      for volume, _ in chunk
+                                      if isinstance(volume, dict))
+                if record is not None
+            ]
+
+            inserted: int = upsert_books(records)
+
+            checkpoint.offset = chunk[-1][1]
+            checkpoint.lines += len(chunk)
+
+            db.session.commit()
+
+            yield {
+                "offset": checkpoint.offset,
+                "lines": checkpoint.lines,
+                "read": len(chunk),
+                "inserted": inserted
+            }
+
+
+def merge_book(duplicate_id: int, keeper_id: int) -> None:
+    """
+    Merge a duplicate book into the book kept for its ISBN-13.
+    Saved books move to the kept book unless the user already saved it, and
+    the ratings are combined until the stats are rebuilt.
+    The caller owns the transaction.
+
+    :param int duplicate_id: The ID of the book to remove
+    :param int keeper_id: The ID of the book to keep
+
+    :return: None
+    """
+    duplicate: Book = Book.query.get(duplicate_id)
+    keeper: Book = Book.query.get(keeper_id)
+
+    total_ratings: float = keeper.total_ratings + duplicate.total_ratings
+
+    if total_ratings > 0:
+        keeper.average_rating = (
+            keeper.average_rating * keeper.total_ratings +
+            duplicate.average_rating * duplicate.total_ratings) / total_ratings
+        keeper.total_ratings = total_ratings
+
+    already_saved = select([SavedBook.user_id
+                            ]).where(SavedBook.book_id == keeper_id)
+
+    SavedBook.query.filter(
+        SavedBook.book_id == duplicate_id,
+        SavedBook.user_id.in_(already_saved)).delete(synchronize_session=False)
+    SavedBook.query.filter_by(book_id=duplicate_id).update(
+        {"book_id": keeper_id}, synchronize_session=False)
+
+    for association in (book_author, book_category):
+        db.session.execute(
+            association.delete().where(association.c.book_id == duplicate_id))
+
+    BookStats.query.filter_by(book_id=duplicate_id).delete(
+        synchronize_session=False)
+
+    db.session.delete(duplicate)
+    db.session.flush()
+
+
+def merge_duplicate_books(batch_size: int = 500) -> Iterator[dict]:
+    """
+    Fill in the ISBN-13 of books stored before it existed and merge the books
+    sharing an ISBN-13.
+    Books are walked in ID order, so the oldest book of each ISBN-13 is kept
+    unless a book already holds it. Each batch is committed.
+
+    :param int batch_size: The number of books per transaction
+
+    :return: Iterator of dicts of the progress after each batch
+    """
+    keepers: dict = dict(
+        db.session.execute(
+            select([Book.isbn13,
+                    Book.id]).where(Book.isbn13.isnot(None))).fetchall())
+
+    last_id: int = 0
+    progress: dict = {"scanned": 0, "merged": 0, "invalid": 0}
+
+    while True:
+        books: list = db.session.execute(
+            select([Book.id, Book.isbn
+                    ]).where(and_(Book.isbn13.is_(None),
+                                  Book.id > last_id)).order_by(
+                                      Book.id).limit(batch_size)).fetchall()
+
+        if len(books) == 0:
+            break
+
+        for book_id, isbn in books:
+            isbn13: Union[str, None] = to_isbn13(isbn)
+
+            if isbn13 is None:
+                progress["invalid"] += 1
+            elif isbn13 in keepers:
+                merge_book(book_id, keepers[isbn13])
+                progress["merged"] += 1
+            else:
+                keepers[isbn13] = book_id
+                Book.query.filter_by(id=book_id).update(
+                    {"isbn13": isbn13}, synchronize_session=False)
+
+        db.session.commit()
+
+        last_id = books[-1][0]
+        progress["scanned"] += len(books)
+
+        yield dict(progress)
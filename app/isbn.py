@@ -0,0 +1,58 @@
+import re
+
+from typing import Union
+
+
+def isbn13_check_digit(digits: str) -> str:
+    """
+    Calculate the check digit of the first twelve digits of an ISBN-13.
+
+    :param str digits: The first twelve digits
+
+    :return: str of the check digit
+    """
+    total: int = sum(
+        int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits))
+
+    return str((10 - total % 10) % 10)
+
+
+def isbn10_valid(isbn: str) -> bool:
+    """
+    Validate the check digit of an ISBN-10.
+
+    :param str isbn: Ten characters, the last of which may be X
+
+    :return: True or False on if the check digit is valid
+    """
+    if not re.fullmatch(r"\d{9}[\dX]", isbn):
+        return False
+
+    total: int = sum((10 - i) * (10 if character == "X" else int(character))
+                     for i, character in enumerate(isbn))
+
+    return total % 11 == 0
+
+
+def to_isbn13(identifier: Union[str, None]) -> Union[str, None]:
+    """
+    Convert an ISBN-10 or ISBN-13 into the canonical ISBN-13 form.
+    Hyphens and spaces are ignored.
+
+    :param Union[str, None] identifier: The ISBN
+
+    :return: str of the 13 digits or None if the identifier is not a valid ISBN
+    """
+    if identifier is None:
+        return None
+
+    isbn: str = re.sub(r"[\s-]", "", identifier).upper()
+
+    if len(isbn) == 10 and isbn10_valid(isbn):
+        return f"978{isbn[:9]}{isbn13_check_digit('978' + isbn[:9])}"
+
+    if re.fullmatch(r"97[89]\d{10}", isbn) and isbn13_check_digit(
+            isbn[:12]) == isbn[12]:
+        return isbn
+
+    return None
@@ -1,76 +1,30 @@
-from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+import click
+
+from datetime import datetime, timezone
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
 from flask_socketio import emit, join_room, leave_room
-from hashlib import sha1
-from math import acos, sqrt
-from sqlalchemy import or_, and_
-from textblob import TextBlob
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
 from typing import Union
 from werkzeug.security import gen_salt
 
-from app import db, socketio
+from app import chat_throttle, db, message_buffer, presence_registry, socketio, taste_index
 from .auth import login_required
-from .models import User, Book, MessageSession, SavedBook
+from .messages import message_history
+from .models import User, MessageSession
+from .recommendations import build_taste_index, rebuild_scores, refresh_user, stale_scores, top_matches
 
 bp: Blueprint = Blueprint("match", __name__, url_prefix="/match")
 
 
-def dot_product(vec_a: tuple, vec_b: tuple) -> Union[int, float]:
-    """
-    Calculate the dot product of two vectors.
-
-    :param tuple vec_a: Vector A
-    :param tuple vec_b: Vector B
-
-    :return: int or float of the resulting product
-    """
-    return sum((a * b) for a, b in zip(vec_a, vec_b))
-
-
-def vector_length(vec: tuple) -> float:
-    """
-    Calculate the length of a vector.
-
-    :param tuple vec: A vector
-
-    :return: float of the length
-    """
-    return sqrt(dot_product(vec, vec))
-
-
-def theta_difference(vec_a: tuple, vec_b: tuple) -> float:
-    """
-    Calculate the theta difference between two vectors.
-
-    :param tuple vec_a: Vector A
-    :param tuple vec_b: Vector B
-
-    :return: float of the resulting product
-    """
-    return acos(
-        dot_product(vec_a, vec_b) /
-        (vector_length(vec_a) * vector_length(vec_b)))
-
-
-def quantify_vector(vec: tuple) -> tuple:
-    """
-    Quantify a given vector.
-    Modify the given vector.
-
-    :param tuple vec: A tuple consisting of rating and review
-
-    :return: None
-    """
-    rating: int = vec[0] * 0.2
-    blob: TextBlob = TextBlob(vec[1])
-
-    return (rating, blob.sentiment.polarity + 1)
-
-
 @bp.route("/", methods=["GET"])
 @login_required
 def match():
     """
     Match two users with common book interests.
+    Reads the best precomputed scores of the user. Users without any score,
+    such as accounts from before scores were stored, are scored first.
+    Matches online right now are listed first.
 
     :param: None
 
@@ -78,67 +32,117 @@ def match():
     """
     user: User = User.query.filter_by(id=session.get("user_id")).first_or_404()
 
-    reading_lists: list = SavedBook.query.filter_by(user_id=user.id,
-                                                    to_be_read=True).all()
+    matches: list = top_matches(user.id, current_app.config["MATCH_RESULTS"])
 
-    potential_friends: Union[list, None] = []
+    if len(matches) == 0 and refresh_user(user.id) != 0:
+        db.session.commit()
 
-    for book in reading_lists:
-        fetched_users: list = SavedBook.query.filter(
-            SavedBook.book_id == book.book_id,
-            SavedBook.user_id != user.id).all()
+        matches = top_matches(user.id, current_app.config["MATCH_RESULTS"])
+
+    # Suggest users with a similar taste who may share no reading list book
+    shown: set = {
+        user.id, *(match_score.candidate_id for match_score in matches)
+    }
+    similar_ids: list = [
+        user_id for user_id, _ in taste_index.similar(
+            user.id, current_app.config["MATCH_RESULTS"] + len(shown))
+        if user_id not in shown
+    ][:current_app.config["MATCH_RESULTS"]]
+
+    # Put the users connected right now first, keeping the ranking otherwise
+    online: set = presence_registry.online(shown | set(similar_ids))
+    matches.sort(
+        key=lambda match_score: match_score.candidate_id not in online)
+    similar_ids.sort(key=lambda user_id: user_id not in online)
+
+    elo: list = [match_score.score for match_score in matches]
+    potential_friends: list = [
+        match_score.candidate for match_score in matches
+    ]
+
+    similar_users: dict = {}
+
+    if len(similar_ids) != 0:
+        similar_users = {
+            similar_user.id: similar_user
+            for similar_user in User.query.filter(User.id.in_(similar_ids))
+        }
+
+    if len(potential_friends) == 0 and len(similar_users) == 0:
+        flash(
+            "Add some books to your reading list before we can match you with someone."
+        )
 
-        for i, fetched_book in enumerate(fetched_users):
-            fetched_users[i] = User.query.filter_by(
-                id=fetched_book.user_id).first()
+    return render_template("match/result.html",
+                           elo=elo,
+                           potential_friends=potential_friends,
+                           similar_users=[
+                               similar_users[user_id]
+                               for user_id in similar_ids
+                               if user_id in similar_users
+                           ],
+                           online=online)
+
+
+@bp.cli.command("rebuild-scores")
+@click.option("--batch-size",
+              default=100,
+              show_default=True,
+              help="Number of users committed per transaction.")
+@click.option("--verify",
+              is_flag=True,
+              help="Only report the scores that are out of date.")
+def rebuild_scores_command(batch_size: int, verify: bool) -> None:
+    """
+    Recompute the match scores of every user with a reading list.
 
-        fetched_users = list(set(fetched_users))
+    :param int batch_size: The number of users per transaction
+    :param bool verify: Whether to only count the stale scores
 
-        if len(fetched_users) != 0:
-            potential_friends += fetched_users
+    :return: None
+    """
+    if verify:
+        count, lag = stale_scores()
 
-    potential_friends = list(set(potential_friends[:10]))
+        click.echo(f"Found {count} out of date scores, "
+                   f"the oldest is {lag:.0f}s behind.")
 
-    elo: Union[list, None] = []
+        if count != 0:
+            raise SystemExit(1)
 
-    if len(potential_friends) == 0:
-        flash(
-            "Add some books to your reading list before we can match you with someone."
-        )
-    else:
-        for book in reading_lists:
-            elo_round: list = []
+        return
 
-            for potential_friend in potential_friends:
-                friend_book: SavedBook = SavedBook.query.filter_by(
-                    book_id=book.book_id, user_id=potential_friend.id).first()
+    scored: int = 0
 
-                if friend_book is None or friend_book.rating is None or friend_book.review is None:
-                    elo_round.append(1)
-                    continue
+    for scored in rebuild_scores(batch_size):
+        click.echo(f"Scored {scored} users.")
 
-                user_vector: tuple = quantify_vector(
-                    (book.rating, book.review))
-                friend_vector: tuple = quantify_vector(
-                    (friend_book.rating, friend_book.review))
+    click.echo(f"Rebuilt the match scores of {scored} users.")
 
-                elo_round.append(theta_difference(user_vector, friend_vector))
 
-            elo.append(elo_round)
+@bp.cli.command("build-taste-index")
+@click.option("--batch-size",
+              default=1000,
+              show_default=True,
+              help="Number of users aggregated per query.")
+def build_taste_index_command(batch_size: int) -> None:
+    """
+    Rebuild the taste index of every user with saved books and save it to
+    TASTE_INDEX_PATH.
 
-        elo = [sum(i) for i in zip(*elo)]
+    :param int batch_size: The number of users per query
 
-        if len(elo) == 0:
-            elo = None
-        elif len(potential_friends) == 0:
-            potential_friends = None
-        else:
-            elo, potential_friends = (list(t) for t in zip(
-                *sorted(zip(elo, potential_friends))))
+    :return: None
+    """
+    users: int = 0
 
-    return render_template("match/result.html",
-                           elo=elo,
-                           potential_friends=potential_friends)
+    for users in build_taste_index(batch_size):
+        click.echo(f"Aggregated {users} users.")
+
+    taste_index.save(current_app.config["TASTE_INDEX_PATH"])
+
+    click.echo(f"Saved the taste index of {users} users to "
+               f"{current_app.config['TASTE_INDEX_PATH']}.")
 
 
 @bp.route("/connect", methods=["GET", "POST"])
@@ -197,76 +201,145 @@ def connect() -> None:
                            other_user_id=other_user_id)
 
 
-@socketio.on("join", namespace="/match/connect")
-def handle_join(payload: dict):
+@bp.route("/history/<int:other_user_id>", methods=["GET"])
+@login_required
+def history(other_user_id: int):
     """
-    Handle on join for session.
+    Return a page of the chat history with another user, newest first.
+    Pass the returned cursor as before for the older page. Only stored
+    messages are read, so the newest may lag by up to CHAT_BUFFER_LINGER.
 
-    :param dict payload: Incoming payload
+    :param int other_user_id: The user ID of the other user
 
-    :return: SocketIO response
+    :return: JSON of the messages and the cursor of the older page
     """
     user_id: int = session.get("user_id")
-    other_user_id: int = int(payload["other_user_id"])
 
-    user: User = User.query.filter_by(id=user_id).first()
-    display_name: str = user.display_name
-
-    message_session: Union[MessageSession, None] = MessageSession.query.filter(
+    message_session: MessageSession = MessageSession.query.filter(
         or_(
             and_(MessageSession.user_a_id == user_id,
                  MessageSession.user_b_id == other_user_id),
             and_(MessageSession.user_a_id == other_user_id,
-                 MessageSession.user_b_id == user_id))).first()
+                 MessageSession.user_b_id == user_id))).first_or_404()
+
+    messages, before = message_history(
+        message_session.room, request.args.get("before", None, type=int),
+        current_app.config["CHAT_HISTORY_PAGE_SIZE"])
+
+    page: list = [
+        dict(id=message.id,
+             sender_id=message.sender_id,
+             data=f"{message.sender.display_name}: {message.body}",
+             created=message.created.isoformat()) for message in messages
+    ]
+
+    return jsonify(messages=page, before=before)
+
+
+@bp.route("/chat/stats", methods=["GET"])
+@login_required
+def chat_stats():
+    """
+    Return the chat throttle counters of this worker.
+
+    :param: None
+
+    :return: JSON of the message and event counters and the clients behind
+    """
+    return jsonify(chat_throttle.stats())
+
+
+def resolve_room(user_id: int, other_user_id: int) -> Union[dict, None]:
+    """
+    Resolve the chat room of two users in one query.
+
+    :param int user_id: The user ID
+    :param int other_user_id: The user ID of the peer
+
+    :return: dict of the room, the user's display name and the peer ID or None
+    """
+    message_session: Union[
+        MessageSession, None] = MessageSession.query.options(
+            joinedload(MessageSession.user_a),
+            joinedload(MessageSession.user_b)).filter(
+                or_(
+                    and_(MessageSession.user_a_id == user_id,
+                         MessageSession.user_b_id == other_user_id),
+                    and_(MessageSession.user_a_id == other_user_id,
+                         MessageSession.user_b_id == user_id))).first()
 
     if message_session is None:
-        flash("Socket connection failed.")
-        return redirect(url_for("index"))
+        return None
+
+    return {
+        "room": message_session.room,
+        "display_name": message_session.partner(other_user_id).display_name,
+        "peer_id": other_user_id
+    }
+
+
+@socketio.on("join", namespace="/match/connect")
+def handle_join(payload: dict):
+    """
+    Handle on join for session.
+    The room is resolved once and kept in the session of the connection, so
+    the other events of the connection need no queries.
+
+    :param dict payload: Incoming payload
 
-    room: str = message_session.room
+    :return: SocketIO response
+    """
+    user_id: Union[int, None] = session.get("user_id")
+    other_user_id: int = int(payload["other_user_id"])
+
+    chat: Union[dict, None] = resolve_room(
+        user_id, other_user_id) if user_id is not None else None
 
-    session["rooms"] = session.get("rooms", [])
+    if chat is None:
+        emit("status", {"data": "Socket connection failed."})
+        return
 
-    if room not in session["rooms"]:
-        session["rooms"].append(room)
+    session.setdefault("rooms", {})[other_user_id] = chat
 
-    join_room(room)
+    join_room(chat["room"])
 
-    emit("status", {"data": f"{display_name} has joined."}, room=room)
+    emit("status", {"data": f"{chat['display_name']} has joined."},
+         room=chat["room"])
 
 
 @socketio.on("request", namespace="/match/connect")
 def handle_chat_message(payload: dict):
     """
     Handle incoming chat messages.
-    Echo back the payload.
+    Echo back the payload and queue it for the history, without touching the
+    database. Messages over the length or rate limits are refused.
 
     :param dict payload: Incoming payload
 
     :return: SocketIO response
     """
-    user_id: int = session.get("user_id")
-    other_user_id: int = int(payload["other_user_id"])
+    chat: Union[dict,
+                None] = session.get("rooms",
+                                    {}).get(int(payload["other_user_id"]),
+                                            None)
 
-    user: User = User.query.filter_by(id=user_id).first()
-    display_name: str = user.display_name
+    if chat is None:
+        emit("status", {"data": "Join the chat before sending messages."})
+        return
 
-    message_session: Union[MessageSession, None] = MessageSession.query.filter(
-        or_(
-            and_(MessageSession.user_a_id == user_id,
-                 MessageSession.user_b_id == other_user_id),
-            and_(MessageSession.user_a_id == other_user_id,
-                 MessageSession.user_b_id == user_id))).first()
+    body: str = str(payload["data"])
+    refused: Union[str, None] = chat_throttle.admit(request.sid, body)
 
-    if message_session is None:
-        flash("Socket connection failed.")
-        return redirect(url_for("index"))
+    if refused is not None:
+        emit("status", {"data": refused})
+        return
 
-    room: str = message_session.room
+    response: dict = {"data": f"{chat['display_name']}: {body}"}
 
-    response: dict = {"data": f"{display_name}: {payload['data']}"}
+    emit("response", response, room=chat["room"])
 
-    emit("response", response, room=room)
+    message_buffer.submit(chat["room"], session["user_id"], body,
+                          datetime.now(timezone.utc))
 
 
 @socketio.on("leave", namespace="/match/connect")
@@ -278,23 +351,31 @@ def handle_leave(payload: dict):
 
     :return: SocketIO response
     """
-    user_id: int = session.get("user_id")
-    other_user_id: int = int(payload["other_user_id"])
+    chat: Union[dict,
+                None] = session.get("rooms",
+                                    {}).pop(int(payload["other_user_id"]),
+                                            None)
 
-    user: User = User.query.filter_by(id=user_id).first()
-    display_name: str = user.display_name
+    if chat is None:
+        return
 
-    message_session: Union[MessageSession, None] = MessageSession.query.filter(
-        or_(
-            and_(MessageSession.user_a_id == user_id,
-                 MessageSession.user_b_id == other_user_id),
-            and_(MessageSession.user_a_id == other_user_id,
-                 MessageSession.user_b_id == user_id))).first()
+    leave_room(chat["room"])
+
+    emit("status", {"data": f"{chat['display_name']} has left."},
+         room=chat["room"])
 
-    room: str = message_session.room
 
-    session["rooms"].remove(room)
+@socketio.on("disconnect", namespace="/match/connect")
+def handle_disconnect():
+    """
+    Evict the rooms and throttle state of a closed connection.
 
-    leave_room(room)
+    :param: None
+
+    :return: SocketIO response
+    """
+    chat_throttle.forget(request.sid)
 
-    emit("status", {"data": f"{display_name} has left."}, room=room)
+    for chat in session.pop("rooms", {}).values():
+        emit("status", {"data": f"{chat['display_name']} has left."},
+             room=chat["room"])
@@ -0,0 +1,38 @@
+from sqlalchemy.orm import joinedload
+from typing import Union
+
+from app import db
+from .models import Message
+from .pagination import keyset_page
+
+
+def store_messages(messages: list) -> None:
+    """
+    Store a batch of chat messages in one transaction.
+    Runs in the message buffer, so sending a message never waits on a commit.
+
+    :param list messages: The (room, sender ID, body, created) tuples
+
+    :return: None
+    """
+    db.session.execute(Message.__table__.insert(), [
+        dict(room=room, sender_id=sender_id, body=body, created=created)
+        for room, sender_id, body, created in messages
+    ])
+    db.session.commit()
+
+
+def message_history(room: str, before: Union[int, None], size: int) -> tuple:
+    """
+    Return a page of the messages of a room, newest first.
+
+    :param str room: The room
+    :param Union[int, None] before: The cursor of the page or None for the newest
+    :param int size: The number of messages per page
+
+    :return: tuple of the Message instances and the cursor of the older page or None
+    """
+    query = Message.query.options(joinedload(
+        Message.sender)).filter_by(room=room)
+
+    return keyset_page(query, Message.id, before, size, descending=True)
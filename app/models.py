@@ -1,5 +1,5 @@
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import db
@@ -57,6 +57,55 @@ class User(db.Model):
         return check_password_hash(self.password, given_password)
 
 
+# Define the association tables between books and authors or categories
+book_author: db.Table = db.Table(
+    "book_author",
+    db.Column("book_id",
+              db.Integer,
+              db.ForeignKey("book.id", ondelete="CASCADE"),
+              primary_key=True),
+    db.Column("author_id",
+              db.Integer,
+              db.ForeignKey("author.id", ondelete="CASCADE"),
+              primary_key=True),
+    db.Column("position", db.Integer, default=0, nullable=False),
+    db.Index("ix_book_author_author_id_book_id", "author_id", "book_id"))
+
+book_category: db.Table = db.Table(
+    "book_category",
+    db.Column("book_id",
+              db.Integer,
+              db.ForeignKey("book.id", ondelete="CASCADE"),
+              primary_key=True),
+    db.Column("category_id",
+              db.Integer,
+              db.ForeignKey("category.id", ondelete="CASCADE"),
+              primary_key=True),
+    db.Index("ix_book_category_category_id_book_id", "category_id", "book_id"))
+
+
+class Author(db.Model):
+    """
+    Define the author class.
+
+    :attribute Column id: The author ID
+    :attribute Column name: The author's name
+    """
+    id: db.Column = db.Column(db.Integer, primary_key=True)
+    name: db.Column = db.Column(db.String, unique=True, nullable=False)
+
+
+class Category(db.Model):
+    """
+    Define the category class.
+
+    :attribute Column id: The category ID
+    :attribute Column name: The category name
+    """
+    id: db.Column = db.Column(db.Integer, primary_key=True)
+    name: db.Column = db.Column(db.String, unique=True, nullable=False)
+
+
 class Book(db.Model):
     """
     Define the book class.
@@ -65,19 +114,51 @@ class Book(db.Model):
     :attribute Column bookname: The book's name
     :attribute Column author: The author name(s)
     :attribute Column isbn: ISBN
+    :attribute Column isbn13: The canonical ISBN-13 used for deduplication
     :attribute Column description: The book description
     :attribute Column categories: The book categories
+    :attribute Column thumbnail: The Google Books thumbnail URL
+    :attribute Column thumbnail_digest: The SHA-256 digest of the cached thumbnail
     :attribute Column average_rating: The book's user generated average rating
+    :attribute Column total_ratings: The number of user ratings
+    :attribute Column version: The number of updates of this record
+    :attribute Column updated: The time when this record is updated
+    :attribute relationship authors: The book's Author rows in credit order
+    :attribute relationship genres: The book's Category rows
     """
     id: db.Column = db.Column(db.Integer, primary_key=True)
     bookname: db.Column = db.Column(db.String, unique=True, nullable=False)
     author: db.Column = db.Column(db.String, nullable=False)
     isbn: db.Column = db.Column(db.String, unique=True, nullable=False)
+    isbn13: db.Column = db.Column(db.String(13),
+                                  unique=True,
+                                  index=True,
+                                  nullable=True)
     description: db.Column = db.Column(db.String, nullable=True)
     categories: db.Column = db.Column(db.String, nullable=True)
     thumbnail: db.Column = db.Column(db.String, nullable=True)
+    thumbnail_digest: db.Column = db.Column(db.String, nullable=True)
     average_rating: db.Column = db.Column(db.Float, default=0, nullable=False)
     total_ratings: db.Column = db.Column(db.Float, default=0, nullable=False)
+    version: db.Column = db.Column(db.Integer,
+                                   default=0,
+                                   server_default="0",
+                                   onupdate=literal_column("version + 1"),
+                                   nullable=False)
+    updated: db.Column = db.Column(db.DateTime(timezone=True),
+                                   server_default=func.now(),
+                                   onupdate=func.now())
+
+    authors: db.relationship = db.relationship("Author",
+                                               secondary=book_author,
+                                               order_by=book_author.c.position,
+                                               backref=db.backref(
+                                                   "books", lazy="dynamic"))
+    genres: db.relationship = db.relationship("Category",
+                                              secondary=book_category,
+                                              order_by="Category.name",
+                                              backref=db.backref(
+                                                  "books", lazy="dynamic"))
 
 
 class SavedBook(db.Model):
@@ -89,7 +170,23 @@ class SavedBook(db.Model):
     :attribute Column user_id: The user ID
     :attribute Column rating: The user's rating for the saved book
     :attribute Column review: The user's written review for the saved book
+    :attribute Column rating_component: The rating weighted for matching
+    :attribute Column sentiment: The sentiment polarity of the review
+    :attribute Column to_be_read: Whether the book is on the user's reading list
+    :attribute Column updated: The time when this record is updated
+    :attribute relationship book: The saved Book
+    :attribute relationship user: The User who saved the book
     """
+    __table_args__: tuple = (
+        db.UniqueConstraint("user_id",
+                            "book_id",
+                            name="uq_saved_book_user_id_book_id"),
+        db.Index("ix_saved_book_book_id_user_id", "book_id", "user_id"),
+        db.Index("ix_saved_book_user_id_id", "user_id", "id"),
+        db.Index("ix_saved_book_user_id_to_be_read_id", "user_id",
+                 "to_be_read", "id"),
+    )
+
     id: db.Column = db.Column(db.Integer, primary_key=True)
     book_id: db.Column = db.Column(db.Integer,
                                    db.ForeignKey("book.id"),
@@ -99,9 +196,65 @@ class SavedBook(db.Model):
                                    nullable=False)
     rating: db.Column = db.Column(db.Integer, nullable=True)
     review: db.Column = db.Column(db.String, nullable=True)
+    rating_component: db.Column = db.Column(db.Float, nullable=True)
+    sentiment: db.Column = db.Column(db.Float, nullable=True)
     to_be_read: db.Column = db.Column(db.Boolean,
                                       default=False,
                                       nullable=False)
+    updated: db.Column = db.Column(db.DateTime(timezone=True),
+                                   server_default=func.now(),
+                                   onupdate=func.now())
+
+    book: db.relationship = db.relationship("Book",
+                                            backref=db.backref("saved_books",
+                                                               lazy="dynamic"))
+    user: db.relationship = db.relationship("User",
+                                            backref=db.backref("saved_books",
+                                                               lazy="dynamic"))
+
+
+class BookStats(db.Model):
+    """
+    Define the book rating statistics class.
+    Maintained with atomic increments as reviews change.
+
+    :attribute Column book_id: The book ID
+    :attribute Column rating_sum: The sum of the ratings
+    :attribute Column rating_count: The number of ratings
+    :attribute Column stars_1: The number of ratings rounding to one star
+    :attribute Column stars_2: The number of ratings rounding to two stars
+    :attribute Column stars_3: The number of ratings rounding to three stars
+    :attribute Column stars_4: The number of ratings rounding to four stars
+    :attribute Column stars_5: The number of ratings rounding to five stars
+    :attribute Column updated: The time when this record is updated
+
+    :method histogram: Return the number of ratings per star
+    """
+    book_id: db.Column = db.Column(db.Integer,
+                                   db.ForeignKey("book.id"),
+                                   primary_key=True)
+    rating_sum: db.Column = db.Column(db.Float, default=0, nullable=False)
+    rating_count: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    stars_1: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    stars_2: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    stars_3: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    stars_4: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    stars_5: db.Column = db.Column(db.Integer, default=0, nullable=False)
+    updated: db.Column = db.Column(db.DateTime(timezone=True),
+                                   server_default=func.now(),
+                                   onupdate=func.now())
+
+    @property
+    def histogram(self) -> list:
+        """
+        Return the number of ratings per star.
+
+        :param: None
+
+        :return: list of tuples of the star and the number of ratings
+        """
+        return [(star, getattr(self, f"stars_{star}") or 0)
+                for star in range(1, 6)]
 
 
 class MessageSession(db.Model):
@@ -115,15 +268,25 @@ class MessageSession(db.Model):
     :attribute Column created: The time when this record is created
     :attribute Column updated: The time when this record is updated
     :attribute Column count: The number of interactions
+    :attribute relationship user_a: The User of user_a_id
+    :attribute relationship user_b: The User of user_b_id
+
+    :method partner: Return the other user of the session
     """
+    __table_args__: tuple = (
+        db.UniqueConstraint("user_a_id",
+                            "user_b_id",
+                            name="uq_message_session_user_a_id_user_b_id"),
+        db.Index("ix_message_session_user_b_id_user_a_id", "user_b_id",
+                 "user_a_id"),
+    )
+
     id: db.Column = db.Column(db.Integer, primary_key=True)
     user_a_id: db.Column = db.Column(db.Integer,
                                      db.ForeignKey("user.id"),
-                                     unique=True,
                                      nullable=False)
     user_b_id: db.Column = db.Column(db.Integer,
                                      db.ForeignKey("user.id"),
-                                     unique=True,
                                      nullable=False)
     room: db.Column = db.Column(db.String, unique=True, nullable=False)
     created: db.Column = db.Column(db.DateTime(timezone=True),
@@ -131,3 +294,92 @@ class MessageSession(db.Model):
     updated: db.Column = db.Column(db.DateTime(timezone=True),
                                    onupdate=func.now())
     count: db.Column = db.Column(db.Integer, default=0, nullable=False)
+
+    user_a: db.relationship = db.relationship("User", foreign_keys=[user_a_id])
+    user_b: db.relationship = db.relationship("User", foreign_keys=[user_b_id])
+
+    def partner(self, user_id: int) -> "User":
+        """
+        Return the other user of the session.
+
+        :param int user_id: The ID of one user of the session
+
+        :return: User
+        """
+        return self.user_b if self.user_a_id == user_id else self.user_a
+
+
+class MatchScore(db.Model):
+    """
+    Define the match score class.
+    Holds the score of a candidate for a user, the summed theta difference
+    of their reviews over the user's reading list. Lower scores are closer
+    matches.
+
+    :attribute Column user_id: The user ID
+    :attribute Column candidate_id: The user ID of the candidate
+    :attribute Column score: The match score
+    :attribute Column updated: The time when this record is computed
+    :attribute relationship candidate: The User of candidate_id
+    """
+    __table_args__: tuple = (db.Index("ix_match_score_user_id_score",
+                                      "user_id", "score", "candidate_id"), )
+
+    user_id: db.Column = db.Column(db.Integer,
+                                   db.ForeignKey("user.id"),
+                                   primary_key=True)
+    candidate_id: db.Column = db.Column(db.Integer,
+                                        db.ForeignKey("user.id"),
+                                        primary_key=True)
+    score: db.Column = db.Column(db.Float, nullable=False)
+    updated: db.Column = db.Column(db.DateTime(timezone=True),
+                                   server_default=func.now(),
+                                   nullable=False)
+
+    candidate: db.relationship = db.relationship("User",
+                                                 foreign_keys=[candidate_id])
+
+
+class Message(db.Model):
+    """
+    Define the chat message class.
+
+    :attribute Column id: The message ID
+    :attribute Column room: The room of the message session
+    :attribute Column sender_id: The user ID of the sender
+    :attribute Column body: The message text
+    :attribute Column created: The time when the message was sent
+    :attribute relationship sender: The User who sent the message
+    """
+    __table_args__: tuple = (db.Index("ix_message_room_id", "room", "id"), )
+
+    id: db.Column = db.Column(db.Integer, primary_key=True)
+    room: db.Column = db.Column(db.String,
+                                db.ForeignKey("message_session.room"),
+                                nullable=False)
+    sender_id: db.Column = db.Column(db.Integer,
+                                     db.ForeignKey("user.id"),
+                                     nullable=False)
+    body: db.Column = db.Column(db.String, nullable=False)
+    created: db.Column = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    sender: db.relationship = db.relationship("User")
+
+
+class ImportCheckpoint(db.Model):
+    """
+    Define the import checkpoint class.
+
+    :attribute Column id: The checkpoint ID
+    :attribute Column source: The absolute path of the imported dump
+    :attribute Column offset: The byte offset after the last committed chunk
+    :attribute Column lines: The number of lines committed
+    :attribute Column updated: The time when this record is updated
+    """
+    id: db.Column = db.Column(db.Integer, primary_key=True)
+    source: db.Column = db.Column(db.String, unique=True, nullable=False)
+    offset: db.Column = db.Column(db.BigInteger, default=0, nullable=False)
+    lines: db.Column = db.Column(db.BigInteger, default=0, nullable=False)
+    updated: db.Column = db.Column(db.DateTime(timezone=True),
+                                   server_default=func.now(),
+                                   onupdate=func.now())
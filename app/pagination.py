@@ -0,0 +1,34 @@
+from flask_sqlalchemy import BaseQuery
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from typing import Union
+
+
+def keyset_page(query: BaseQuery,
+                column: InstrumentedAttribute,
+                after: Union[int, None],
+                size: int,
+                descending: bool = False) -> tuple:
+    """
+    Return the page of a query following a cursor.
+    Rows are ordered by the cursor column and the next page starts after the
+    last row of this one, so deep pages cost as much as the first one when
+    the column is indexed together with the filters of the query.
+
+    :param BaseQuery query: The filtered query
+    :param InstrumentedAttribute column: The unique column to order by
+    :param Union[int, None] after: The cursor of the page or None for the first
+    :param int size: The number of rows per page
+    :param bool descending: Whether to page from the highest value down
+
+    :return: tuple of the rows and the cursor of the next page or None
+    """
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+
+    rows: list = query.order_by(column.desc() if descending else column).limit(
+        size + 1).all()
+
+    if len(rows) <= size:
+        return rows, None
+
+    return rows[:size], getattr(rows[size - 1], column.key)
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from flask import Flask
+from typing import Iterable, Union
+
+
+class Presence:
+    """
+    Define an in-memory registry of the users connected right now.
+    A user is online while one of their connections has sent a heartbeat
+    within the TTL, so connections that stop beating go offline without a
+    disconnect. Lookups are dictionary reads, so checking a page of users
+    costs no queries. The registry only knows the connections of its own
+    process.
+
+    :attribute float ttl: The seconds a heartbeat keeps a user online
+
+    :method init_app: Configure the registry from a Flask app
+    :method connect: Record a new connection of a user
+    :method heartbeat: Record that a connection is still alive
+    :method disconnect: Forget a closed connection
+    :method online: Return which of the given users are online
+    :method expire: Forget the heartbeats older than the TTL
+    """
+    def __init__(self, ttl: float = 60) -> None:
+        self.ttl: float = ttl
+        self._users: dict = {}
+        self._connections: dict = {}
+        self._seen: dict = {}
+        self._expired: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the registry with the PRESENCE_* settings of an app.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.ttl = app.config["PRESENCE_TTL"]
+            self._users = {}
+            self._connections = {}
+            self._seen = {}
+
+        app.extensions["presence"] = self
+
+    def connect(self, sid: str, user_id: int) -> None:
+        """
+        Record a new connection of a user.
+
+        :param str sid: The session ID of the connection
+        :param int user_id: The user ID
+
+        :return: None
+        """
+        now: float = time.monotonic()
+
+        if now - self._expired > self.ttl:
+            self.expire()
+
+        with self._lock:
+            self._users[sid] = user_id
+            self._connections.setdefault(user_id, set()).add(sid)
+            self._seen[user_id] = now
+
+    def heartbeat(self, sid: str) -> None:
+        """
+        Record that a connection is still alive.
+
+        :param str sid: The session ID of the connection
+
+        :return: None
+        """
+        with self._lock:
+            user_id: Union[int, None] = self._users.get(sid, None)
+
+            if user_id is not None:
+                self._seen[user_id] = time.monotonic()
+
+    def disconnect(self, sid: str) -> None:
+        """
+        Forget a closed connection, and its user if it was their last.
+
+        :param str sid: The session ID of the connection
+
+        :return: None
+        """
+        with self._lock:
+            user_id: Union[int, None] = self._users.pop(sid, None)
+            connections: set = self._connections.get(user_id, set())
+            connections.discard(sid)
+
+            if user_id is not None and len(connections) == 0:
+                self._connections.pop(user_id, None)
+                self._seen.pop(user_id, None)
+
+    def online(self, user_ids: Iterable[int]) -> set:
+        """
+        Return which of the given users are online.
+
+        :param Iterable[int] user_ids: The user IDs
+
+        :return: set of the user IDs online
+        """
+        cutoff: float = time.monotonic() - self.ttl
+
+        return {
+            user_id
+            for user_id in user_ids
+            if self._seen.get(user_id, float("-inf")) >= cutoff
+        }
+
+    def expire(self) -> None:
+        """
+        Forget the heartbeats older than the TTL.
+        Connections are kept until they disconnect, so a connection that
+        missed heartbeats, like a throttled background tab, is online again
+        at its next heartbeat.
+
+        :param: None
+
+        :return: None
+        """
+        now: float = time.monotonic()
+
+        with self._lock:
+            self._expired = now
+
+            for user_id in [
+                    user_id for user_id, seen in self._seen.items()
+                    if seen < now - self.ttl
+            ]:
+                del self._seen[user_id]
@@ -0,0 +1,192 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+from socketio import BaseManager, KafkaManager, KombuManager, PubSubManager, RedisManager, ZmqManager
+from typing import Iterator, Union
+
+from app import chat_throttle
+
+
+class OutboxManager(BaseManager):
+    """
+    Define a client manager delivering events through the chat throttle.
+    Events for a client that is behind are held in its outbox instead of
+    growing its engine.io queue.
+    """
+    def emit(self,
+             event: str,
+             data,
+             namespace: str,
+             room: Union[str, None] = None,
+             skip_sid=None,
+             callback=None,
+             **kwargs) -> None:
+        """
+        Emit an event to a client, a room or every client of a namespace.
+
+        :param str event: The event name
+        :param data: The event data
+        :param str namespace: The namespace
+        :param Union[str, None] room: The room or client, or None for all
+        :param skip_sid: The session ID or IDs to leave out
+        :param callback: The acknowledgement callback
+
+        :return: None
+        """
+        if callback is not None:
+            # Acknowledged events need their packet IDs, so send them now
+            return super().emit(event, data, namespace, room, skip_sid,
+                                callback, **kwargs)
+
+        if namespace not in self.rooms or room not in self.rooms[namespace]:
+            return
+
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        for sid in self.get_participants(namespace, room):
+            if sid not in skip_sid and not chat_throttle.hold(
+                    self.server, sid, namespace, event, data):
+                self.server._emit_internal(sid, event, data, namespace, None)
+
+
+class SQLiteManager(PubSubManager, OutboxManager):
+    """
+    Define a Socket.IO client manager sharing events through a SQLite file.
+    Every worker process appends the events it emits to one table and polls
+    the table for the events of all workers, so room broadcasts reach the
+    clients of every worker on one machine without an outside broker.
+
+    :attribute str path: The path of the SQLite file
+    :attribute float poll_interval: The seconds between polls of the table
+    :attribute float retention: The seconds an event is kept in the table
+    """
+    name: str = "sqlite"
+
+    def __init__(self,
+                 url: str = "sqlite:///socketio.sqlite",
+                 channel: str = "socketio",
+                 write_only: bool = False,
+                 logger=None,
+                 poll_interval: float = 0.02,
+                 retention: float = 60) -> None:
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path: str = url[len("sqlite:///"):]
+        self.poll_interval: float = poll_interval
+        self.retention: float = retention
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS socketio_event ("
+                               "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "channel TEXT NOT NULL, created REAL NOT NULL, "
+                               "payload BLOB NOT NULL)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_socketio_event_created "
+                "ON socketio_event (created)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Open a connection to the event table.
+        The transaction is committed and the connection closed on exit.
+
+        :param: None
+
+        :return: A SQLite connection
+        """
+        connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5)
+
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _publish(self, data: dict) -> None:
+        """
+        Append an event to the table and drop the expired ones.
+
+        :param dict data: The event
+
+        :return: None
+        """
+        now: float = time.time()
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO socketio_event (channel, created, payload) "
+                "VALUES (?, ?, ?)", (self.channel, now, pickle.dumps(data)))
+            connection.execute("DELETE FROM socketio_event WHERE created < ?",
+                               (now - self.retention, ))
+
+    def _listen(self) -> Iterator[bytes]:
+        """
+        Yield the events appended by any worker after the listener started.
+
+        :param: None
+
+        :return: Iterator of the pickled events
+        """
+        with self._connect() as connection:
+            last_id: int = connection.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM socketio_event").fetchone(
+                )[0]
+
+        # Stop with the main thread, as the listener is not a daemon thread
+        while threading.main_thread().is_alive():
+            with self._connect() as connection:
+                rows: list = connection.execute(
+                    "SELECT id, payload FROM socketio_event "
+                    "WHERE id > ? AND channel = ? ORDER BY id",
+                    (last_id, self.channel)).fetchall()
+
+            for event_id, payload in rows:
+                last_id = event_id
+
+                yield payload
+
+            if len(rows) == 0:
+                self.server.sleep(self.poll_interval)
+
+
+# Define the client managers by message queue URL scheme
+MANAGERS: dict = {
+    "sqlite": SQLiteManager,
+    "redis": RedisManager,
+    "rediss": RedisManager,
+    "kafka": KafkaManager,
+    "zmq": ZmqManager
+}
+
+
+def client_manager(url: Union[str, None],
+                   channel: str = "socketio",
+                   write_only: bool = False) -> OutboxManager:
+    """
+    Create the client manager of a message queue URL.
+    Unknown schemes are left to Kombu, like Flask-SocketIO does. Every
+    manager delivers events through the chat throttle.
+
+    :param Union[str, None] url: The message queue URL or None for one process
+    :param str channel: The channel shared by the workers
+    :param bool write_only: Whether the manager only emits events
+
+    :return: OutboxManager, a PubSubManager with a message queue
+    """
+    if url is None:
+        return OutboxManager()
+
+    manager: type = MANAGERS.get(url.split(":", 1)[0], KombuManager)
+
+    # Deliver the events received from the queue through the outboxes
+    if not issubclass(manager, OutboxManager):
+        manager = type(manager.__name__, (manager, OutboxManager), {})
+
+    return manager(url, channel=channel, write_only=write_only)
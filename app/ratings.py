@@ -0,0 +1,245 @@
+import bisect
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.sql.elements import ColumnElement
+from typing import Union
+
+from app import db
+from .ingest import insert_ignore
+from .models import Book, BookStats, SavedBook
+from .sentiment import score_review
+
+# Define the ratings at which a review rounds up to the next star
+STAR_BOUNDS: tuple = (1.5, 2.5, 3.5, 4.5)
+
+# Define the number of attempts at swapping a rating before giving up
+SWAP_ATTEMPTS: int = 5
+
+
+def star(rating: float) -> int:
+    """
+    Return the histogram bucket of a rating.
+
+    :param float rating: The rating between 0 and 5
+
+    :return: int of the star between 1 and 5
+    """
+    return 1 + bisect.bisect_right(STAR_BOUNDS, rating)
+
+
+def star_expression(rating: ColumnElement) -> ColumnElement:
+    """
+    Return the SQL expression of the histogram bucket of a rating column.
+    Mirrors star.
+
+    :param ColumnElement rating: The rating column
+
+    :return: ColumnElement of the star between 1 and 5
+    """
+    return case([(rating < bound, index + 1)
+                 for index, bound in enumerate(STAR_BOUNDS)],
+                else_=len(STAR_BOUNDS) + 1)
+
+
+def sync_books(book_ids: Union[list, None] = None) -> None:
+    """
+    Copy the average rating and the number of ratings of the stats rows to
+    the book rows.
+    The caller owns the transaction.
+
+    :param Union[list, None] book_ids: The books to update or None for all
+
+    :return: None
+    """
+    stats = BookStats.__table__
+    book = Book.__table__
+
+    count = select([stats.c.rating_count
+                    ]).where(stats.c.book_id == book.c.id).as_scalar()
+    average = select([
+        case([(stats.c.rating_count > 0,
+               stats.c.rating_sum / stats.c.rating_count)],
+             else_=0)
+    ]).where(stats.c.book_id == book.c.id).as_scalar()
+
+    statement = book.update().values(total_ratings=func.coalesce(count, 0),
+                                     average_rating=func.coalesce(average, 0))
+
+    if book_ids is not None:
+        statement = statement.where(book.c.id.in_(book_ids))
+
+    db.session.execute(statement)
+
+
+def apply_rating(book_id: int, old: Union[float, None],
+                 new: Union[float, None]) -> None:
+    """
+    Apply a rating change to the stats of a book with one atomic update.
+    A first rating adds a vote, a changed rating only moves the sum and the
+    histogram, and a removed rating takes the vote away.
+    The caller owns the transaction.
+
+    :param int book_id: The book ID
+    :param Union[float, None] old: The previous rating or None
+    :param Union[float, None] new: The new rating or None
+
+    :return: None
+    """
+    if old == new:
+        return
+
+    insert_ignore(BookStats.__table__, [{
+        "book_id": book_id,
+        "rating_sum": 0,
+        "rating_count": 0,
+        **{f"stars_{index}": 0
+           for index in range(1, 6)}
+    }])
+
+    stats = BookStats.__table__
+    values: dict = {
+        "rating_sum":
+        stats.c.rating_sum + (new or 0) - (old or 0),
+        "rating_count":
+        stats.c.rating_count + (new is not None) - (old is not None),
+        "updated":
+        func.now()
+    }
+
+    if old is not None:
+        column: str = f"stars_{star(old)}"
+        values[column] = stats.c[column] - 1
+
+    if new is not None:
+        column: str = f"stars_{star(new)}"
+        values[column] = values.get(column, stats.c[column]) + 1
+
+    db.session.execute(
+        stats.update().where(stats.c.book_id == book_id).values(values))
+
+    sync_books([book_id])
+
+
+def rate(saved_book: SavedBook, rating: Union[float, None],
+         review: Union[str, None]) -> None:
+    """
+    Store the review of a saved book and apply the rating change to the stats.
+    The rating is swapped with a compare-and-swap update, so concurrent
+    reviews of the same saved book each apply the difference to the rating
+    they replaced.
+    The rating component and sentiment used by matching are stored with it.
+    The caller owns the transaction.
+
+    :param SavedBook saved_book: The saved book
+    :param Union[float, None] rating: The new rating or None
+    :param Union[str, None] review: The new review or None
+
+    :return: None
+    """
+    table = SavedBook.__table__
+
+    # Score the review once, outside of the retries
+    rating_component, sentiment = score_review(rating, review)
+
+    for _ in range(SWAP_ATTEMPTS):
+        old: Union[float, None] = db.session.execute(
+            select([table.c.rating
+                    ]).where(table.c.id == saved_book.id)).scalar()
+
+        expected = table.c.rating.is_(
+            None) if old is None else table.c.rating == old
+
+        swapped: int = db.session.execute(table.update().where(
+            and_(table.c.id == saved_book.id,
+                 expected)).values(rating=rating,
+                                   review=review,
+                                   rating_component=rating_component,
+                                   sentiment=sentiment)).rowcount
+
+        if swapped == 1:
+            apply_rating(saved_book.book_id, old, rating)
+            db.session.expire(saved_book)
+
+            return
+
+    raise RuntimeError("The rating changed too often to update")
+
+
+def aggregate_stats(book_ids: Union[list, None] = None) -> dict:
+    """
+    Compute the stats of the books from their saved books.
+
+    :param Union[list, None] book_ids: The books to compute or None for all
+
+    :return: dict mapping book IDs to dicts of BookStats columns
+    """
+    table = SavedBook.__table__
+    bucket: ColumnElement = star_expression(table.c.rating)
+
+    statement = select([
+        table.c.book_id,
+        func.sum(table.c.rating).label("rating_sum"),
+        func.count(table.c.rating).label("rating_count"),
+        *(func.sum(case([(bucket == index, 1)],
+                        else_=0)).label(f"stars_{index}")
+          for index in range(1, 6))
+    ]).where(table.c.rating.isnot(None)).group_by(table.c.book_id)
+
+    if book_ids is not None:
+        statement = statement.where(table.c.book_id.in_(book_ids))
+
+    return {
+        row["book_id"]: dict(row)
+        for row in db.session.execute(statement).fetchall()
+    }
+
+
+def verify_stats() -> list:
+    """
+    Compare the stored stats with the stats computed from the saved books.
+
+    :param: None
+
+    :return: list of the IDs of the books whose stats differ
+    """
+    expected: dict = aggregate_stats()
+    stored: dict = {
+        stats.book_id: stats
+        for stats in BookStats.query.filter(BookStats.rating_count > 0)
+    }
+
+    columns: tuple = ("rating_count", *(f"stars_{index}"
+                                        for index in range(1, 6)))
+
+    return sorted(
+        book_id for book_id in set(expected) | set(stored)
+        if book_id not in expected or book_id not in stored or
+        abs(expected[book_id]["rating_sum"] -
+            stored[book_id].rating_sum) > 1e-6 or any(
+                expected[book_id][column] != getattr(stored[book_id], column)
+                for column in columns))
+
+
+def rebuild_stats(book_ids: Union[list, None] = None) -> int:
+    """
+    Replace the stored stats with the stats computed from the saved books.
+    The caller owns the transaction.
+
+    :param Union[list, None] book_ids: The books to rebuild or None for all
+
+    :return: int of the number of books with ratings
+    """
+    stats: dict = aggregate_stats(book_ids)
+    statement = BookStats.__table__.delete()
+
+    if book_ids is not None:
+        statement = statement.where(BookStats.book_id.in_(book_ids))
+
+    db.session.execute(statement)
+
+    if len(stats) != 0:
+        db.session.execute(BookStats.__table__.insert(), list(stats.values()))
+
+    sync_books(book_ids)
+
+    return len(stats)
@@ -0,0 +1,124 @@
+import heapq
+import threading
+import time
+
+from collections import Counter
+from flask import Flask
+from typing import Iterable
+
+
+class ReaderIndex:
+    """
+    Define an in-memory inverted index of the readers of every book.
+    Finding the users who share books with a reading list only touches the
+    readers of those books, whatever the size of the saved book table.
+    The index is rebuilt from the database once it is older than its TTL,
+    which picks up the books saved by other processes.
+
+    :attribute bool enabled: Whether matching uses the index
+    :attribute float ttl: The number of seconds before the index is rebuilt
+
+    :method init_app: Configure the index from a Flask app
+    :method rebuild: Replace the index with the given saved books
+    :method add: Record that a user saved a book
+    :method discard: Record that a user no longer has a book
+    :method shared_readers: Return the users sharing the most books
+    """
+    def __init__(self, enabled: bool = False, ttl: float = 300) -> None:
+        self.enabled: bool = enabled
+        self.ttl: float = ttl
+        self._readers: dict = {}
+        self._built: float = float("-inf")
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(readers) for readers in self._readers.values())
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self._built > self.ttl
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the index with the MATCH_READER_INDEX* settings of an app.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.enabled = app.config["MATCH_READER_INDEX"]
+            self.ttl = app.config["MATCH_READER_INDEX_TTL"]
+            self._readers = {}
+            self._built = float("-inf")
+
+        app.extensions["reader_index"] = self
+
+    def rebuild(self, pairs: Iterable[tuple]) -> None:
+        """
+        Replace the index with the given saved books.
+
+        :param Iterable[tuple] pairs: The (book ID, user ID) pairs
+
+        :return: None
+        """
+        readers: dict = {}
+
+        for book_id, user_id in pairs:
+            readers.setdefault(book_id, set()).add(user_id)
+
+        with self._lock:
+            self._readers = readers
+            self._built = time.monotonic()
+
+    def add(self, book_id: int, user_id: int) -> None:
+        """
+        Record that a user saved a book.
+
+        :param int book_id: The book ID
+        :param int user_id: The user ID
+
+        :return: None
+        """
+        with self._lock:
+            self._readers.setdefault(book_id, set()).add(user_id)
+
+    def discard(self, book_id: int, user_id: int) -> None:
+        """
+        Record that a user no longer has a book.
+
+        :param int book_id: The book ID
+        :param int user_id: The user ID
+
+        :return: None
+        """
+        with self._lock:
+            readers: set = self._readers.get(book_id, set())
+            readers.discard(user_id)
+
+            if len(readers) == 0:
+                self._readers.pop(book_id, None)
+
+    def shared_readers(self, user_id: int, book_ids: list, limit: int) -> list:
+        """
+        Return the users sharing the most books with a reading list.
+        Ties are broken by the lowest user ID, like the SQL candidate query.
+
+        :param int user_id: The user ID, left out of the result
+        :param list book_ids: The book IDs of the reading list
+        :param int limit: The maximum number of users
+
+        :return: list of the user IDs, most shared books first
+        """
+        overlap: Counter = Counter()
+
+        with self._lock:
+            for book_id in set(book_ids):
+                overlap.update(self._readers.get(book_id, ()))
+
+        overlap.pop(user_id, None)
+
+        return [
+            reader for reader, _ in heapq.nsmallest(
+                limit, overlap.items(), key=lambda item: (-item[1], item[0]))
+        ]
@@ -0,0 +1,360 @@
+import numpy as np
+
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.orm import aliased, joinedload
+from typing import Iterator
+
+from app import db, reader_index, taste_index
+from .models import MatchScore, SavedBook, book_category
+from .scoring import build_features, score
+
+# Define the rating component of an unrated book in a taste vector
+NEUTRAL_RATING: float = 0.6
+
+
+def find_candidates(user_id: int, book_ids: list, limit: int) -> list:
+    """
+    Find the users sharing the most books with a reading list.
+    Uses the in-memory reader index when enabled and a single aggregate query
+    otherwise.
+
+    :param int user_id: The user ID
+    :param list book_ids: The book IDs of the user's reading list
+    :param int limit: The maximum number of candidates
+
+    :return: list of the user IDs, most shared books first
+    """
+    if len(book_ids) == 0:
+        return []
+
+    if reader_index.enabled:
+        if reader_index.stale:
+            reader_index.rebuild(
+                db.session.execute(
+                    select([SavedBook.book_id, SavedBook.user_id])).fetchall())
+
+        return reader_index.shared_readers(user_id, book_ids, limit)
+
+    reading_list = aliased(SavedBook)
+    overlap = func.count().label("overlap")
+
+    query = db.session.query(SavedBook.user_id, overlap).join(
+        reading_list,
+        and_(reading_list.book_id == SavedBook.book_id,
+             reading_list.user_id == user_id,
+             reading_list.to_be_read.is_(True)))
+
+    return [
+        row[0] for row in query.filter(
+            SavedBook.user_id != user_id).group_by(SavedBook.user_id).order_by(
+                overlap.desc(), SavedBook.user_id).limit(limit)
+    ]
+
+
+def write_scores(user_id: int,
+                 candidate_ids: list,
+                 replace: bool = False) -> int:
+    """
+    Score candidates for a user and store the scores.
+    Candidates no longer sharing a book with the reading list lose their score.
+
+    :param int user_id: The user ID
+    :param list candidate_ids: The user IDs of the candidates
+    :param bool replace: Whether to drop every other score of the user
+
+    :return: int of the number of scores stored
+    """
+    reading_list: list = SavedBook.query.filter_by(user_id=user_id,
+                                                   to_be_read=True).all()
+    book_ids: list = [book.book_id for book in reading_list]
+
+    co_readers: list = []
+
+    if len(book_ids) != 0 and len(candidate_ids) != 0:
+        co_readers = SavedBook.query.filter(
+            SavedBook.book_id.in_(book_ids),
+            SavedBook.user_id.in_(candidate_ids)).all()
+
+    friend_books: dict = {(co_reader.book_id, co_reader.user_id): co_reader
+                          for co_reader in co_readers}
+    sharing: list = [
+        candidate_id for candidate_id in dict.fromkeys(candidate_ids)
+        if any((book_id, candidate_id) in friend_books for book_id in book_ids)
+    ]
+
+    stale = MatchScore.query.filter_by(user_id=user_id)
+
+    if not replace:
+        stale = stale.filter(MatchScore.candidate_id.in_(candidate_ids))
+
+    stale.delete(synchronize_session=False)
+
+    if len(sharing) == 0:
+        return 0
+
+    scores: np.ndarray = score(
+        *build_features(reading_list, sharing, friend_books))
+
+    db.session.execute(MatchScore.__table__.insert(), [
+        dict(user_id=user_id, candidate_id=candidate_id, score=value)
+        for candidate_id, value in zip(sharing, scores.tolist())
+    ])
+
+    return len(sharing)
+
+
+def refresh_user(user_id: int) -> int:
+    """
+    Recompute every score of a user from their reading list.
+
+    :param int user_id: The user ID
+
+    :return: int of the number of scores stored
+    """
+    book_ids: list = [
+        row[0] for row in db.session.query(SavedBook.book_id).filter_by(
+            user_id=user_id, to_be_read=True)
+    ]
+
+    return write_scores(
+        user_id,
+        find_candidates(user_id, book_ids,
+                        current_app.config["MATCH_CANDIDATES"]),
+        replace=True)
+
+
+def refresh_scores(changes: list) -> None:
+    """
+    Recompute the scores affected by changed saved books and commit.
+    The user who changed a saved book is rescored in full, and each reader
+    with the book on their reading list is rescored against that user only.
+    The taste vectors of the users are updated when the taste index is used.
+
+    :param list changes: The (user ID, book ID) pairs of the changed saved books
+
+    :return: None
+    """
+    users: set = {user_id for user_id, _ in changes}
+    pairs: dict = {}
+
+    for user_id in users:
+        refresh_user(user_id)
+
+    readers: list = db.session.query(
+        SavedBook.user_id, SavedBook.book_id).filter(
+            SavedBook.book_id.in_({book_id
+                                   for _, book_id in changes}),
+            SavedBook.to_be_read.is_(True)).all()
+
+    for reader_id, book_id in readers:
+        for user_id, changed_book_id in changes:
+            if changed_book_id == book_id and reader_id not in users:
+                pairs.setdefault(reader_id, set()).add(user_id)
+
+    for reader_id, candidate_ids in pairs.items():
+        write_scores(reader_id, sorted(candidate_ids))
+
+    db.session.commit()
+
+    refresh_tastes(sorted(users))
+
+
+def rebuild_scores(batch_size: int = 100) -> Iterator[int]:
+    """
+    Recompute the scores of every user with a reading list.
+    Each batch of users is committed.
+
+    :param int batch_size: The number of users per transaction
+
+    :return: Iterator of the number of users scored so far
+    """
+    last_id: int = 0
+    scored: int = 0
+
+    # Drop the scores of users who emptied their reading list
+    MatchScore.query.filter(~exists().where(
+        and_(SavedBook.user_id == MatchScore.user_id,
+             SavedBook.to_be_read.is_(True)))).delete(
+                 synchronize_session=False)
+    db.session.commit()
+
+    while True:
+        user_ids: list = [
+            row[0] for row in db.session.query(SavedBook.user_id).filter(
+                SavedBook.user_id > last_id, SavedBook.to_be_read.is_(
+                    True)).group_by(SavedBook.user_id).order_by(
+                        SavedBook.user_id).limit(batch_size)
+        ]
+
+        if len(user_ids) == 0:
+            break
+
+        for user_id in user_ids:
+            refresh_user(user_id)
+
+        db.session.commit()
+
+        last_id = user_ids[-1]
+        scored += len(user_ids)
+
+        yield scored
+
+
+def stale_scores() -> tuple:
+    """
+    Count the scores computed before a saved book they depend on changed.
+    A score depends on every saved book of its user and on the candidate's
+    saved books of the user's reading list.
+
+    :param: None
+
+    :return: tuple of the number of stale scores and the age in seconds of the oldest
+    """
+    changed = aliased(SavedBook)
+    reading_list = aliased(SavedBook)
+
+    on_reading_list = exists().where(
+        and_(reading_list.user_id == MatchScore.user_id,
+             reading_list.book_id == changed.book_id,
+             reading_list.to_be_read.is_(True)))
+
+    stale = exists().where(
+        and_(
+            changed.updated > MatchScore.updated,
+            or_(
+                changed.user_id == MatchScore.user_id,
+                and_(changed.user_id == MatchScore.candidate_id,
+                     on_reading_list))))
+
+    count, oldest = db.session.query(func.count(), func.min(
+        MatchScore.updated)).filter(stale).one()
+
+    if oldest is None:
+        return 0, 0.0
+
+    now: datetime = datetime.now(
+        timezone.utc) if oldest.tzinfo else datetime.utcnow()
+
+    return count, max((now - oldest).total_seconds(), 0.0)
+
+
+def taste_vectors(user_ids: list, dimensions: int) -> np.ndarray:
+    """
+    Aggregate the taste vectors of users from their saved books.
+    The first two dimensions hold the mean rating component and sentiment
+    of the user's reviews. The rest hold the categories of the saved books,
+    hashed by ID and weighted by how much the user liked each book.
+
+    :param list user_ids: The user IDs
+    :param int dimensions: The length of a taste vector
+
+    :return: np.ndarray of the (users x dimensions) vectors
+    """
+    rows: dict = {user_id: row for row, user_id in enumerate(user_ids)}
+    vectors: np.ndarray = np.zeros((len(user_ids), dimensions),
+                                   dtype=np.float32)
+
+    if len(user_ids) == 0:
+        return vectors
+
+    for user_id, rating_component, sentiment in db.session.query(
+            SavedBook.user_id, func.avg(SavedBook.rating_component),
+            func.avg(SavedBook.sentiment)).filter(
+                SavedBook.user_id.in_(user_ids)).group_by(SavedBook.user_id):
+        vectors[rows[user_id], :2] = (rating_component or 0, sentiment or 0)
+
+    genres: list = db.session.query(
+        SavedBook.user_id, book_category.c.category_id,
+        SavedBook.rating_component, SavedBook.sentiment).join(
+            book_category,
+            book_category.c.book_id == SavedBook.book_id).filter(
+                SavedBook.user_id.in_(user_ids)).all()
+
+    if len(genres) != 0:
+        user_column, category_column, rating_components, sentiments = (
+            np.array(column, dtype=np.float64) for column in zip(*genres))
+
+        # Unrated books count as neutral, disliked books count for nothing
+        weights: np.ndarray = np.clip(
+            1 + np.nan_to_num(sentiments) +
+            np.nan_to_num(rating_components, nan=NEUTRAL_RATING) -
+            NEUTRAL_RATING, 0, None)
+
+        categories: np.ndarray = np.zeros_like(vectors[:, 2:])
+        np.add.at(categories,
+                  (np.array([rows[int(user_id)] for user_id in user_column]),
+                   category_column.astype(np.int64) % (dimensions - 2)),
+                  weights)
+
+        lengths: np.ndarray = np.linalg.norm(categories, axis=1, keepdims=True)
+        vectors[:, 2:] = categories / np.where(lengths == 0, 1, lengths)
+
+    return vectors
+
+
+def build_taste_index(batch_size: int = 1000) -> Iterator[int]:
+    """
+    Rebuild the taste index from every user with saved books.
+    The vectors are aggregated in batches of users.
+
+    :param int batch_size: The number of users per batch
+
+    :return: Iterator of the number of users aggregated so far
+    """
+    last_id: int = 0
+    user_ids: list = []
+    batches: list = []
+
+    while True:
+        batch: list = [
+            row[0] for row in db.session.query(SavedBook.user_id).filter(
+                SavedBook.user_id > last_id).group_by(SavedBook.user_id).
+            order_by(SavedBook.user_id).limit(batch_size)
+        ]
+
+        if len(batch) == 0:
+            break
+
+        batches.append(taste_vectors(batch, taste_index.dimensions))
+        user_ids += batch
+        last_id = batch[-1]
+
+        yield len(user_ids)
+
+    taste_index.build(
+        user_ids,
+        np.concatenate(batches) if len(batches) != 0 else np.empty(
+            (0, taste_index.dimensions)))
+
+
+def refresh_tastes(user_ids: list) -> None:
+    """
+    Update the taste vectors of users in a loaded taste index.
+
+    :param list user_ids: The user IDs
+
+    :return: None
+    """
+    if len(taste_index) == 0:
+        return
+
+    for user_id, vector in zip(user_ids,
+                               taste_vectors(user_ids,
+                                             taste_index.dimensions)):
+        taste_index.update(user_id, vector)
+
+
+def top_matches(user_id: int, limit: int) -> list:
+    """
+    Read the best scored candidates of a user.
+
+    :param int user_id: The user ID
+    :param int limit: The maximum number of candidates
+
+    :return: list of MatchScore instances with their candidates loaded
+    """
+    return MatchScore.query.options(joinedload(
+        MatchScore.candidate)).filter_by(user_id=user_id).order_by(
+            MatchScore.score, MatchScore.candidate_id).limit(limit).all()
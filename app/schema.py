@@ -0,0 +1,48 @@
+import os
+
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import Flask
+from typing import Union
+
+from app import db
+
+# Define the Alembic migration environment shipped with the application
+MIGRATIONS_PATH: str = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+def schema_revisions(app: Flask) -> tuple:
+    """
+    Return the migration revision of the database and the latest revision.
+
+    :param Flask app: A Flask app instance
+
+    :return: tuple of the current revision or None and the head revision
+    """
+    head: str = ScriptDirectory(MIGRATIONS_PATH).get_current_head()
+
+    with app.app_context(), db.engine.connect() as connection:
+        current: Union[str, None] = MigrationContext.configure(
+            connection).get_current_revision()
+
+    return current, head
+
+
+def check_schema(app: Flask) -> bool:
+    """
+    Check that the database has every migration applied.
+    Nothing is created or dropped, an outdated schema is only reported.
+
+    :param Flask app: A Flask app instance
+
+    :return: True or False on if the schema is up to date
+    """
+    current, head = schema_revisions(app)
+
+    if current != head:
+        app.logger.warning(
+            "The database schema is at revision %s but the application "
+            "expects %s. Run 'flask db upgrade' to migrate it.", current, head)
+
+    return current == head
@@ -0,0 +1,93 @@
+import numpy as np
+
+from typing import Union
+
+from .models import SavedBook
+
+# Define the angle of a book either user has not reviewed
+MISSING_ANGLE: float = 1.0
+
+
+def quantify_vector(saved_book: SavedBook) -> Union[tuple, None]:
+    """
+    Quantify the review of a saved book from its stored scores.
+
+    :param SavedBook saved_book: The saved book
+
+    :return: tuple of the rating component and shifted polarity or None if unscored
+    """
+    if saved_book.rating_component is None or saved_book.sentiment is None:
+        return None
+
+    return (saved_book.rating_component, saved_book.sentiment + 1)
+
+
+def build_features(reading_list: list, candidate_ids: list,
+                   saved_books: dict) -> tuple:
+    """
+    Build the review features of a user and their candidates.
+    Books a user has not reviewed are filled with NaN.
+
+    :param list reading_list: The SavedBook instances of the user
+    :param list candidate_ids: The candidate user IDs
+    :param dict saved_books: Maps (book ID, user ID) to the candidate SavedBook
+
+    :return: tuple of the (books x 2) user and (books x candidates x 2) candidate arrays
+    """
+    user: np.ndarray = np.full((len(reading_list), 2), np.nan)
+    candidates: np.ndarray = np.full(
+        (len(reading_list), len(candidate_ids), 2), np.nan)
+
+    for row, book in enumerate(reading_list):
+        vector: Union[tuple, None] = quantify_vector(book)
+
+        if vector is None:
+            continue
+
+        user[row] = vector
+
+        for column, candidate_id in enumerate(candidate_ids):
+            saved_book: Union[SavedBook, None] = saved_books.get(
+                (book.book_id, candidate_id), None)
+
+            if saved_book is not None:
+                vector = quantify_vector(saved_book)
+
+                if vector is not None:
+                    candidates[row, column] = vector
+
+    return user, candidates
+
+
+def angles(user: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Calculate the theta difference of every book and candidate at once.
+    Missing reviews and zero vectors get MISSING_ANGLE.
+
+    :param np.ndarray user: The (books x 2) user features
+    :param np.ndarray candidates: The (books x candidates x 2) candidate features
+
+    :return: np.ndarray of the (books x candidates) angles
+    """
+    dot: np.ndarray = np.einsum("bk,bck->bc", user, candidates)
+    lengths: np.ndarray = np.linalg.norm(
+        user, axis=-1)[:, np.newaxis] * np.linalg.norm(candidates, axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Clamp rounding errors of parallel vectors into the domain of arccos
+        theta: np.ndarray = np.arccos(np.clip(dot / lengths, -1.0, 1.0))
+
+    return np.where(np.isfinite(theta), theta, MISSING_ANGLE)
+
+
+def score(user: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Score the candidates by their summed theta difference over the books.
+    Lower scores are closer matches.
+
+    :param np.ndarray user: The (books x 2) user features
+    :param np.ndarray candidates: The (books x candidates x 2) candidate features
+
+    :return: np.ndarray of the scores per candidate
+    """
+    return angles(user, candidates).sum(axis=0)
@@ -0,0 +1,179 @@
+import re
+
+from sqlalchemy import DDL, event, literal_column, or_, text
+from sqlalchemy.sql.expression import ColumnClause
+
+from app import db
+from .models import Book
+
+# Define the weights of bookname, author, description and categories
+BM25_WEIGHTS: str = "10.0, 5.0, 1.0, 2.0"
+
+# Define the Postgres document expression shared by the index and the query
+SEARCH_DOCUMENT: str = (
+    "to_tsvector('english', coalesce(bookname, '') || ' ' || "
+    "coalesce(author, '') || ' ' || coalesce(description, '') || ' ' || "
+    "coalesce(categories, ''))")
+
+SQLITE_DDL: tuple = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5("
+    "bookname, author, description, categories, "
+    "content='book', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_insert AFTER INSERT ON book BEGIN "
+    "INSERT INTO book_fts(rowid, bookname, author, description, categories) "
+    "VALUES (new.id, new.bookname, new.author, new.description, "
+    "new.categories); END",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_delete AFTER DELETE ON book BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, bookname, author, description, "
+    "categories) VALUES ('delete', old.id, old.bookname, old.author, "
+    "old.description, old.categories); END",
+    # Replace the trigger of databases indexed before it was narrowed
+    "DROP TRIGGER IF EXISTS book_fts_update",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_update AFTER UPDATE OF "
+    "bookname, author, description, categories ON book BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, bookname, author, description, "
+    "categories) VALUES ('delete', old.id, old.bookname, old.author, "
+    "old.description, old.categories); "
+    "INSERT INTO book_fts(rowid, bookname, author, description, categories) "
+    "VALUES (new.id, new.bookname, new.author, new.description, "
+    "new.categories); END",
+)
+
+POSTGRESQL_DDL: tuple = (
+    f"CREATE INDEX IF NOT EXISTS ix_book_search ON book USING GIN ({SEARCH_DOCUMENT})",
+)
+
+
+def fts5_available(ddl: DDL, target: object, bind: object, **kwargs) -> bool:
+    """
+    Check whether the SQLite library was compiled with FTS5.
+
+    :param DDL ddl: The DDL being executed
+    :param object target: The table the DDL is attached to
+    :param object bind: The connection executing the DDL
+
+    :return: True or False on if FTS5 is available
+    """
+    return bind.dialect.name == "sqlite" and bind.execute(
+        text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar() == 1
+
+
+for statement in SQLITE_DDL:
+    event.listen(Book.__table__, "after_create",
+                 DDL(statement).execute_if(callable_=fts5_available))
+
+for statement in POSTGRESQL_DDL:
+    event.listen(Book.__table__, "after_create",
+                 DDL(statement).execute_if(dialect="postgresql"))
+
+event.listen(Book.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS book_fts").execute_if(dialect="sqlite"))
+
+# Define whether each engine has the full-text table
+fts_tables: dict = {}
+
+
+def forget_fts_table(target: object, bind: object, **kwargs) -> None:
+    """
+    Forget whether an engine has the full-text table when the book table is
+    created or dropped.
+
+    :param object target: The book table
+    :param object bind: The connection creating or dropping it
+
+    :return: None
+    """
+    fts_tables.pop(bind.engine, None)
+
+
+event.listen(Book.__table__, "after_create", forget_fts_table)
+event.listen(Book.__table__, "after_drop", forget_fts_table)
+
+
+def has_fts_table() -> bool:
+    """
+    Check whether the SQLite full-text table exists.
+    The answer is looked up once per engine.
+
+    :param: None
+
+    :return: True or False on if the book_fts table exists
+    """
+    engine = db.session.get_bind()
+
+    if engine not in fts_tables:
+        fts_tables[engine] = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'book_fts'")
+        ).scalar() is not None
+
+    return fts_tables[engine]
+
+
+def search_books(query: str, limit: int = 10) -> list:
+    """
+    Search the books by title, author, description and categories.
+    Results are ranked by relevance.
+
+    :param str query: The search query
+    :param int limit: The maximum number of results
+
+    :return: list of Book instances
+    """
+    tokens: list = re.findall(r"\w+", query.lower())
+
+    if len(tokens) == 0:
+        return []
+
+    dialect: str = db.session.get_bind().dialect.name
+
+    if dialect == "sqlite" and has_fts_table():
+        match: str = " ".join(f'"{token}"*' for token in tokens)
+
+        return Book.query.from_statement(
+            text("SELECT book.* FROM book "
+                 "JOIN book_fts ON book_fts.rowid = book.id "
+                 "WHERE book_fts MATCH :match "
+                 f"ORDER BY bm25(book_fts, {BM25_WEIGHTS}) "
+                 "LIMIT :limit")).params(match=match, limit=limit).all()
+
+    if dialect == "postgresql":
+        document: ColumnClause = literal_column(SEARCH_DOCUMENT)
+        tsquery = db.func.plainto_tsquery("english", " ".join(tokens))
+
+        return Book.query.filter(document.op("@@")(tsquery)).order_by(
+            db.func.ts_rank(document, tsquery).desc()).limit(limit).all()
+
+    pattern: str = f"%{query.strip()}%"
+
+    return Book.query.filter(
+        or_(Book.bookname.ilike(pattern), Book.author.ilike(pattern),
+            Book.description.ilike(pattern),
+            Book.categories.ilike(pattern))).limit(limit).all()
+
+
+def rebuild_index() -> None:
+    """
+    Rebuild the full-text index from the book table.
+    Creates the index first for databases created before it existed.
+
+    :param: None
+
+    :return: None
+    """
+    connection = db.session.connection()
+
+    if connection.dialect.name == "sqlite":
+        if not fts5_available(None, Book.__table__, connection):
+            return
+
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+
+        connection.execute(
+            text("INSERT INTO book_fts(book_fts) VALUES ('rebuild')"))
+        fts_tables.pop(connection.engine, None)
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+
+    db.session.commit()
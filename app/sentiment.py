@@ -0,0 +1,106 @@
+import itertools
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_, bindparam, select
+from textblob import TextBlob
+from typing import Iterator, Union
+
+from app import db
+from .models import SavedBook
+
+# Define the weight of a rating in the taste vector of a review
+RATING_WEIGHT: float = 0.2
+
+
+def polarity(review: str) -> float:
+    """
+    Analyze the sentiment polarity of a review.
+
+    :param str review: The review text
+
+    :return: float between -1 and 1
+    """
+    return TextBlob(review).sentiment.polarity
+
+
+def score_review(rating: Union[float, None], review: Union[str,
+                                                           None]) -> tuple:
+    """
+    Compute the stored rating component and sentiment of a review.
+
+    :param Union[float, None] rating: The rating between 0 and 5
+    :param Union[str, None] review: The review text
+
+    :return: tuple of the rating component and the polarity, each may be None
+    """
+    return (rating * RATING_WEIGHT if rating is not None else None,
+            polarity(review) if review is not None else None)
+
+
+def score_batch(reviews: list) -> list:
+    """
+    Analyze the sentiment polarity of a batch of reviews.
+    Runs in the worker processes of backfill_sentiment.
+
+    :param list reviews: The review texts
+
+    :return: list of the polarities
+    """
+    return [polarity(review) for review in reviews]
+
+
+def backfill_sentiment(batch_size: int = 500,
+                       workers: Union[int, None] = None) -> Iterator[int]:
+    """
+    Score the saved reviews stored before their scores were.
+    Each batch is analyzed in parallel by a process pool and committed.
+
+    :param int batch_size: The number of reviews per transaction
+    :param Union[int, None] workers: The number of processes, one per CPU if None
+
+    :return: Iterator of the number of reviews scored so far
+    """
+    table = SavedBook.__table__
+    statement = table.update().where(table.c.id == bindparam("saved_book_id"))
+
+    workers = workers or os.cpu_count() or 1
+    last_id: int = 0
+    scored: int = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            rows: list = db.session.execute(
+                select([table.c.id, table.c.rating, table.c.review]).where(
+                    and_(table.c.id > last_id, table.c.review.isnot(None),
+                         table.c.sentiment.is_(None))).order_by(
+                             table.c.id).limit(batch_size)).fetchall()
+
+            if len(rows) == 0:
+                break
+
+            # Split the batch evenly between the processes
+            size: int = -(-len(rows) // workers)
+            chunks: list = [[row[2] for row in rows[start:start + size]]
+                            for start in range(0, len(rows), size)]
+
+            polarities: Iterator[float] = itertools.chain.from_iterable(
+                executor.map(score_batch, chunks))
+
+            values: list = []
+
+            for (saved_book_id, rating, _), sentiment in zip(rows, polarities):
+                rating_component, _ = score_review(rating, None)
+
+                values.append(
+                    dict(saved_book_id=saved_book_id,
+                         rating_component=rating_component,
+                         sentiment=sentiment))
+
+            db.session.execute(statement, values)
+            db.session.commit()
+
+            last_id = rows[-1][0]
+            scored += len(rows)
+
+            yield scored
@@ -0,0 +1,372 @@
+import os
+import threading
+
+import numpy as np
+
+from flask import Flask
+from typing import Iterable, Union
+
+
+class TasteIndex:
+    """
+    Define an approximate nearest neighbour index of user taste vectors.
+    Vectors are unit length float32 rows of one array, so similarity is a dot
+    product. Random hyperplane hashing puts similar vectors in the same
+    buckets of several tables, and a query only ranks the users found in its
+    buckets and the buckets one bit away.
+
+    :attribute int dimensions: The length of a taste vector
+    :attribute int tables: The number of hash tables
+    :attribute int bits: The number of hyperplanes per table
+    :attribute Union[str, None] path: The file the index is loaded from
+
+    :method init_app: Configure the index from a Flask app
+    :method build: Replace the index with the given vectors
+    :method update: Insert or replace the vector of a user
+    :method vector: Return the vector of a user
+    :method query: Return the users most similar to a vector
+    :method exact: Return the users most similar to a vector by brute force
+    :method similar: Return the users most similar to a user
+    :method save: Write the index to a file
+    :method load: Read the index from a file
+    """
+    def __init__(self,
+                 dimensions: int = 32,
+                 tables: int = 8,
+                 bits: int = 12,
+                 seed: int = 0) -> None:
+        self.dimensions: int = dimensions
+        self.tables: int = tables
+        self.bits: int = bits
+        self.seed: int = seed
+        self.path: Union[str, None] = None
+        self._loaded: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self._reset()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+
+        return self._size
+
+    def __contains__(self, user_id: int) -> bool:
+        self._ensure_loaded()
+
+        return user_id in self._rows
+
+    def _reset(self) -> None:
+        """
+        Empty the index and draw its hyperplanes.
+
+        :param: None
+
+        :return: None
+        """
+        generator: np.random.Generator = np.random.default_rng(self.seed)
+
+        self._planes: np.ndarray = generator.standard_normal(
+            (self.tables, self.bits, self.dimensions)).astype(np.float32)
+        self._weights: np.ndarray = np.left_shift(1, np.arange(self.bits))
+        self._user_ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self._vectors: np.ndarray = np.empty((0, self.dimensions),
+                                             dtype=np.float32)
+        self._codes: np.ndarray = np.empty((0, self.tables), dtype=np.int64)
+        self._size: int = 0
+        self._rows: dict = {}
+        self._buckets: list = [{} for _ in range(self.tables)]
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the index with the TASTE_* settings of an app.
+        The index file is loaded on first use.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.dimensions = app.config["TASTE_DIMENSIONS"]
+            self.tables = app.config["TASTE_INDEX_TABLES"]
+            self.bits = app.config["TASTE_INDEX_BITS"]
+            self.path = app.config["TASTE_INDEX_PATH"]
+            self._loaded = False
+            self._reset()
+
+        app.extensions["taste_index"] = self
+
+    def _ensure_loaded(self) -> None:
+        """
+        Load the index file the first time the index is used.
+
+        :param: None
+
+        :return: None
+        """
+        if self._loaded:
+            return
+
+        with self._lock:
+            self._loaded = True
+
+        if self.path is not None and os.path.exists(self.path):
+            self.load(self.path)
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Scale vectors to unit length, leaving zero vectors as they are.
+
+        :param np.ndarray vectors: The vectors, one per row
+
+        :return: np.ndarray of float32 unit vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        lengths: np.ndarray = np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+        return vectors / np.where(lengths == 0, 1, lengths)
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Compute the bucket of each vector in each table.
+
+        :param np.ndarray vectors: The (n x dimensions) vectors
+
+        :return: np.ndarray of the (n x tables) bucket codes
+        """
+        signs: np.ndarray = np.einsum("nd,tbd->ntb", vectors, self._planes) > 0
+
+        return (signs * self._weights).sum(axis=-1)
+
+    def build(self, user_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """
+        Replace the index with the given vectors.
+
+        :param Iterable[int] user_ids: The user IDs
+        :param np.ndarray vectors: The (users x dimensions) taste vectors
+
+        :return: None
+        """
+        user_ids = np.asarray(list(user_ids), dtype=np.int64)
+        vectors = self.normalize(vectors).reshape(-1, self.dimensions)
+        codes: np.ndarray = self._hash(vectors)
+
+        buckets: list = []
+
+        for table in range(self.tables):
+            order: np.ndarray = np.argsort(codes[:, table], kind="stable")
+            keys, starts = np.unique(codes[order, table], return_index=True)
+
+            buckets.append(
+                dict(zip(keys.tolist(), np.split(order, starts[1:]))))
+
+        with self._lock:
+            self._loaded = True
+            self._user_ids = user_ids
+            self._vectors = vectors
+            self._codes = codes
+            self._size = len(user_ids)
+            self._rows = {
+                user_id: row
+                for row, user_id in enumerate(user_ids.tolist())
+            }
+            self._buckets = buckets
+
+    def update(self, user_id: int, vector: np.ndarray) -> None:
+        """
+        Insert or replace the vector of a user.
+
+        :param int user_id: The user ID
+        :param np.ndarray vector: The taste vector
+
+        :return: None
+        """
+        self._ensure_loaded()
+
+        vector = self.normalize(vector).reshape(1, self.dimensions)
+        codes: np.ndarray = self._hash(vector)
+
+        with self._lock:
+            row: Union[int, None] = self._rows.get(user_id, None)
+
+            if row is None:
+                # Double the capacity so appends copy the arrays rarely
+                if self._size == len(self._user_ids):
+                    capacity: int = max(2 * self._size, 16)
+
+                    self._user_ids = np.resize(self._user_ids, capacity)
+                    self._vectors = np.resize(self._vectors,
+                                              (capacity, self.dimensions))
+                    self._codes = np.resize(self._codes,
+                                            (capacity, self.tables))
+
+                row = self._size
+                self._size += 1
+                self._rows[user_id] = row
+                self._user_ids[row] = user_id
+                self._vectors[row] = vector
+                self._codes[row] = codes
+            else:
+                for table, code in enumerate(self._codes[row].tolist()):
+                    bucket: np.ndarray = self._buckets[table][code]
+                    self._buckets[table][code] = bucket[bucket != row]
+
+                self._vectors[row] = vector
+                self._codes[row] = codes
+
+            for table, code in enumerate(codes[0].tolist()):
+                self._buckets[table][code] = np.append(
+                    self._buckets[table].get(code, np.empty(0, dtype=np.intp)),
+                    row)
+
+    def vector(self, user_id: int) -> Union[np.ndarray, None]:
+        """
+        Return the vector of a user.
+
+        :param int user_id: The user ID
+
+        :return: np.ndarray or None if the user is not indexed
+        """
+        self._ensure_loaded()
+
+        row: Union[int, None] = self._rows.get(user_id, None)
+
+        return None if row is None else self._vectors[row]
+
+    def _rank(self, rows: np.ndarray, vector: np.ndarray, k: int,
+              exclude: Iterable[int]) -> list:
+        """
+        Rank the given rows by their similarity to a vector.
+
+        :param np.ndarray rows: The candidate rows
+        :param np.ndarray vector: The unit query vector
+        :param int k: The number of users
+        :param Iterable[int] exclude: The user IDs to leave out
+
+        :return: list of tuples of the user ID and similarity, most similar first
+        """
+        excluded: list = [
+            self._rows[user_id] for user_id in exclude if user_id in self._rows
+        ]
+        rows = np.setdiff1d(rows, excluded)
+
+        similarities: np.ndarray = self._vectors[rows] @ vector
+        k = min(k, len(rows))
+
+        if k == 0:
+            return []
+
+        best: np.ndarray = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best], kind="stable")]
+
+        return list(
+            zip(self._user_ids[rows[best]].tolist(),
+                similarities[best].tolist()))
+
+    def query(self,
+              vector: np.ndarray,
+              k: int = 10,
+              exclude: Iterable[int] = ()) -> list:
+        """
+        Return the users most similar to a vector among its buckets and the
+        buckets one bit away.
+
+        :param np.ndarray vector: The taste vector
+        :param int k: The number of users
+        :param Iterable[int] exclude: The user IDs to leave out
+
+        :return: list of tuples of the user ID and similarity, most similar first
+        """
+        self._ensure_loaded()
+
+        vector = self.normalize(vector).reshape(self.dimensions)
+        codes: list = self._hash(vector[np.newaxis])[0].tolist()
+
+        with self._lock:
+            found: list = [
+                self._buckets[table][probe] for table, code in enumerate(codes)
+                for probe in
+                [code, *(code ^ (1 << bit) for bit in range(self.bits))]
+                if probe in self._buckets[table]
+            ]
+
+            if len(found) == 0:
+                return []
+
+            return self._rank(np.unique(np.concatenate(found)), vector, k,
+                              exclude)
+
+    def exact(self,
+              vector: np.ndarray,
+              k: int = 10,
+              exclude: Iterable[int] = ()) -> list:
+        """
+        Return the users most similar to a vector by comparing every user.
+
+        :param np.ndarray vector: The taste vector
+        :param int k: The number of users
+        :param Iterable[int] exclude: The user IDs to leave out
+
+        :return: list of tuples of the user ID and similarity, most similar first
+        """
+        self._ensure_loaded()
+
+        vector = self.normalize(vector).reshape(self.dimensions)
+
+        with self._lock:
+            return self._rank(np.arange(self._size), vector, k, exclude)
+
+    def similar(self, user_id: int, k: int = 10) -> list:
+        """
+        Return the users most similar to a user.
+
+        :param int user_id: The user ID
+        :param int k: The number of users
+
+        :return: list of tuples of the user ID and similarity, most similar first
+        """
+        vector: Union[np.ndarray, None] = self.vector(user_id)
+
+        if vector is None or not vector.any():
+            return []
+
+        return self.query(vector, k, exclude=(user_id, ))
+
+    def save(self, path: str) -> None:
+        """
+        Write the vectors and hyperplanes to a file.
+        The file is written under a temporary name and then renamed so a
+        loading process never reads a partial index.
+
+        :param str path: The path of the .npz file
+
+        :return: None
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        temporary: str = f"{path}.tmp.npz"
+
+        with self._lock:
+            np.savez(temporary,
+                     user_ids=self._user_ids[:self._size],
+                     vectors=self._vectors[:self._size],
+                     planes=self._planes)
+
+        os.replace(temporary, path)
+
+    def load(self, path: str) -> None:
+        """
+        Read the vectors and hyperplanes from a file and rebuild the buckets.
+
+        :param str path: The path of the .npz file
+
+        :return: None
+        """
+        with np.load(path) as data:
+            planes: np.ndarray = data["planes"]
+
+            with self._lock:
+                self.tables, self.bits, self.dimensions = planes.shape
+                self._planes = planes
+                self._weights = np.left_shift(1, np.arange(self.bits))
+
+            self.build(data["user_ids"], data["vectors"])
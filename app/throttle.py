@@ -0,0 +1,269 @@
+import logging
+import threading
+import time
+
+from collections import deque
+from flask import Flask
+from typing import Union
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Define a token bucket refilled at a steady rate up to a burst size.
+
+    :attribute float rate: The tokens added per second
+    :attribute float burst: The maximum number of tokens
+
+    :method take: Take a token if one is left
+    """
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self._tokens: float = burst
+        self._updated: float = time.monotonic()
+
+    def take(self) -> bool:
+        """
+        Take a token if one is left.
+
+        :param: None
+
+        :return: bool of whether a token was taken
+        """
+        now: float = time.monotonic()
+
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+
+        return True
+
+
+class ChatThrottle:
+    """
+    Define the flow control of chat connections.
+    Inbound messages are capped in length and rate limited per connection
+    by a token bucket. Outbound events for a client whose engine.io queue is
+    backed up are held in a bounded outbox instead, dropping the oldest when
+    full, and sent as one batch event once the client catches up. One
+    flooding connection or slow reader then cannot hold up the rest of its
+    room. Dropped events are logged, and the counters are served by the
+    chat stats route.
+
+    :attribute float rate: The messages per second a connection may send
+    :attribute float burst: The messages a connection may send at once
+    :attribute int max_length: The maximum length of a message
+    :attribute int outbox_size: The maximum number of events held per client
+    :attribute int backlog: The queued packets after which a client is behind
+    :attribute float interval: The seconds between attempts to flush outboxes
+    :attribute int accepted: The number of messages let through
+    :attribute int throttled: The number of messages over the rate limit
+    :attribute int oversized: The number of messages over the length limit
+    :attribute int coalesced: The number of events held in outboxes
+    :attribute int dropped: The number of events pushed out of full outboxes
+
+    :method init_app: Configure the throttle from a Flask app
+    :method admit: Check an inbound message against the limits
+    :method hold: Hold an outbound event for a client that is behind
+    :method forget: Drop the state of a closed connection
+    :method stats: Return the throttle counters
+    """
+    def __init__(self,
+                 rate: float = 5,
+                 burst: float = 10,
+                 max_length: int = 2000,
+                 outbox_size: int = 100,
+                 backlog: int = 50,
+                 interval: float = 0.1) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.max_length: int = max_length
+        self.outbox_size: int = outbox_size
+        self.backlog: int = backlog
+        self.interval: float = interval
+        self.accepted: int = 0
+        self.throttled: int = 0
+        self.oversized: int = 0
+        self.coalesced: int = 0
+        self.dropped: int = 0
+        self._reported: int = 0
+        self._buckets: dict = {}
+        self._outboxes: dict = {}
+        self._flusher: Union[object, None] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the throttle with the CHAT_* settings of an app.
+
+        :param Flask app: A Flask app instance
+
+        :return: None
+        """
+        with self._lock:
+            self.rate = app.config["CHAT_RATE"]
+            self.burst = app.config["CHAT_BURST"]
+            self.max_length = app.config["CHAT_MAX_MESSAGE_LENGTH"]
+            self.outbox_size = app.config["CHAT_OUTBOX_SIZE"]
+            self.backlog = app.config["CHAT_OUTBOX_BACKLOG"]
+            self.interval = app.config["CHAT_OUTBOX_INTERVAL"]
+            self.accepted = self.throttled = self.oversized = 0
+            self.coalesced = self.dropped = self._reported = 0
+            self._buckets = {}
+            self._outboxes = {}
+
+        app.extensions["chat_throttle"] = self
+
+    def admit(self, sid: str, body: str) -> Union[str, None]:
+        """
+        Check an inbound message against the limits of its connection.
+
+        :param str sid: The session ID of the connection
+        :param str body: The message
+
+        :return: str of the reason the message is refused or None
+        """
+        if len(body) > self.max_length:
+            self.oversized += 1
+            return f"Messages are limited to {self.max_length} characters."
+
+        with self._lock:
+            bucket: Union[TokenBucket, None] = self._buckets.get(sid, None)
+
+            if bucket is None:
+                bucket = self._buckets[sid] = TokenBucket(
+                    self.rate, self.burst)
+
+            admitted: bool = bucket.take()
+
+        if not admitted:
+            self.throttled += 1
+            return "You are sending messages too quickly."
+
+        self.accepted += 1
+
+        return None
+
+    @staticmethod
+    def _pending(server, sid: str) -> int:
+        """
+        Count the packets queued for a client by engine.io.
+
+        :param server: The Socket.IO server
+        :param str sid: The session ID of the client
+
+        :return: int of the queued packets
+        """
+        socket = server.eio.sockets.get(sid, None)
+
+        return 0 if socket is None else socket.queue.qsize()
+
+    def hold(self, server, sid: str, namespace: str, event: str, data) -> bool:
+        """
+        Hold an outbound event for a client that is behind.
+        A client stays behind until its outbox is flushed, so its events
+        keep their order.
+
+        :param server: The Socket.IO server
+        :param str sid: The session ID of the client
+        :param str namespace: The namespace of the event
+        :param str event: The event name
+        :param data: The event data
+
+        :return: bool of whether the event was held
+        """
+        if self.outbox_size == 0:
+            return False
+
+        with self._lock:
+            outbox: Union[deque, None] = self._outboxes.get(sid, None)
+
+            if outbox is None:
+                if self._pending(server, sid) < self.backlog:
+                    return False
+
+                outbox = self._outboxes[sid] = deque(maxlen=self.outbox_size)
+
+            if len(outbox) == outbox.maxlen:
+                self.dropped += 1
+
+            outbox.append((namespace, event, data))
+            self.coalesced += 1
+
+            if self._flusher is None:
+                self._flusher = server.start_background_task(
+                    self._flush, server)
+
+        return True
+
+    def _flush(self, server) -> None:
+        """
+        Send the outboxes of the clients that caught up, one batch event per
+        namespace, until every outbox is empty.
+
+        :param server: The Socket.IO server
+
+        :return: None
+        """
+        while True:
+            server.sleep(self.interval)
+
+            # Send under the lock so new events queue behind the batch
+            with self._lock:
+                for sid in list(self._outboxes):
+                    if self._pending(server, sid) >= self.backlog:
+                        continue
+
+                    batches: dict = {}
+
+                    for namespace, event, data in self._outboxes.pop(sid):
+                        batches.setdefault(namespace, []).append([event, data])
+
+                    for namespace, events in batches.items():
+                        server._emit_internal(sid, "batch", events, namespace,
+                                              None)
+
+                if self.dropped > self._reported:
+                    logger.info("Chat outboxes dropped %d events, %d in total",
+                                self.dropped - self._reported, self.dropped)
+                    self._reported = self.dropped
+
+                if len(self._outboxes) == 0:
+                    self._flusher = None
+                    return
+
+    def forget(self, sid: str) -> None:
+        """
+        Drop the bucket and outbox of a closed connection.
+
+        :param str sid: The session ID of the connection
+
+        :return: None
+        """
+        with self._lock:
+            self._buckets.pop(sid, None)
+            self._outboxes.pop(sid, None)
+
+    def stats(self) -> dict:
+        """
+        Return the throttle counters.
+
+        :param: None
+
+        :return: dict of the message and event counters and the clients behind
+        """
+        return {
+            "accepted": self.accepted,
+            "throttled": self.throttled,
+            "oversized": self.oversized,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "behind": len(self._outboxes)
+        }
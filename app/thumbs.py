@@ -0,0 +1,239 @@
+import hashlib
+import io
+import os
+import tempfile
+import urllib.parse
+import urllib.request
+
+from flask import Blueprint, Response, current_app, request
+from PIL import Image
+from typing import Union
+
+from app import db
+from .models import Book
+
+bp: Blueprint = Blueprint("thumbs", __name__, url_prefix="/thumbs")
+
+# Define the leading bytes of the image formats served by Google Books
+SIGNATURES: tuple = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+)
+
+# Define the URL schemes thumbnails may be fetched from
+SCHEMES: tuple = ("http", "https")
+
+
+def check_url(url: str) -> None:
+    """
+    Raise ValueError for a URL that is not HTTP or HTTPS.
+
+    :param str url: The URL
+
+    :return: None
+    """
+    if urllib.parse.urlsplit(url).scheme.lower() not in SCHEMES:
+        raise ValueError(f"Refusing to fetch {url}")
+
+
+class RedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    Define a redirect handler that only follows HTTP and HTTPS redirects.
+    """
+    def redirect_request(self, request, response, code, message, headers, url):
+        check_url(url)
+
+        return super().redirect_request(request, response, code, message,
+                                        headers, url)
+
+
+opener: urllib.request.OpenerDirector = urllib.request.build_opener(
+    RedirectHandler)
+
+
+def fetch_image(url: str) -> bytes:
+    """
+    Download an image over HTTP or HTTPS.
+    At most THUMBNAIL_MAX_BYTES are read. Refused URLs and larger images
+    raise ValueError.
+
+    :param str url: The image URL
+
+    :return: bytes of the image
+    """
+    check_url(url)
+
+    limit: int = current_app.config["THUMBNAIL_MAX_BYTES"]
+
+    with opener.open(
+            url, timeout=current_app.config["THUMBNAIL_TIMEOUT"]) as response:
+        data: bytes = response.read(limit + 1)
+
+    if len(data) > limit:
+        raise ValueError(f"{url} is larger than {limit} bytes")
+
+    return data
+
+
+def sniff_mimetype(data: bytes) -> Union[str, None]:
+    """
+    Guess the mimetype of an image from its leading bytes.
+
+    :param bytes data: The image
+
+    :return: str of the mimetype or None if the data is not a known image
+    """
+    for signature, mimetype in SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+
+    return None
+
+
+def cache_path(digest: str) -> str:
+    """
+    Return the path of a cached image.
+    Images are sharded by the first two characters of their digest.
+
+    :param str digest: The content digest or digest and size variant
+
+    :return: str of the path
+    """
+    return os.path.join(current_app.config["THUMBNAIL_CACHE_DIR"], digest[:2],
+                        digest)
+
+
+def read_cached(digest: str) -> Union[bytes, None]:
+    """
+    Read a cached image.
+
+    :param str digest: The content digest or digest and size variant
+
+    :return: bytes of the image or None
+    """
+    try:
+        with open(cache_path(digest), "rb") as image:
+            return image.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cached(digest: str, data: bytes) -> None:
+    """
+    Write an image to the cache.
+    The file is written under a temporary name and then renamed so readers
+    never see a partial image.
+
+    :param str digest: The content digest or digest and size variant
+    :param bytes data: The image
+
+    :return: None
+    """
+    path: str = cache_path(digest)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+
+    with os.fdopen(descriptor, "wb") as image:
+        image.write(data)
+
+    os.replace(temporary, path)
+
+
+def resize(data: bytes, size: tuple) -> bytes:
+    """
+    Shrink an image to fit in the given size.
+
+    :param bytes data: The image
+    :param tuple size: The maximum width and height
+
+    :return: bytes of the JPEG image
+    """
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    image.thumbnail(size)
+
+    output: io.BytesIO = io.BytesIO()
+    image.save(output, "JPEG", quality=85)
+
+    return output.getvalue()
+
+
+def thumbnail_response(data: bytes, etag: str) -> Response:
+    """
+    Build a cacheable image response.
+
+    :param bytes data: The image
+    :param str etag: The strong ETag of the image
+
+    :return: Response
+    """
+    response: Response = Response(data,
+                                  mimetype=sniff_mimetype(data)
+                                  or "image/jpeg")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["THUMBNAIL_MAX_AGE"]
+
+    return response
+
+
+@bp.route("/<int:book_id>", methods=["GET"])
+def thumbnail(book_id: int):
+    """
+    Serve the thumbnail of a book from the local cache.
+    The image is fetched from Google Books once and stored by its SHA-256
+    digest. Pass size=small for a downscaled copy.
+
+    :param int book_id: The book ID
+
+    :return: The image or an empty 404 response
+    """
+    book: Union[Book, None] = Book.query.filter_by(id=book_id).first()
+
+    if book is None or book.thumbnail is None:
+        return Response(status=404)
+
+    small: bool = request.args.get("size", None) == "small"
+    digest: Union[str, None] = book.thumbnail_digest
+
+    # Answer revalidations without touching the disk
+    if digest is not None:
+        expected: str = f"{digest}-small" if small else digest
+
+        if request.if_none_match.contains(expected):
+            return thumbnail_response(b"", expected).make_conditional(request)
+
+    data: Union[bytes, None] = read_cached(digest) if digest else None
+
+    if data is None:
+        try:
+            data = fetch_image(book.thumbnail)
+        except (OSError, ValueError):
+            return Response(status=404)
+
+        # Only cache and serve images
+        if sniff_mimetype(data) is None:
+            return Response(status=404)
+
+        digest = hashlib.sha256(data).hexdigest()
+        write_cached(digest, data)
+
+        book.thumbnail_digest = digest
+        db.session.commit()
+
+    etag: str = digest
+
+    if small:
+        etag = f"{digest}-small"
+        resized: Union[bytes, None] = read_cached(etag)
+
+        if resized is None:
+            resized = resize(data, current_app.config["THUMBNAIL_SMALL_SIZE"])
+            write_cached(etag, resized)
+
+        data = resized
+
+    return thumbnail_response(data, etag).make_conditional(request)
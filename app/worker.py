@@ -0,0 +1,186 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from flask import Flask, has_app_context
+from typing import Callable, Union
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """
+    Define a background thread applying queued jobs in batches.
+    Jobs queued while a batch runs are gathered into the next one, so bursts
+    of changes cost one run of the handler. The handler runs in an app
+    context and owns its transaction.
+
+    :attribute bool coalesce: Whether identical jobs of a batch run once
+    :attribute bool synchronous: Whether jobs run in the submitting thread
+    :attribute int batch_size: The maximum number of jobs per batch
+    :attribute float linger: The seconds a batch waits to fill up
+    :attribute int processed: The number of jobs applied
+    :attribute int failed: The number of jobs whose batch raised
+    :attribute float lag: The seconds between queueing and applying the last batch
+
+    :method init_app: Configure the worker from a Flask app
+    :method submit: Queue a job
+    :method join: Wait for the queued jobs
+    :method stats: Return the worker counters
+    """
+    def __init__(self,
+                 name: str = "worker",
+                 batch_size: int = 100,
+                 coalesce: bool = True) -> None:
+        self.name: str = name
+        self.coalesce: bool = coalesce
+        self.synchronous: bool = False
+        self.batch_size: int = batch_size
+        self.linger: float = 0.0
+        self.processed: int = 0
+        self.failed: int = 0
+        self.lag: float = 0.0
+        self._app: Union[Flask, None] = None
+        self._handler: Union[Callable, None] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Union[threading.Thread, None] = None
+        self._registered: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    def init_app(self, app: Flask, handler: Callable, prefix: str) -> None:
+        """
+        Configure the worker with the <prefix>_* settings of an app.
+
+        :param Flask app: A Flask app instance
+        :param Callable handler: Applies a list of jobs
+        :param str prefix: The prefix of the settings
+
+        :return: None
+        """
+        self._app = app
+        self._handler = handler
+        self.synchronous = app.config[f"{prefix}_SYNCHRONOUS"]
+        self.batch_size = app.config[f"{prefix}_BATCH_SIZE"]
+        self.linger = app.config[f"{prefix}_LINGER"]
+        self.processed = self.failed = 0
+        self.lag = 0.0
+
+        app.extensions[self.name] = self
+
+    def submit(self, *job) -> None:
+        """
+        Queue a job.
+        Runs it right away when the worker is synchronous.
+
+        :param job: The arguments of the job
+
+        :return: None
+        """
+        if self.synchronous:
+            self._run([job], time.monotonic())
+            return
+
+        self._queue.put((job, time.monotonic()))
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop,
+                                                name=self.name,
+                                                daemon=True)
+                self._thread.start()
+
+                if not self._registered:
+                    # Apply the queued jobs before the process exits
+                    atexit.register(self.join)
+                    self._registered = True
+
+    def join(self) -> None:
+        """
+        Wait for the queued jobs.
+
+        :param: None
+
+        :return: None
+        """
+        self._queue.join()
+
+    def stats(self) -> dict:
+        """
+        Return the worker counters.
+
+        :param: None
+
+        :return: dict of the pending, processed and failed jobs and the lag
+        """
+        return {
+            "pending": self._queue.qsize(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "lag": self.lag
+        }
+
+    def _loop(self) -> None:
+        """
+        Apply the queued jobs in batches until the process exits.
+
+        :param: None
+
+        :return: None
+        """
+        while True:
+            job, queued = self._queue.get()
+            jobs: list = [job]
+            deadline: float = time.monotonic() + self.linger
+
+            # Fill the batch until it is full or the linger time passes
+            while len(jobs) < self.batch_size:
+                remaining: float = deadline - time.monotonic()
+
+                try:
+                    if remaining > 0:
+                        job, _ = self._queue.get(timeout=remaining)
+                    else:
+                        job, _ = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                jobs.append(job)
+
+            try:
+                self._run(jobs, queued)
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def _run(self, jobs: list, queued: float) -> None:
+        """
+        Apply a batch of jobs in an app context.
+        Failures are logged and counted, or raised when synchronous.
+
+        :param list jobs: The jobs
+        :param float queued: The time the oldest job was queued
+
+        :return: None
+        """
+        batch: list = list(dict.fromkeys(jobs)) if self.coalesce else jobs
+
+        try:
+            if has_app_context():
+                self._handler(batch)
+            else:
+                with self._app.app_context():
+                    self._handler(batch)
+        except Exception:
+            self.failed += len(jobs)
+
+            if self.synchronous:
+                raise
+
+            logger.exception("%s failed to apply %s jobs", self.name,
+                             len(jobs))
+        else:
+            self.processed += len(jobs)
+
+        self.lag = time.monotonic() - queued
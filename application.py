@@ -1,6 +1,8 @@
+import os
+
 from app import create_app, socketio
 
 app = create_app()
 
 if __name__ == "__main__":
-    socketio.run(app, )
+    socketio.run(app, port=int(os.environ.get("PORT", 5000)))
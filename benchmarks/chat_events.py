@@ -0,0 +1,105 @@
+"""
+Measure the throughput and SQL statements of chat message events, with the
+room cached in the socket session and with the room resolved per message.
+
+Usage: python benchmarks/chat_events.py [--messages 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db, message_buffer, socketio  # noqa: E402
+from app.match import resolve_room  # noqa: E402
+from app.models import MessageSession, User  # noqa: E402
+
+
+def send(app: Flask, socket, messages: int, per_message: bool) -> float:
+    """
+    Emit chat messages and wait until they are stored.
+
+    :param Flask app: The app instance
+    :param socket: A Socket.IO test client joined to the chat
+    :param int messages: The number of messages
+    :param bool per_message: Whether to resolve the room for every message
+
+    :return: float of the elapsed seconds
+    """
+    started: float = time.perf_counter()
+
+    for number in range(messages):
+        if per_message:
+            with app.app_context():
+                resolve_room(1, 2)
+
+        socket.emit("request", {
+            "other_user_id": 2,
+            "data": str(number)
+        },
+                    namespace="/match/connect")
+
+    message_buffer.join()
+
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--messages", type=int, default=2000)
+
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_app({
+            "SQLALCHEMY_DATABASE_URI":
+            f"sqlite:///{os.path.join(directory, 'chat.sqlite')}",
+            "SEARCH_CACHE_PATH": None,
+            "SCHEMA_CHECK": False,
+            "TASTE_INDEX_PATH": None
+        })
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                User(username="a", display_name="A", password="a"),
+                User(username="b", display_name="B", password="b"),
+                MessageSession(user_a_id=1, user_b_id=2, room="room")
+            ])
+            db.session.commit()
+
+            statements: list = []
+            event.listen(db.engine, "before_cursor_execute",
+                         lambda *args: statements.append(args[2]))
+
+        client = app.test_client()
+
+        with client.session_transaction() as session:
+            session["user_id"] = 1
+
+        socket = socketio.test_client(app,
+                                      namespace="/match/connect",
+                                      flask_test_client=client)
+        socket.emit("join", {"other_user_id": 2}, namespace="/match/connect")
+
+        for name, per_message in (("per message", True), ("cached", False)):
+            del statements[:]
+
+            elapsed: float = send(app, socket, arguments.messages, per_message)
+            lookups: int = sum(not statement.startswith("INSERT")
+                               for statement in statements)
+
+            print(f"{name:<12} "
+                  f"{arguments.messages / elapsed:>9.0f} messages/s "
+                  f"{lookups / arguments.messages:>5.2f} lookups/message")
+
+        socket.disconnect(namespace="/match/connect")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Measure the candidate scoring of /match with the pure-Python loop it used
+to run and with the vectorized engine in app.scoring, on random features.
+
+Both must rank the candidates identically.
+
+Usage: python benchmarks/match_scoring.py [--books 50] [--candidates 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from math import acos, sqrt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scoring import MISSING_ANGLE, score  # noqa: E402
+
+
+def theta_difference(vec_a: tuple, vec_b: tuple) -> float:
+    """
+    Calculate the theta difference between two vectors, like match() used to.
+
+    :param tuple vec_a: Vector A
+    :param tuple vec_b: Vector B
+
+    :return: float of the angle between the vectors
+    """
+    dot_product: float = sum(a * b for a, b in zip(vec_a, vec_b))
+    cosine: float = dot_product / (sqrt(sum(a * a for a in vec_a)) *
+                                   sqrt(sum(b * b for b in vec_b)))
+
+    # Clamp rounding errors of parallel vectors into the domain of acos
+    return acos(max(-1.0, min(1.0, cosine)))
+
+
+def random_features(books: int, candidates: int, missing: float,
+                    seed: int) -> tuple:
+    """
+    Draw rating components and shifted polarities, leaving some unreviewed.
+
+    :param int books: The number of reading list books
+    :param int candidates: The number of candidates
+    :param float missing: The share of candidate reviews left out
+    :param int seed: The random seed
+
+    :return: tuple of the user and candidate features
+    """
+    generator: np.random.Generator = np.random.default_rng(seed)
+
+    user: np.ndarray = np.stack(
+        (generator.integers(1, 6, books) * 0.2, generator.uniform(0, 2,
+                                                                  books)),
+        axis=-1)
+    features: np.ndarray = np.stack(
+        (generator.integers(1, 6, (books, candidates)) * 0.2,
+         generator.uniform(0, 2, (books, candidates))),
+        axis=-1)
+    features[generator.random((books, candidates)) < missing] = np.nan
+
+    return user, features
+
+
+def loop_ranking(user: np.ndarray, candidates: np.ndarray, k: int) -> tuple:
+    """
+    Score the candidates pair by pair and sort them like match() used to.
+
+    :param np.ndarray user: The (books x 2) user features
+    :param np.ndarray candidates: The (books x candidates x 2) features
+    :param int k: The number of candidates to keep
+
+    :return: tuple of the scores and positions of the best candidates
+    """
+    user_vectors: list = [tuple(vector) for vector in user.tolist()]
+    candidate_vectors: list = [[tuple(vector) for vector in row]
+                               for row in candidates.tolist()]
+
+    elo: list = []
+
+    for user_vector, row in zip(user_vectors, candidate_vectors):
+        elo_round: list = []
+
+        for friend_vector in row:
+            if np.isnan(friend_vector[0]):
+                elo_round.append(MISSING_ANGLE)
+                continue
+
+            elo_round.append(theta_difference(user_vector, friend_vector))
+
+        elo.append(elo_round)
+
+    elo = [sum(i) for i in zip(*elo)]
+    ranked: list = sorted(enumerate(elo), key=lambda pair: pair[1])[:k]
+
+    return [pair[1] for pair in ranked], [pair[0] for pair in ranked]
+
+
+def vectorized_ranking(user: np.ndarray, candidates: np.ndarray,
+                       k: int) -> tuple:
+    """
+    Score and rank the candidates with the vectorized engine.
+
+    :param np.ndarray user: The (books x 2) user features
+    :param np.ndarray candidates: The (books x candidates x 2) features
+    :param int k: The number of candidates to keep
+
+    :return: tuple of the scores and positions of the best candidates
+    """
+    scores: np.ndarray = score(user, candidates)
+    ranking: np.ndarray = np.argsort(scores, kind="stable")[:k]
+
+    return scores[ranking].tolist(), ranking.tolist()
+
+
+def measure(function, repeat: int, *arguments) -> tuple:
+    """
+    Time the fastest of several runs of a ranking.
+
+    :param function: The ranking function
+    :param int repeat: The number of runs
+    :param arguments: The arguments of the function
+
+    :return: tuple of the best time in seconds and the last result
+    """
+    best: float = float("inf")
+
+    for _ in range(repeat):
+        started: float = time.perf_counter()
+        result: tuple = function(*arguments)
+        best = min(best, time.perf_counter() - started)
+
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--missing", type=float, default=0.3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+
+    arguments = parser.parse_args()
+
+    user, candidates = random_features(arguments.books, arguments.candidates,
+                                       arguments.missing, 0)
+
+    loop_time, (loop_scores, loop_order) = measure(loop_ranking,
+                                                   arguments.repeat, user,
+                                                   candidates, arguments.top)
+    numpy_time, (numpy_scores,
+                 numpy_order) = measure(vectorized_ranking, arguments.repeat,
+                                        user, candidates, arguments.top)
+
+    if loop_order != numpy_order or not np.allclose(loop_scores, numpy_scores):
+        raise SystemExit("The rankings differ.")
+
+    print(f"loop     {loop_time * 1000:>9.2f} ms")
+    print(f"numpy    {numpy_time * 1000:>9.2f} ms "
+          f"{loop_time / numpy_time:>7.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
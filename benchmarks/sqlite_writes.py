@@ -0,0 +1,160 @@
+"""
+Measure the write throughput of concurrent clients on a file SQLite
+database, with the stock settings and with the SQLITE_PRAGMAS profile.
+
+Each simulated request bumps a chat session counter and rates a saved book
+in its own transaction, like the connect and review views.
+
+Usage: python benchmarks/sqlite_writes.py [--clients 8] [--requests 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import Book, MessageSession, SavedBook, User  # noqa: E402
+from app.ratings import rate  # noqa: E402
+
+
+def build_app(directory: str, pragmas: dict):
+    """
+    Create an app on a fresh SQLite file with one user and book per client.
+
+    :param str directory: The directory of the database file
+    :param dict pragmas: The SQLITE_PRAGMAS to apply
+
+    :return: Flask
+    """
+    config: dict = {
+        "SQLALCHEMY_DATABASE_URI":
+        f"sqlite:///{os.path.join(directory, 'bench.sqlite')}",
+        "SEARCH_CACHE_PATH": None,
+        "SCHEMA_CHECK": False
+    }
+
+    if pragmas is not None:
+        config["SQLITE_PRAGMAS"] = pragmas
+
+    return create_app(config)
+
+
+def seed(app, clients: int) -> None:
+    """
+    Create the rows written by the clients.
+
+    :param app: The Flask app
+    :param int clients: The number of clients
+
+    :return: None
+    """
+    with app.app_context():
+        db.create_all()
+
+        for client in range(clients + 1):
+            db.session.add(
+                User(username=f"user{client}",
+                     display_name=f"User {client}",
+                     password="password"))
+            db.session.add(
+                Book(bookname=f"Book {client}",
+                     author="Author",
+                     isbn=str(client)))
+
+        db.session.flush()
+
+        for client in range(1, clients + 1):
+            db.session.add(SavedBook(user_id=client + 1, book_id=1))
+            db.session.add(
+                MessageSession(user_a_id=1,
+                               user_b_id=client + 1,
+                               room=f"room{client}"))
+
+        db.session.commit()
+
+
+def client_loop(app, client: int, requests: int, errors: list) -> None:
+    """
+    Run the requests of one client.
+
+    :param app: The Flask app
+    :param int client: The client number, starting at 1
+    :param int requests: The number of requests
+    :param list errors: Collects the failed requests
+
+    :return: None
+    """
+    for request in range(requests):
+        with app.app_context():
+            try:
+                MessageSession.query.filter_by(room=f"room{client}").update(
+                    {"count": MessageSession.count + 1})
+
+                saved_book: SavedBook = SavedBook.query.filter_by(
+                    user_id=client + 1).first()
+                rate(saved_book, 1 + request % 5, "Review")
+
+                db.session.commit()
+            except OperationalError as error:
+                db.session.rollback()
+                errors.append(error)
+            finally:
+                db.session.remove()
+
+
+def run(label: str, pragmas: dict, clients: int, requests: int) -> None:
+    """
+    Benchmark one profile and print its throughput.
+
+    :param str label: The profile name
+    :param dict pragmas: The SQLITE_PRAGMAS or None for the default profile
+    :param int clients: The number of concurrent clients
+    :param int requests: The number of requests per client
+
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        app = build_app(directory, pragmas)
+        seed(app, clients)
+
+        errors: list = []
+        threads: list = [
+            threading.Thread(target=client_loop,
+                             args=(app, client, requests, errors))
+            for client in range(1, clients + 1)
+        ]
+
+        started: float = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed: float = time.perf_counter() - started
+        completed: int = clients * requests - len(errors)
+
+        print(f"{label:<8} {completed:>7} commits {elapsed:>8.2f}s "
+              f"{completed / elapsed:>9.1f} commits/s {len(errors):>5} errors")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+
+    arguments = parser.parse_args()
+
+    run("stock", {}, arguments.clients, arguments.requests)
+    run("tuned", None, arguments.clients, arguments.requests)
+
+
+if __name__ == "__main__":
+    main()
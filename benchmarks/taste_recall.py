@@ -0,0 +1,99 @@
+"""
+Measure the recall and query time of the approximate taste index against
+an exact brute-force search, on clustered random taste vectors.
+
+Usage: python benchmarks/taste_recall.py [--users 200000] [--queries 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.taste import TasteIndex  # noqa: E402
+
+
+def clustered_vectors(users: int, dimensions: int, clusters: int,
+                      spread: float, seed: int) -> np.ndarray:
+    """
+    Draw taste vectors around random cluster centres, like groups of
+    readers with a common taste.
+
+    :param int users: The number of users
+    :param int dimensions: The length of a vector
+    :param int clusters: The number of clusters
+    :param float spread: The noise around the centres
+    :param int seed: The random seed
+
+    :return: np.ndarray of the (users x dimensions) vectors
+    """
+    generator: np.random.Generator = np.random.default_rng(seed)
+
+    centres: np.ndarray = generator.standard_normal((clusters, dimensions))
+    members: np.ndarray = generator.integers(0, clusters, users)
+
+    return (centres[members] + spread * generator.standard_normal(
+        (users, dimensions))).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--dimensions", type=int, default=32)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=0.5)
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--bits", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+
+    arguments = parser.parse_args()
+
+    vectors: np.ndarray = clustered_vectors(arguments.users,
+                                            arguments.dimensions,
+                                            arguments.clusters,
+                                            arguments.spread, 0)
+
+    index: TasteIndex = TasteIndex(arguments.dimensions, arguments.tables,
+                                   arguments.bits)
+
+    started: float = time.perf_counter()
+    index.build(range(arguments.users), vectors)
+    built: float = time.perf_counter() - started
+
+    queries: np.ndarray = np.random.default_rng(1).choice(arguments.users,
+                                                          arguments.queries,
+                                                          replace=False)
+
+    approximate_time: float = 0.0
+    exact_time: float = 0.0
+    found: int = 0
+
+    for user_id in queries.tolist():
+        started = time.perf_counter()
+        approximate: list = index.similar(user_id, arguments.top)
+        approximate_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        exact: list = index.exact(vectors[user_id], arguments.top, (user_id, ))
+        exact_time += time.perf_counter() - started
+
+        found += len({pair[0]
+                      for pair in approximate} & {pair[0]
+                                                  for pair in exact})
+
+    recall: float = found / (arguments.queries * arguments.top)
+
+    print(f"users    {arguments.users:>9} "
+          f"vectors {vectors.nbytes / 2**20:>7.1f} MiB "
+          f"built in {built:.2f}s")
+    print(f"exact    {exact_time / arguments.queries * 1000:>9.2f} ms/query")
+    print(f"lsh      {approximate_time / arguments.queries * 1000:>9.2f} "
+          f"ms/query recall@{arguments.top} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
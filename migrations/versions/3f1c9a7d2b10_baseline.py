@@ -0,0 +1,81 @@
+"""Baseline schema
+
+Revision ID: 3f1c9a7d2b10
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('display_name', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('bio', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'book',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bookname', sa.String(), nullable=False),
+        sa.Column('author', sa.String(), nullable=False),
+        sa.Column('isbn', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('categories', sa.String(), nullable=True),
+        sa.Column('thumbnail', sa.String(), nullable=True),
+        sa.Column('average_rating', sa.Float(), nullable=False),
+        sa.Column('total_ratings', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bookname'),
+        sa.UniqueConstraint('isbn')
+    )
+    op.create_table(
+        'saved_book',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=True),
+        sa.Column('review', sa.String(), nullable=True),
+        sa.Column('to_be_read', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'message_session',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_a_id', sa.Integer(), nullable=False),
+        sa.Column('user_b_id', sa.Integer(), nullable=False),
+        sa.Column('room', sa.String(), nullable=False),
+        sa.Column('created', sa.DateTime(timezone=True),
+                  server_default=sa.func.now(),
+                  nullable=True),
+        sa.Column('updated', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_a_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['user_b_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('room'),
+        sa.UniqueConstraint('user_a_id'),
+        sa.UniqueConstraint('user_b_id')
+    )
+
+
+def downgrade():
+    op.drop_table('message_session')
+    op.drop_table('saved_book')
+    op.drop_table('book')
+    op.drop_table('user')
@@ -0,0 +1,30 @@
+"""Stored rating components and sentiment of reviews
+
+Revision ID: 5d07b3e9a1c4
+Revises: c52b7e19d846
+Create Date: 2026-10-18 11:25:00.000000
+
+Existing reviews are scored afterwards with flask books score-reviews.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d07b3e9a1c4'
+down_revision = 'c52b7e19d846'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('saved_book') as batch_op:
+        batch_op.add_column(
+            sa.Column('rating_component', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('sentiment', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('saved_book') as batch_op:
+        batch_op.drop_column('sentiment')
+        batch_op.drop_column('rating_component')
@@ -0,0 +1,186 @@
+"""Catalogue, search, taxonomy, rating stats and library indexes
+
+Revision ID: 8a4e2c61f0d3
+Revises: 3f1c9a7d2b10
+Create Date: 2026-10-18 09:05:00.000000
+
+The isbn13, taxonomy and rating stats of existing rows are filled in by
+`flask books merge-duplicates`, `flask books backfill-taxonomy` and
+`flask books rebuild-stats` after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e2c61f0d3'
+down_revision = '3f1c9a7d2b10'
+branch_labels = None
+depends_on = None
+
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5("
+    "bookname, author, description, categories, "
+    "content='book', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_insert AFTER INSERT ON book BEGIN "
+    "INSERT INTO book_fts(rowid, bookname, author, description, categories) "
+    "VALUES (new.id, new.bookname, new.author, new.description, "
+    "new.categories); END",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_delete AFTER DELETE ON book BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, bookname, author, description, "
+    "categories) VALUES ('delete', old.id, old.bookname, old.author, "
+    "old.description, old.categories); END",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_update AFTER UPDATE OF "
+    "bookname, author, description, categories ON book BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, bookname, author, description, "
+    "categories) VALUES ('delete', old.id, old.bookname, old.author, "
+    "old.description, old.categories); "
+    "INSERT INTO book_fts(rowid, bookname, author, description, categories) "
+    "VALUES (new.id, new.bookname, new.author, new.description, "
+    "new.categories); END",
+    "INSERT INTO book_fts(book_fts) VALUES ('rebuild')",
+)
+
+POSTGRESQL_SEARCH_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_book_search ON book USING GIN ("
+    "to_tsvector('english', coalesce(bookname, '') || ' ' || "
+    "coalesce(author, '') || ' ' || coalesce(description, '') || ' ' || "
+    "coalesce(categories, '')))")
+
+
+def recreate():
+    # SQLite cannot add a column defaulting to CURRENT_TIMESTAMP in place
+    return 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+
+
+def upgrade():
+    with op.batch_alter_table('book', recreate=recreate()) as batch_op:
+        batch_op.add_column(
+            sa.Column('thumbnail_digest', sa.String(), nullable=True))
+        batch_op.add_column(
+            sa.Column('isbn13', sa.String(length=13), nullable=True))
+        batch_op.add_column(
+            sa.Column('version', sa.Integer(), server_default='0',
+                      nullable=False))
+        batch_op.add_column(
+            sa.Column('updated', sa.DateTime(timezone=True),
+                      server_default=sa.func.now(), nullable=True))
+        batch_op.create_index('ix_book_isbn13', ['isbn13'], unique=True)
+
+    with op.batch_alter_table('saved_book', recreate=recreate()) as batch_op:
+        batch_op.add_column(
+            sa.Column('updated', sa.DateTime(timezone=True),
+                      server_default=sa.func.now(), nullable=True))
+        batch_op.create_index('ix_saved_book_user_id_id', ['user_id', 'id'])
+        batch_op.create_index('ix_saved_book_user_id_to_be_read_id',
+                              ['user_id', 'to_be_read', 'id'])
+
+    op.create_table(
+        'author',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'category',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'book_author',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['author.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', 'author_id')
+    )
+    op.create_index('ix_book_author_author_id_book_id', 'book_author',
+                    ['author_id', 'book_id'])
+    op.create_table(
+        'book_category',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', 'category_id')
+    )
+    op.create_index('ix_book_category_category_id_book_id', 'book_category',
+                    ['category_id', 'book_id'])
+    op.create_table(
+        'book_stats',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('rating_sum', sa.Float(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False),
+        sa.Column('stars_1', sa.Integer(), nullable=False),
+        sa.Column('stars_2', sa.Integer(), nullable=False),
+        sa.Column('stars_3', sa.Integer(), nullable=False),
+        sa.Column('stars_4', sa.Integer(), nullable=False),
+        sa.Column('stars_5', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.DateTime(timezone=True),
+                  server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id']),
+        sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_table(
+        'import_checkpoint',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('offset', sa.BigInteger(), nullable=False),
+        sa.Column('lines', sa.BigInteger(), nullable=False),
+        sa.Column('updated', sa.DateTime(timezone=True),
+                  server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source')
+    )
+
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'sqlite' and bind.execute(
+            sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    ).scalar() == 1:
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+    elif bind.dialect.name == 'postgresql':
+        op.execute(POSTGRESQL_SEARCH_INDEX)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS book_fts_{trigger}")
+
+        op.execute("DROP TABLE IF EXISTS book_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_book_search")
+
+    op.drop_table('import_checkpoint')
+    op.drop_table('book_stats')
+    op.drop_index('ix_book_category_category_id_book_id',
+                  table_name='book_category')
+    op.drop_table('book_category')
+    op.drop_index('ix_book_author_author_id_book_id',
+                  table_name='book_author')
+    op.drop_table('book_author')
+    op.drop_table('category')
+    op.drop_table('author')
+
+    with op.batch_alter_table('saved_book') as batch_op:
+        batch_op.drop_index('ix_saved_book_user_id_to_be_read_id')
+        batch_op.drop_index('ix_saved_book_user_id_id')
+        batch_op.drop_column('updated')
+
+    with op.batch_alter_table('book') as batch_op:
+        batch_op.drop_index('ix_book_isbn13')
+        batch_op.drop_column('updated')
+        batch_op.drop_column('version')
+        batch_op.drop_column('isbn13')
+        batch_op.drop_column('thumbnail_digest')
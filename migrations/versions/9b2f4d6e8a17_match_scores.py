@@ -0,0 +1,38 @@
+"""Precomputed match scores
+
+Revision ID: 9b2f4d6e8a17
+Revises: 5d07b3e9a1c4
+Create Date: 2026-10-18 13:40:00.000000
+
+The table starts empty, fill it with flask match rebuild-scores.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9b2f4d6e8a17'
+down_revision = '5d07b3e9a1c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'match_score', sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('candidate_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('updated',
+                  sa.DateTime(timezone=True),
+                  server_default=sa.func.now(),
+                  nullable=False),
+        sa.ForeignKeyConstraint(['candidate_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'candidate_id'))
+    op.create_index('ix_match_score_user_id_score', 'match_score',
+                    ['user_id', 'score', 'candidate_id'])
+
+
+def downgrade():
+    op.drop_index('ix_match_score_user_id_score', table_name='match_score')
+    op.drop_table('match_score')
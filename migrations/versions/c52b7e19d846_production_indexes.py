@@ -0,0 +1,70 @@
+"""Production indexes and unique pairs for saved books and message sessions
+
+Revision ID: c52b7e19d846
+Revises: 8a4e2c61f0d3
+Create Date: 2026-10-18 09:10:00.000000
+
+Saved books are unique per (user_id, book_id), so duplicates left by
+repeated saves are removed first, keeping the oldest row. Message sessions
+were unique per user instead of per pair of users.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52b7e19d846'
+down_revision = '8a4e2c61f0d3'
+branch_labels = None
+depends_on = None
+
+# Name the unnamed unique constraints of the baseline when reflecting SQLite
+NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def column_unique(column):
+    # Postgres names unnamed unique constraints <table>_<column>_key
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'message_session_{column}_key'
+
+    return f'uq_message_session_{column}'
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM saved_book WHERE id NOT IN ("
+        "SELECT MIN(id) FROM saved_book GROUP BY user_id, book_id)")
+
+    with op.batch_alter_table('saved_book') as batch_op:
+        batch_op.create_unique_constraint('uq_saved_book_user_id_book_id',
+                                          ['user_id', 'book_id'])
+        batch_op.create_index('ix_saved_book_book_id_user_id',
+                              ['book_id', 'user_id'])
+
+    with op.batch_alter_table(
+            'message_session',
+            naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(column_unique('user_a_id'), type_='unique')
+        batch_op.drop_constraint(column_unique('user_b_id'), type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_message_session_user_a_id_user_b_id',
+            ['user_a_id', 'user_b_id'])
+        batch_op.create_index('ix_message_session_user_b_id_user_a_id',
+                              ['user_b_id', 'user_a_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('message_session') as batch_op:
+        batch_op.drop_index('ix_message_session_user_b_id_user_a_id')
+        batch_op.drop_constraint('uq_message_session_user_a_id_user_b_id',
+                                 type_='unique')
+        batch_op.create_unique_constraint(column_unique('user_a_id'),
+                                          ['user_a_id'])
+        batch_op.create_unique_constraint(column_unique('user_b_id'),
+                                          ['user_b_id'])
+
+    with op.batch_alter_table('saved_book') as batch_op:
+        batch_op.drop_index('ix_saved_book_book_id_user_id')
+        batch_op.drop_constraint('uq_saved_book_user_id_book_id',
+                                 type_='unique')
@@ -0,0 +1,36 @@
+"""Chat message history
+
+Revision ID: e4a81c3f5b62
+Revises: 9b2f4d6e8a17
+Create Date: 2026-10-18 15:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a81c3f5b62'
+down_revision = '9b2f4d6e8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'message',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('room', sa.String(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('body', sa.String(), nullable=False),
+        sa.Column('created', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['room'], ['message_session.room']),
+        sa.ForeignKeyConstraint(['sender_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_message_room_id', 'message', ['room', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_message_room_id', table_name='message')
+    op.drop_table('message')
@@ -1,13 +1,30 @@
 import os
 import pytest
 
+from sqlalchemy import event
+
 from flask import Flask, Response
 from flask.testing import FlaskClient
 
 from app import create_app, db
+from app.google_books import OfflineService
+from app.isbn import isbn13_check_digit
 from app.models import User
 
 
+def make_isbn(number: int) -> str:
+    """
+    Build a valid ISBN-13 from a number.
+
+    :param int number: The number to encode
+
+    :return: str of the ISBN-13
+    """
+    digits: str = f"978{number:09d}"
+
+    return digits + isbn13_check_digit(digits)
+
+
 @pytest.fixture
 def app() -> Flask:
     """
@@ -21,7 +38,13 @@ def app() -> Flask:
 
     app = create_app({
         "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SEARCH_CACHE_PATH": None,
+        "GOOGLE_BOOKS_SERVICE": OfflineService(),
+        "MATCH_WORKER_SYNCHRONOUS": True,
+        "CHAT_BUFFER_SYNCHRONOUS": True,
+        "TASTE_INDEX_PATH": None,
+        "SOCKETIO_MESSAGE_QUEUE": None
     })
 
     with app.app_context():
@@ -37,6 +60,30 @@ def app() -> Flask:
     yield app
 
 
+@pytest.fixture
+def queries(app: Flask) -> list:
+    """
+    Record the SQL statements executed by the test app instance.
+
+    :param Flask app: A test app instance.
+
+    :return: list of the executed statements
+    """
+    statements: list = []
+
+    def record(connection, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+
+    event.listen(engine, "before_cursor_execute", record)
+
+    yield statements
+
+    event.remove(engine, "before_cursor_execute", record)
+
+
 @pytest.fixture
 def client(app: Flask) -> FlaskClient:
     """
@@ -0,0 +1,227 @@
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db, fragment_cache, search_cache
+from app.ingest import ingest_volumes
+from app.models import Book, SavedBook
+from app.search import search_books
+from .conftest import AuthActions, make_isbn
+
+VOLUMES: list = [{
+    "id": "hobbit",
+    "volumeInfo": {
+        "title": "The Hobbit",
+        "authors": ["J. R. R. Tolkien"],
+        "industryIdentifiers": [{
+            "type": "ISBN_13",
+            "identifier": "9780547928227"
+        }],
+        "categories": ["Fiction"]
+    }
+}]
+
+
+class FakeService:
+    """
+    Define a stand-in for the Google Books client that counts requests.
+
+    :attribute int calls: The number of executed requests
+    """
+    def __init__(self, items: list):
+        self.items = items
+        self.calls = 0
+
+    def volumes(self) -> "FakeService":
+        return self
+
+    def list(self, **kwargs) -> "FakeService":
+        return self
+
+    def execute(self, **kwargs) -> dict:
+        self.calls += 1
+        return {"items": self.items}
+
+
+def test_browse_uses_search_cache(app: Flask, client: FlaskClient,
+                                  auth: AuthActions) -> None:
+    """
+    Test that repeated searches are answered by the search cache.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    service: FakeService = FakeService(VOLUMES)
+    app.config["GOOGLE_BOOKS_SERVICE"] = service
+
+    auth.login()
+
+    response = client.post("/browse", data={"search_book": "Hobbit"})
+
+    assert b"The Hobbit" in response.data
+
+    client.post("/browse", data={"search_book": "  hobbit"})
+
+    assert service.calls == 2
+    assert search_cache.stats()["hits"] == 1
+
+    with app.app_context():
+        assert Book.query.count() == 1
+
+
+def test_search_books(app: Flask, queries: list) -> None:
+    """
+    Test the full-text search over the book table.
+    Assert whether results are ranked and kept in sync on update.
+
+    :param Flask app: A test app instance
+    :param list queries: The executed SQL statements
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add_all([
+            Book(bookname="Cooking for Hobbits",
+                 author="Someone",
+                 isbn="1",
+                 description="Second breakfast recipes"),
+            Book(bookname="The HOBBIT", author="J. R. R. Tolkien", isbn="2"),
+            Book(bookname="Dune",
+                 author="Frank Herbert",
+                 isbn="3",
+                 categories="Fiction")
+        ])
+        db.session.commit()
+
+        assert [book.isbn for book in search_books("hobbit")] == ["2", "1"]
+
+        del queries[:]
+
+        assert [book.isbn for book in search_books("tolk")] == ["2"]
+        assert [book.isbn for book in search_books("breakfast")] == ["1"]
+        assert search_books("  ") == []
+
+        dune: Book = Book.query.filter_by(isbn="3").first()
+        dune.categories = "Science Fiction"
+        db.session.commit()
+
+        assert [book.isbn for book in search_books("science")] == ["3"]
+        assert not any("sqlite_master" in statement
+                       for statement in queries)
+
+        # Only changes to the indexed columns rewrite the full-text rows
+        trigger: str = db.session.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'book_fts_update'"
+        ).scalar()
+
+        assert "UPDATE OF bookname, author, description, categories" in trigger
+
+
+def test_browse_category(app: Flask, client: FlaskClient,
+                         auth: AuthActions) -> None:
+    """
+    Test the paginated category and author views.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    app.config["BROWSE_PAGE_SIZE"] = 2
+
+    with app.app_context():
+        ingest_volumes([
+            dict(VOLUMES[0],
+                 volumeInfo=dict(VOLUMES[0]["volumeInfo"],
+                                 title=f"Volume {i}",
+                                 industryIdentifiers=[{
+                                     "type":
+                                     "ISBN_13",
+                                     "identifier":
+                                     make_isbn(i)
+                                 }])) for i in range(3)
+        ])
+
+    auth.login()
+
+    first = client.get("/browse/category/Fiction")
+
+    assert b"Volume 0" in first.data and b"Volume 1" in first.data
+    assert b"Volume 2" not in first.data
+    assert b"Next" in first.data
+
+    second = client.get("/browse/category/Fiction?page=2")
+
+    assert b"Volume 2" in second.data and b"Volume 0" not in second.data
+    assert b"Volume 2" in client.get("/browse/author/1?page=2").data
+
+
+def test_book_conditional_get(app: Flask, client: FlaskClient,
+                              auth: AuthActions) -> None:
+    """
+    Test the revalidation and the fragment cache of the book page.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        ingest_volumes(VOLUMES)
+        db.session.add(SavedBook(user_id=1, book_id=1))
+        db.session.commit()
+
+    auth.login()
+
+    first = client.get("/book/1")
+    etag: str = first.headers["ETag"]
+
+    assert first.status_code == 200 and b"J. R. R. Tolkien" in first.data
+    assert first.headers["Last-Modified"] is not None
+    assert client.get("/book/1", headers={
+        "If-None-Match": etag
+    }).status_code == 304
+
+    client.get("/book/1", headers={"If-None-Match": '"stale"'})
+
+    assert fragment_cache.stats()["hits"] == 1
+
+    client.post("/book/1/review", data={"rating": "5", "review": "Great"})
+
+    reviewed = client.get("/book/1", headers={"If-None-Match": etag})
+
+    assert reviewed.status_code == 200 and reviewed.headers["ETag"] != etag
+    assert b"Average Rating: 5.0 / 5" in reviewed.data
+
+    with app.app_context():
+        Book.query.get(1).description = "There and back again."
+        db.session.commit()
+
+    assert b"There and back again." in client.get("/book/1").data
+
+
+def test_save_book_twice(app: Flask, client: FlaskClient,
+                         auth: AuthActions) -> None:
+    """
+    Test that saving a book again keeps a single saved book.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        ingest_volumes(VOLUMES)
+
+    auth.login()
+
+    for _ in range(2):
+        assert client.post("/save", data={"book_id": 1}).status_code == 302
+
+    with app.app_context():
+        assert SavedBook.query.count() == 1
@@ -0,0 +1,126 @@
+import os
+import time
+
+from flask import Flask
+
+from app.cache import LRUCache, SearchCache
+
+
+def test_lru_eviction() -> None:
+    """
+    Test the least recently used eviction and the cache counters.
+
+    :param: None
+
+    :return: None
+    """
+    cache: LRUCache = LRUCache(max_size=2)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "size": 2
+    }
+
+
+def test_lru_expiry() -> None:
+    """
+    Test that expired entries are not returned.
+
+    :param: None
+
+    :return: None
+    """
+    cache: LRUCache = LRUCache(ttl=0.01)
+
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_search_cache_persistence(tmpdir) -> None:
+    """
+    Test that search results survive in the disk store.
+    Assert whether queries are normalized into the same key.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    path: str = os.path.join(str(tmpdir), "search_cache.sqlite")
+
+    app: Flask = Flask(__name__)
+    app.config.update(SEARCH_CACHE_SIZE=1,
+                      SEARCH_CACHE_TTL=60,
+                      SEARCH_CACHE_PATH=path)
+
+    first: SearchCache = SearchCache()
+    first.init_app(app)
+
+    assert not os.path.exists(path)
+
+    first.set("  The Hobbit ", [{"id": "a"}])
+    first.set("dune", [{"id": "b"}])
+
+    assert first.stats()["evictions"] == 1
+    assert first.get("the   hobbit") == [{"id": "a"}]
+
+    second: SearchCache = SearchCache()
+    second.init_app(app)
+
+    assert second.get("THE HOBBIT") == [{"id": "a"}]
+    assert second.get("Dune") == [{"id": "b"}]
+    assert second.stats()["stored"] == 2
+
+
+def test_search_cache_disk_outside_lock(tmpdir) -> None:
+    """
+    Test that the disk store is read and written without holding the lock.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app: Flask = Flask(__name__)
+    app.config.update(SEARCH_CACHE_SIZE=1,
+                      SEARCH_CACHE_TTL=60,
+                      SEARCH_CACHE_PATH=os.path.join(str(tmpdir),
+                                                     "search_cache.sqlite"))
+
+    cache: SearchCache = SearchCache()
+    cache.init_app(app)
+
+    connect = cache._connect
+    locked: list = []
+
+    def watch():
+        locked.append(cache._lock.locked())
+        return connect()
+
+    cache._connect = watch
+
+    cache.set("dune", [{"id": "a"}])
+    cache.set("emma", [{"id": "b"}])
+
+    assert cache.get("dune") == [{"id": "a"}]
+    assert cache.get("war and peace") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    cache.clear()
+
+    assert len(locked) == 7
+    assert not any(locked)
@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import create_app, db, message_buffer, socketio
+from app.models import Message, MessageSession, User
+from .conftest import AuthActions
+
+
+def test_history_pages_back(app: Flask, client: FlaskClient,
+                            auth: AuthActions) -> None:
+    """
+    Test that chat messages are stored and paged back from the newest.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    app.config["CHAT_HISTORY_PAGE_SIZE"] = 2
+
+    with app.app_context():
+        db.session.add(
+            User(username="other", display_name="Other", password="other"))
+        db.session.commit()
+
+    auth.login()
+    client.post("/match/connect", data={"other_user_id": 2})
+
+    socket = socketio.test_client(app,
+                                  namespace="/match/connect",
+                                  flask_test_client=client)
+    socket.emit("join", {"other_user_id": 2}, namespace="/match/connect")
+
+    for text in ("one", "two", "three"):
+        socket.emit("request", {
+            "other_user_id": 2,
+            "data": text
+        },
+                    namespace="/match/connect")
+
+    newest: dict = client.get("/match/history/2").get_json()
+
+    assert [message["data"] for message in newest["messages"]
+            ] == ["Tester: three", "Tester: two"]
+
+    older: dict = client.get(
+        f"/match/history/2?before={newest['before']}").get_json()
+
+    assert [message["data"]
+            for message in older["messages"]] == ["Tester: one"]
+    assert older["before"] is None
+    assert client.get("/match/history/3").status_code == 302
+
+
+def test_buffer_writes_behind(tmpdir) -> None:
+    """
+    Test that the message buffer stores queued messages from its thread.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app: Flask = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmpdir.join('app.sqlite')}",
+        "SEARCH_CACHE_PATH": None,
+        "SCHEMA_CHECK": False,
+        "CHAT_BUFFER_LINGER": 0.05
+    })
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(
+            User(username="test", display_name="Tester", password="test"))
+        db.session.add(MessageSession(user_a_id=1, user_b_id=1, room="room"))
+        db.session.commit()
+
+    for number in range(20):
+        message_buffer.submit("room", 1, str(number),
+                              datetime.now(timezone.utc))
+
+    message_buffer.join()
+
+    with app.app_context():
+        assert Message.query.count() == 20
+
+    assert message_buffer.stats()["processed"] == 20
+    assert message_buffer.stats()["failed"] == 0
+
+
+def test_rooms_cached_in_session(app: Flask, client: FlaskClient,
+                                 auth: AuthActions, queries: list,
+                                 monkeypatch) -> None:
+    """
+    Test that chat messages use the room cached on join without queries,
+    and that the room is evicted on leave.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param list queries: The executed SQL statements
+    :param monkeypatch: A pytest monkeypatch fixture
+
+    :return: None
+    """
+    submitted: list = []
+    monkeypatch.setattr(message_buffer, "submit",
+                        lambda *job: submitted.append(job))
+
+    with app.app_context():
+        db.session.add(
+            User(username="other", display_name="Other", password="other"))
+        db.session.commit()
+
+    auth.login()
+    client.post("/match/connect", data={"other_user_id": 2})
+
+    socket = socketio.test_client(app,
+                                  namespace="/match/connect",
+                                  flask_test_client=client)
+    message: dict = {"other_user_id": 2, "data": "hello"}
+
+    socket.emit("request", message, namespace="/match/connect")
+
+    assert submitted == []
+
+    socket.emit("join", {"other_user_id": 2}, namespace="/match/connect")
+    socket.get_received("/match/connect")
+    del queries[:]
+
+    socket.emit("request", message, namespace="/match/connect")
+
+    assert queries == []
+    assert len(submitted) == 1
+    assert submitted[0][1:3] == (1, "hello")
+    assert socket.get_received("/match/connect")[0]["args"] == [{
+        "data":
+        "Tester: hello"
+    }]
+
+    socket.emit("leave", {"other_user_id": 2}, namespace="/match/connect")
+    socket.emit("request", message, namespace="/match/connect")
+
+    assert len(submitted) == 1
@@ -0,0 +1,53 @@
+from flask import Flask
+
+from app import create_app, db
+from app.database import configure_engine
+
+
+def test_sqlite_pragmas(tmpdir) -> None:
+    """
+    Test that file SQLite connections use the tuning pragmas.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app: Flask = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmpdir.join('app.sqlite')}",
+        "SEARCH_CACHE_PATH": None,
+        "SCHEMA_CHECK": False
+    })
+
+    with app.app_context():
+        assert db.session.execute("PRAGMA journal_mode").scalar() == "wal"
+        assert db.session.execute("PRAGMA synchronous").scalar() == 1
+        assert db.session.execute("PRAGMA busy_timeout").scalar() == 5000
+
+
+def test_postgresql_pool_options() -> None:
+    """
+    Test that Postgres URLs get explicit pool settings.
+
+    :param: None
+
+    :return: None
+    """
+    app: Flask = Flask(__name__)
+    app.config.from_mapping(
+        SQLALCHEMY_DATABASE_URI="postgresql://localhost/app",
+        SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 4},
+        DATABASE_POOL_SIZE=10,
+        DATABASE_POOL_OVERFLOW=20,
+        DATABASE_POOL_RECYCLE=1800,
+        DATABASE_POOL_TIMEOUT=10)
+
+    configure_engine(app)
+
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"] == {
+        "pool_size": 4,
+        "max_overflow": 20,
+        "pool_recycle": 1800,
+        "pool_timeout": 10,
+        "pool_pre_ping": True
+    }
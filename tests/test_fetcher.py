@@ -0,0 +1,88 @@
+import time
+
+from app.fetcher import BookFetcher
+
+
+class PagedService:
+    """
+    Define a stand-in for the Google Books client serving numbered pages.
+
+    :attribute dict delays: The number of seconds to wait per start index
+    """
+    def __init__(self, delays: dict = {}):
+        self.delays = delays
+        self.kwargs = {}
+
+    def volumes(self) -> "PagedService":
+        return self
+
+    def list(self, **kwargs) -> "PagedService":
+        service: PagedService = PagedService(self.delays)
+        service.kwargs = kwargs
+        return service
+
+    def execute(self, **kwargs) -> dict:
+        start: int = self.kwargs["startIndex"]
+        time.sleep(self.delays.get(start, 0))
+
+        # Overlap pages by one volume to exercise deduplication
+        return {
+            "items": [{
+                "id": str(i)
+            } for i in range(start, start + self.kwargs["maxResults"] + 1)]
+        }
+
+
+def test_fetch_merges_pages() -> None:
+    """
+    Test that pages are merged in order and deduplicated.
+
+    :param: None
+
+    :return: None
+    """
+    fetcher: BookFetcher = BookFetcher(pages=3, page_size=2, deadline=1)
+
+    volumes, complete = fetcher.fetch(PagedService(), "query")
+
+    assert complete
+    assert [volume["id"]
+            for volume in volumes] == ["0", "1", "2", "3", "4", "5", "6"]
+
+
+def test_fetch_deadline() -> None:
+    """
+    Test that the pages which arrived before the deadline are returned.
+
+    :param: None
+
+    :return: None
+    """
+    fetcher: BookFetcher = BookFetcher(pages=2, page_size=2, deadline=0.2)
+
+    started: float = time.monotonic()
+    volumes, complete = fetcher.fetch(PagedService({2: 1}), "query")
+
+    assert time.monotonic() - started < 0.5
+    assert not complete
+    assert [volume["id"] for volume in volumes] == ["0", "1", "2"]
+
+
+def test_fetch_waits_with_sleep() -> None:
+    """
+    Test that waiting for the pages goes through the sleep function.
+
+    :param: None
+
+    :return: None
+    """
+    fetcher: BookFetcher = BookFetcher(pages=2, page_size=2, deadline=1)
+    naps: list = []
+    fetcher.sleep = lambda seconds: naps.append(seconds) or time.sleep(seconds)
+
+    volumes, complete = fetcher.fetch(PagedService({0: 0.1, 2: 0.1}), "query")
+
+    assert complete
+    assert len(volumes) == 5
+    assert len(naps) > 0
+    assert max(naps) <= fetcher.poll_interval
@@ -0,0 +1,141 @@
+import pytest
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db
+from app.models import Book, MatchScore, MessageSession, SavedBook, User
+from .conftest import AuthActions
+
+
+def populate(size: int) -> None:
+    """
+    Give the test user and a co-reader a library of the given size.
+
+    :param int size: The number of saved books per user
+
+    :return: None
+    """
+    db.session.add(
+        User(username="other", display_name="Other", password="other"))
+    db.session.add_all(
+        Book(bookname=f"Book {i}", author="Author", isbn=str(i))
+        for i in range(size))
+    db.session.flush()
+
+    for user_id in (1, 2):
+        db.session.add_all(
+            SavedBook(user_id=user_id,
+                      book_id=book_id,
+                      rating=3,
+                      review="Good",
+                      to_be_read=True) for book_id in range(1, size + 1))
+
+    db.session.add(MessageSession(user_a_id=2, user_b_id=1, room="room"))
+    db.session.commit()
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    (("/mybooks", b"Book 1"), ("/friends/profile/1", b"Book 1"),
+     ("/match/", b"Other")))
+def test_list_views_constant_queries(app: Flask, client: FlaskClient,
+                                     auth: AuthActions, queries: list,
+                                     path: str, expected: bytes) -> None:
+    """
+    Test that the list views take the same number of queries for any library
+    size.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param list queries: The recorded SQL statements
+    :param str path: The view path
+    :param bytes expected: Content the view must render
+
+    :return: None
+    """
+    auth.login()
+
+    counts: list = []
+
+    for size in (2, 20):
+        with app.app_context():
+            db.session.query(MatchScore).delete()
+            db.session.query(MessageSession).delete()
+            db.session.query(SavedBook).delete()
+            db.session.query(Book).delete()
+            db.session.query(User).filter(User.id != 1).delete()
+            db.session.commit()
+
+            populate(size)
+
+        queries.clear()
+        response = client.get(path)
+
+        assert expected in response.data
+        counts.append(len(queries))
+
+    assert counts[0] == counts[1]
+
+
+def test_profile_lists_partners(app: Flask, client: FlaskClient,
+                                auth: AuthActions) -> None:
+    """
+    Test that the profile shows the chat partners of the user.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        populate(1)
+
+    auth.login()
+
+    assert b"Other" in client.get("/friends/profile/1").data
+    assert b"Tester" in client.get("/friends/profile/2").data
+
+
+def test_library_keyset_pagination(app: Flask, client: FlaskClient,
+                                   auth: AuthActions) -> None:
+    """
+    Test the cursor pagination of the library and the reading list.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    app.config["LIBRARY_PAGE_SIZE"] = 2
+
+    with app.app_context():
+        populate(5)
+        SavedBook.query.filter_by(user_id=2,
+                                  book_id=2).update({"to_be_read": False})
+        db.session.commit()
+
+    auth.login()
+
+    first = client.get("/mybooks")
+
+    assert b"Book 1" in first.data and b"Book 2" not in first.data
+    assert b"/mybooks.json?after=2" in first.data
+
+    pages: list = []
+    url: str = "/mybooks.json?after=2"
+
+    while url is not None:
+        page: dict = client.get(url).get_json()
+        pages.append([book["bookname"] for book in page["books"]])
+        url = page["next"]
+
+    assert pages == [["Book 2", "Book 3"], ["Book 4"]]
+
+    reading: dict = client.get("/friends/profile/2/reading").get_json()
+
+    assert [book["id"] for book in reading["books"]] == [1, 3]
+    assert reading["next"] == "/friends/profile/2/reading?after=8"
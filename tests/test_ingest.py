@@ -0,0 +1,222 @@
+import json
+
+from flask import Flask
+
+from app import db
+from app.ingest import backfill_taxonomy, import_volumes, ingest_volumes, merge_duplicate_books, parse_volume
+from app.isbn import to_isbn13
+from app.models import Author, Book, Category, ImportCheckpoint, SavedBook, User
+from .conftest import make_isbn
+
+
+def volume(title: str, isbn: str, authors: list = ["Author"]) -> dict:
+    """
+    Build a Google Books volume.
+
+    :param str title: The volume title
+    :param str isbn: The volume ISBN
+    :param list authors: The volume authors
+
+    :return: dict of the volume
+    """
+    return {
+        "volumeInfo": {
+            "title": title,
+            "authors": authors,
+            "industryIdentifiers": [{
+                "type": "OTHER",
+                "identifier": "X"
+            }, {
+                "type": "ISBN_13" if len(isbn) == 13 else "ISBN_10",
+                "identifier": isbn
+            }]
+        }
+    }
+
+
+def test_parse_volume() -> None:
+    """
+    Test the field extraction of a Google Books volume.
+
+    :param: None
+
+    :return: None
+    """
+    record: dict = parse_volume(volume("Dune", "0441013597", ["A", "B"]))
+
+    assert record["bookname"] == "Dune"
+    assert record["author"] == "A, B"
+    assert record["isbn"] == "0441013597"
+    assert record["isbn13"] == "9780441013593"
+    assert parse_volume(volume("Dune", "0441013598")) is None
+    assert parse_volume({"volumeInfo": {"title": "No ISBN"}}) is None
+
+
+def test_ingest_volumes(app: Flask) -> None:
+    """
+    Test that ingestion resolves stored books and inserts the missing ones once.
+
+    :param Flask app: A test app instance
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add(
+            Book(bookname="Emma",
+                 author="Austen",
+                 isbn=make_isbn(1),
+                 isbn13=make_isbn(1)))
+        db.session.commit()
+
+        books: list = ingest_volumes([
+            volume("Dune", make_isbn(2)),
+            volume("Emma (Reprint)", make_isbn(1)),
+            volume("Dune", make_isbn(2)),
+            volume("Persuasion", make_isbn(3)),
+            {
+                "volumeInfo": {}
+            },
+        ])
+
+        assert [book.bookname
+                for book in books] == ["Dune", "Emma", "Persuasion"]
+        assert Book.query.count() == 3
+
+
+def test_import_volumes_resumes(app: Flask, tmpdir) -> None:
+    """
+    Test that the bulk import commits in chunks and resumes after a stop.
+
+    :param Flask app: A test app instance
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    dump = tmpdir.join("volumes.jsonl")
+    dump.write("\n".join([
+        json.dumps(volume("Dune", make_isbn(1))),
+        "not json",
+        json.dumps(volume("Emma", make_isbn(2))),
+        json.dumps(volume("Dune", make_isbn(1))),
+        "",
+        json.dumps(volume("Persuasion", make_isbn(3))),
+    ]) + "\n")
+
+    with app.app_context():
+        progress = import_volumes(str(dump), chunk_size=2)
+
+        assert next(progress)["inserted"] == 1
+
+        progress.close()
+
+        assert Book.query.count() == 1
+
+        result = app.test_cli_runner().invoke(
+            args=["books", "import", str(dump), "--chunk-size", "2"])
+
+        assert result.exit_code == 0
+        assert "Imported 4 lines and 2 new books" in result.output
+        assert sorted(book.bookname for book in Book.query.all()) == [
+            "Dune", "Emma", "Persuasion"
+        ]
+        assert ImportCheckpoint.query.first().lines == 6
+
+
+def test_ingest_links_taxonomy(app: Flask) -> None:
+    """
+    Test that ingestion and the backfill link books to authors and categories.
+
+    :param Flask app: A test app instance
+
+    :return: None
+    """
+    with app.app_context():
+        dune: dict = volume("Dune", make_isbn(1),
+                            ["Frank Herbert", "Brian Herbert"])
+        dune["volumeInfo"]["categories"] = ["Fiction", "Science Fiction"]
+
+        books: list = ingest_volumes([dune, volume("Emma", make_isbn(2))])
+
+        assert [author.name for author in books[0].authors
+                ] == ["Frank Herbert", "Brian Herbert"]
+        assert [genre.name for genre in books[0].genres
+                ] == ["Fiction", "Science Fiction"]
+        assert Author.query.count() == 3
+
+        db.session.add(
+            Book(bookname="Persuasion",
+                 author="Jane Austen",
+                 isbn=make_isbn(3),
+                 categories="Fiction"))
+        db.session.commit()
+
+        assert list(backfill_taxonomy(batch_size=2)) == [2, 3]
+
+        fiction: Category = Category.query.filter_by(name="Fiction").first()
+
+        assert sorted(book.bookname
+                      for book in fiction.books) == ["Dune", "Persuasion"]
+
+
+def test_to_isbn13() -> None:
+    """
+    Test the conversion of ISBNs to the canonical ISBN-13.
+
+    :param: None
+
+    :return: None
+    """
+    assert to_isbn13("0-441-01359-7") == "9780441013593"
+    assert to_isbn13("080442957X") == "9780804429573"
+    assert to_isbn13("978 0 441 01359 3") == "9780441013593"
+    assert to_isbn13("9780441013596") is None
+    assert to_isbn13("1") is None
+    assert to_isbn13(None) is None
+
+
+def test_merge_duplicate_books(app: Flask) -> None:
+    """
+    Test that books sharing an ISBN-13 are merged into the oldest one.
+
+    :param Flask app: A test app instance
+
+    :return: None
+    """
+    with app.app_context():
+        reader: User = User.query.first()
+
+        db.session.add_all([
+            Book(bookname="Dune",
+                 author="Frank Herbert",
+                 isbn="0441013597",
+                 average_rating=4,
+                 total_ratings=1),
+            Book(bookname="Dune (Ace)",
+                 author="Frank Herbert",
+                 isbn="9780441013593",
+                 average_rating=2,
+                 total_ratings=1),
+            Book(bookname="Unknown", author="Nobody", isbn="not an isbn"),
+        ])
+        db.session.flush()
+        db.session.add(
+            SavedBook(user_id=reader.id, book_id=2, rating=2, review="Fine"))
+        db.session.commit()
+
+        assert list(merge_duplicate_books(batch_size=2)) == [{
+            "scanned": 2,
+            "merged": 1,
+            "invalid": 0
+        }, {
+            "scanned": 3,
+            "merged": 1,
+            "invalid": 1
+        }]
+
+        dune: Book = Book.query.get(1)
+
+        assert Book.query.count() == 2
+        assert dune.isbn13 == "9780441013593"
+        assert dune.average_rating == 3
+        assert SavedBook.query.first().book_id == 1
+        assert ingest_volumes([volume("Dune", "9780441013593")]) == [dune]
@@ -1,8 +1,10 @@
 import os
+import pytest
 
 from flask.testing import FlaskClient
 
 from app import create_app
+from app.google_books import get_service
 
 
 def test_config():
@@ -47,3 +49,26 @@ def test_landing_page(client: FlaskClient):
     assert b"<h1 class=\"display-4 font-italic\">Read and Chill</h1>" in response.data
     assert b"Sign in" in response.data
     assert b"Sign up" in response.data
+
+
+def test_lazy_google_books_client(monkeypatch):
+    """
+    Test that the Google Books client is built on first use.
+    Assert whether a missing key only fails when the client is needed.
+
+    :param MonkeyPatch monkeypatch: A way to extend or modify the application locally.
+
+    :return: None
+    """
+    monkeypatch.delenv("GOOGLE_BOOKS_API_KEY", raising=False)
+    app = create_app({"TESTING": True})
+
+    with app.app_context():
+        with pytest.raises(ValueError):
+            get_service()
+
+        app.config["GOOGLE_BOOKS_API_KEY"] = "key"
+        service = get_service()
+
+        assert get_service() is service
+        assert "key=key" in service.volumes().list(q="dune").uri
@@ -0,0 +1,166 @@
+import pytest
+import threading
+
+from datetime import datetime
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db, reader_index
+from app.recommendations import find_candidates, stale_scores
+from app.worker import BackgroundWorker
+from app.models import Book, MatchScore, SavedBook, User
+from .conftest import AuthActions
+
+
+def populate() -> None:
+    """
+    Give the test user a reading list of four books and three co-readers
+    sharing one, three and two of them.
+
+    :param: None
+
+    :return: None
+    """
+    db.session.add_all(
+        User(username=f"user{i}", display_name=f"User {i}", password="user")
+        for i in range(2, 5))
+    db.session.add_all(
+        Book(bookname=f"Book {i}", author="Author", isbn=str(i))
+        for i in range(5))
+    db.session.flush()
+
+    shelves: dict = {1: (1, 2, 3, 4), 2: (1, ), 3: (2, 3, 4), 4: (1, 2)}
+
+    for user_id, book_ids in shelves.items():
+        db.session.add_all(
+            SavedBook(
+                user_id=user_id, book_id=book_id, to_be_read=user_id == 1)
+            for book_id in book_ids)
+
+    db.session.commit()
+
+
+@pytest.mark.parametrize("indexed", (False, True))
+def test_candidates_ranked_by_overlap(app: Flask, client: FlaskClient,
+                                      auth: AuthActions,
+                                      indexed: bool) -> None:
+    """
+    Test that candidates are ranked by the number of shared books, with the
+    aggregate query and with the reader index.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param bool indexed: Whether to use the reader index
+
+    :return: None
+    """
+    reader_index.enabled = indexed
+
+    with app.app_context():
+        populate()
+
+        assert find_candidates(1, [1, 2, 3, 4], 10) == [3, 4, 2]
+        assert find_candidates(1, [4, 3, 2, 1], 2) == [3, 4]
+
+    auth.login("user2", "user")
+    client.post("/save", data={"book_id": 2})
+
+    with app.app_context():
+        assert find_candidates(1, [1, 2, 3, 4], 10) == [3, 2, 4]
+
+    if indexed:
+        assert len(reader_index) == 11
+
+
+def test_scores_follow_saved_book_changes(app: Flask, client: FlaskClient,
+                                          auth: AuthActions) -> None:
+    """
+    Test that changing saved books rescores the affected pairs and that the
+    rebuild command repairs stale scores.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        populate()
+
+        runner = app.test_cli_runner()
+
+        assert "of 1 users" in runner.invoke(
+            args=["match", "rebuild-scores"]).output
+
+    def scores() -> dict:
+        with app.app_context():
+            return {(row.user_id, row.candidate_id): row.score
+                    for row in MatchScore.query}
+
+    assert scores() == {(1, 2): 4.0, (1, 3): 4.0, (1, 4): 4.0}
+
+    auth.login()
+    client.get("/book/4/remove/reading")
+
+    assert scores() == {(1, 2): 3.0, (1, 3): 3.0, (1, 4): 3.0}
+
+    client.get("/auth/logout")
+    auth.login("user3", "user")
+    client.post("/book/3/review", data={"rating": "4", "review": "Good"})
+    client.get("/book/3/add/reading")
+
+    assert scores()[(3, 1)] == 1.0
+
+    with app.app_context():
+        assert stale_scores() == (0, 0.0)
+
+        MatchScore.query.update({"updated": datetime(2000, 1, 1)})
+        db.session.commit()
+
+        result = runner.invoke(args=["match", "rebuild-scores", "--verify"])
+
+        assert result.exit_code == 1
+        assert "Found 4 out of date scores" in result.output
+
+        runner.invoke(args=["match", "rebuild-scores"])
+
+        assert stale_scores() == (0, 0.0)
+
+
+def test_worker_coalesces_jobs(app: Flask) -> None:
+    """
+    Test that the background worker applies queued jobs in deduplicated
+    batches.
+
+    :param Flask app: A test app instance
+
+    :return: None
+    """
+    batches: list = []
+    started: threading.Event = threading.Event()
+    release: threading.Event = threading.Event()
+
+    def handle(jobs: list) -> None:
+        batches.append(jobs)
+        started.set()
+        release.wait(5)
+
+    worker: BackgroundWorker = BackgroundWorker("test_worker")
+    worker.init_app(app, handle, "MATCH_WORKER")
+    worker.synchronous = False
+
+    # Queue the rest while the first batch holds the worker
+    worker.submit(0, 1)
+    started.wait(5)
+
+    for user_id in (1, 2, 1, 3):
+        worker.submit(user_id, 1)
+
+    release.set()
+    worker.join()
+
+    assert batches == [[(0, 1)], [(1, 1), (2, 1), (3, 1)]]
+    assert worker.stats()["processed"] == 5
+    assert worker.stats()["pending"] == 0
@@ -0,0 +1,120 @@
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from flask import Flask
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import text
+
+from app import create_app, db
+from app.schema import check_schema
+
+
+def file_app(tmpdir) -> Flask:
+    """
+    Create a test app instance on an empty SQLite file.
+
+    :param tmpdir: A temporary directory
+
+    :return: Flask
+    """
+    return create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmpdir.join('app.sqlite')}",
+        "SEARCH_CACHE_PATH": None
+    })
+
+
+def test_migrations_match_models(tmpdir) -> None:
+    """
+    Test that the migrations build the schema of the models and tear it down.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app: Flask = file_app(tmpdir)
+
+    assert not check_schema(app)
+
+    with app.app_context():
+        upgrade()
+
+        with db.engine.connect() as connection:
+            context: MigrationContext = MigrationContext.configure(
+                connection,
+                opts={
+                    "include_object":
+                    lambda object, name, type_, *args: not (
+                        type_ == "table" and name.startswith("book_fts"))
+                })
+
+            assert compare_metadata(context, db.metadata) == []
+
+    assert check_schema(app)
+
+    with app.app_context():
+        downgrade(revision="base")
+
+        assert db.engine.table_names() == ["alembic_version"]
+
+
+def test_schema_checked_on_first_request(tmpdir, caplog) -> None:
+    """
+    Test that the schema is checked on the first request rather than when
+    the app is created.
+
+    :param tmpdir: A temporary directory
+    :param caplog: A pytest log capture fixture
+
+    :return: None
+    """
+    app: Flask = file_app(tmpdir)
+
+    assert not tmpdir.join("app.sqlite").exists()
+
+    app.test_client().get("/")
+
+    assert "flask db upgrade" in caplog.text
+
+
+def test_migrations_upgrade_baseline_data(tmpdir) -> None:
+    """
+    Test that a database created by the baseline schema upgrades with its
+    data, dropping duplicate saved books.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app: Flask = file_app(tmpdir)
+
+    with app.app_context():
+        upgrade(revision="3f1c9a7d2b10")
+
+        db.session.execute(
+            text("INSERT INTO user (id, username, display_name, password) "
+                 "VALUES (1, 'a', 'A', 'a'), (2, 'b', 'B', 'b')"))
+        db.session.execute(
+            text("INSERT INTO book (id, bookname, author, isbn, "
+                 "average_rating, total_ratings) "
+                 "VALUES (1, 'Dune', 'Frank Herbert', '0441013597', 0, 0)"))
+        db.session.execute(
+            text("INSERT INTO saved_book (book_id, user_id, to_be_read) "
+                 "VALUES (1, 1, 0), (1, 1, 1), (1, 2, 0)"))
+        db.session.execute(
+            text("INSERT INTO message_session (user_a_id, user_b_id, room, "
+                 "count) VALUES (1, 2, 'room', 0)"))
+        db.session.commit()
+
+        upgrade()
+
+        db.session.execute(
+            text("INSERT INTO message_session (user_a_id, user_b_id, room, "
+                 "count) VALUES (1, 1, 'other', 0)"))
+
+        assert db.session.execute(
+            text("SELECT id FROM saved_book ORDER BY id")).fetchall() == [
+                (1, ), (3, )
+            ]
+        assert db.session.execute(
+            text("SELECT bookname FROM book WHERE version = 0")).scalar(
+            ) == "Dune"
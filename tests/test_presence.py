@@ -0,0 +1,114 @@
+import re
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import presence_registry, socketio
+from app.presence import Presence
+from .conftest import AuthActions
+from .test_match import populate
+
+
+def test_presence_expires(monkeypatch) -> None:
+    """
+    Test that users stay online while a connection sends heartbeats.
+
+    :param monkeypatch: A pytest monkeypatch fixture
+
+    :return: None
+    """
+    now: list = [100.0]
+    monkeypatch.setattr("app.presence.time.monotonic", lambda: now[0])
+
+    registry: Presence = Presence(ttl=10)
+    registry.connect("a", 1)
+    registry.connect("b", 1)
+    registry.connect("c", 2)
+    registry.disconnect("a")
+
+    assert registry.online([1, 2, 3]) == {1, 2}
+
+    now[0] += 8
+    registry.heartbeat("b")
+    now[0] += 8
+
+    assert registry.online([1, 2, 3]) == {1}
+
+    registry.expire()
+
+    assert len(registry) == 1
+
+    # A connection that missed heartbeats comes back online with the next
+    registry.heartbeat("c")
+
+    assert registry.online([1, 2, 3]) == {1, 2}
+
+    registry.disconnect("b")
+
+    assert registry.online([1, 2, 3]) == {2}
+
+
+def test_presence_from_socket(app: Flask, client: FlaskClient,
+                              auth: AuthActions) -> None:
+    """
+    Test that presence follows the Socket.IO connections of signed in users.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    anonymous = socketio.test_client(app,
+                                     namespace="/presence",
+                                     flask_test_client=client)
+
+    assert not anonymous.is_connected("/presence")
+
+    auth.login()
+
+    socket = socketio.test_client(app,
+                                  namespace="/presence",
+                                  flask_test_client=client)
+    socket.emit("heartbeat", namespace="/presence")
+
+    assert presence_registry.online([1, 2]) == {1}
+
+    socket.disconnect(namespace="/presence")
+
+    assert presence_registry.online([1, 2]) == set()
+
+
+def test_match_prefers_online_users(app: Flask, client: FlaskClient,
+                                    auth: AuthActions, queries: list) -> None:
+    """
+    Test that matches online right now are listed first without extra
+    queries.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param list queries: The executed SQL statements
+
+    :return: None
+    """
+    with app.app_context():
+        populate()
+
+    auth.login()
+
+    def names() -> list:
+        return re.findall(r"<h5>(User \d)", client.get("/match/").data.decode())
+
+    offline: list = names()
+    del queries[:]
+    names()
+    count: int = len(queries)
+
+    presence_registry.connect("sid", int(offline[-1][-1]))
+    del queries[:]
+    online: list = names()
+
+    assert online == [offline[-1], *offline[:-1]]
+    assert len(queries) == count
+    assert b"Online" in client.get("/match/").data
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+import socketio
+
+from app.pubsub import OutboxManager, SQLiteManager, client_manager
+
+
+def test_client_manager_by_scheme(tmpdir) -> None:
+    """
+    Test that message queue URLs select their client manager.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    assert type(client_manager(None)) is OutboxManager
+    assert isinstance(
+        client_manager(f"sqlite:///{tmpdir.join('queue.sqlite')}"),
+        SQLiteManager)
+
+
+def test_broadcast_across_processes(tmpdir) -> None:
+    """
+    Test that an event emitted to a room by another process reaches the
+    clients of the room on this server.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    queue: str = f"sqlite:///{tmpdir.join('queue.sqlite')}"
+    server: socketio.Server = socketio.Server(
+        client_manager=SQLiteManager(queue, channel="chat"))
+    sent: list = []
+
+    server._send_packet = lambda sid, packet: sent.append((sid, packet.data))
+    server.manager.initialize()
+    server.manager.connect("reader", "/match/connect")
+    server.manager.connect("other", "/match/connect")
+    server.manager.enter_room("reader", "/match/connect", "room")
+
+    # Emit as another worker process would
+    subprocess.run([
+        sys.executable, "-c", "import sys\n"
+        "from app.pubsub import client_manager\n"
+        "client_manager(sys.argv[1], 'chat', write_only=True).emit("
+        "'response', {'data': 'B: hello'}, namespace='/match/connect', "
+        "room='room')", queue
+    ],
+                   check=True,
+                   cwd=os.path.dirname(os.path.dirname(__file__)))
+
+    deadline: float = time.monotonic() + 5
+
+    while len(sent) == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert sent == [("reader", ["response", {"data": "B: hello"}])]
@@ -0,0 +1,84 @@
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db
+from app.models import Book, BookStats, SavedBook, User
+from app.ratings import rate, star
+from .conftest import AuthActions
+
+
+def test_review_applies_rating_changes(app: Flask, client: FlaskClient,
+                                       auth: AuthActions) -> None:
+    """
+    Test that re-reviewing a book moves its rating instead of adding a vote.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add(Book(bookname="Dune", author="Herbert", isbn="1"))
+        db.session.add(SavedBook(user_id=1, book_id=1))
+        db.session.commit()
+
+    auth.login()
+
+    for rating in ("4", "2"):
+        client.post("/book/1/review",
+                    data={
+                        "rating": rating,
+                        "review": "Sand"
+                    })
+
+    with app.app_context():
+        book: Book = Book.query.get(1)
+        stats: BookStats = BookStats.query.get(1)
+
+        assert (book.average_rating, book.total_ratings) == (2, 1)
+        assert stats.histogram == [(1, 0), (2, 1), (3, 0), (4, 0), (5, 0)]
+
+    assert b"Average Rating: 2.0 / 5" in client.get("/book/1").data
+
+
+def test_rebuild_stats(app: Flask) -> None:
+    """
+    Test that the stats command finds and fixes out of date stats.
+
+    :param Flask app: A test app instance
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add(
+            User(username="other", display_name="Other", password="other"))
+        db.session.add(Book(bookname="Dune", author="Herbert", isbn="1"))
+        db.session.add_all(
+            [SavedBook(user_id=1, book_id=1),
+             SavedBook(user_id=2, book_id=1)])
+        db.session.commit()
+
+        for saved_book, rating in zip(SavedBook.query.all(), (5, 1.2)):
+            rate(saved_book, rating, None)
+
+        db.session.commit()
+
+        runner = app.test_cli_runner()
+
+        assert runner.invoke(
+            args=["books", "rebuild-stats", "--verify"]).exit_code == 0
+
+        BookStats.query.get(1).stars_5 = 0
+        db.session.commit()
+
+        assert "Book 1 has" in runner.invoke(
+            args=["books", "rebuild-stats", "--verify"]).output
+        assert "of 1 books" in runner.invoke(
+            args=["books", "rebuild-stats"]).output
+
+        db.session.expire_all()
+
+        assert BookStats.query.get(1).histogram[4] == (5, 1)
+        assert Book.query.get(1).average_rating == 3.1
+        assert [star(rating) for rating in (0, 1.5, 4.49, 5)] == [1, 2, 4, 5]
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from math import acos, sqrt
+
+from app.scoring import MISSING_ANGLE, angles, score
+
+
+def theta_difference(vec_a: tuple, vec_b: tuple) -> float:
+    """
+    Calculate the theta difference between two vectors pair by pair.
+
+    :param tuple vec_a: Vector A
+    :param tuple vec_b: Vector B
+
+    :return: float of the angle between the vectors
+    """
+    dot_product: float = sum(a * b for a, b in zip(vec_a, vec_b))
+    cosine: float = dot_product / (sqrt(sum(a * a for a in vec_a)) *
+                                   sqrt(sum(b * b for b in vec_b)))
+
+    return acos(max(-1.0, min(1.0, cosine)))
+
+
+def test_angles_match_pairwise_loop() -> None:
+    """
+    Test that the vectorized angles equal the pairwise theta differences.
+
+    :param: None
+
+    :return: None
+    """
+    generator: np.random.Generator = np.random.default_rng(7)
+
+    user: np.ndarray = generator.uniform(0.1, 2, (6, 2))
+    user[2] = np.nan
+    candidates: np.ndarray = generator.uniform(0.1, 2, (6, 9, 2))
+    candidates[generator.random((6, 9)) < 0.3] = np.nan
+    candidates[0, 0] = user[0]
+
+    expected: list = [[
+        MISSING_ANGLE if np.isnan(user[book]).any()
+        or np.isnan(candidates[book, candidate]).any() else theta_difference(
+            tuple(user[book]), tuple(candidates[book, candidate]))
+        for candidate in range(9)
+    ] for book in range(6)]
+
+    assert angles(user, candidates) == pytest.approx(np.array(expected))
+    assert score(user, candidates) == pytest.approx(
+        np.array([sum(column) for column in zip(*expected)]))
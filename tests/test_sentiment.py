@@ -0,0 +1,90 @@
+import pytest
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db, sentiment
+from app.models import Book, SavedBook, User
+from .conftest import AuthActions
+
+
+def test_review_stores_scores(app: Flask, client: FlaskClient,
+                              auth: AuthActions) -> None:
+    """
+    Test that reviewing a book stores its rating component and sentiment.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add(Book(bookname="Dune", author="Herbert", isbn="1"))
+        db.session.add(SavedBook(user_id=1, book_id=1))
+        db.session.commit()
+
+    auth.login()
+    client.post("/book/1/review",
+                data={
+                    "rating": "4",
+                    "review": "A wonderful, great book"
+                })
+
+    with app.app_context():
+        saved_book: SavedBook = SavedBook.query.get(1)
+
+        assert saved_book.rating_component == pytest.approx(0.8)
+        assert saved_book.sentiment == pytest.approx(
+            sentiment.polarity("A wonderful, great book"))
+
+
+def test_match_reads_stored_scores(app: Flask, client: FlaskClient,
+                                   auth: AuthActions,
+                                   monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that the backfill scores existing reviews and that matching only
+    reads the stored scores.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param MonkeyPatch monkeypatch: The pytest monkeypatch fixture
+
+    :return: None
+    """
+    with app.app_context():
+        db.session.add(
+            User(username="other", display_name="Other", password="other"))
+        db.session.add_all(
+            Book(bookname=f"Book {i}", author="Author", isbn=str(i))
+            for i in range(3))
+        db.session.flush()
+
+        db.session.add_all(
+            SavedBook(user_id=user_id,
+                      book_id=book_id,
+                      rating=3,
+                      review="Good" if book_id != 3 else None,
+                      to_be_read=True) for user_id in (1, 2)
+            for book_id in range(1, 4))
+        db.session.commit()
+
+        output: str = app.test_cli_runner().invoke(args=[
+            "books", "score-reviews", "--batch-size", "3", "--workers", "2"
+        ]).output
+
+        assert "Scored 4 reviews in total." in output
+        assert [(saved_book.rating_component, saved_book.sentiment)
+                for saved_book in SavedBook.query.filter_by(user_id=2)
+                ] == [(pytest.approx(0.6), pytest.approx(0.7)),
+                      (pytest.approx(0.6), pytest.approx(0.7)), (None, None)]
+
+    def analyze(review: str) -> float:
+        raise AssertionError("Reviews are analyzed while matching")
+
+    monkeypatch.setattr(sentiment, "polarity", analyze)
+
+    auth.login()
+
+    assert b"Other" in client.get("/match/").data
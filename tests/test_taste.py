@@ -0,0 +1,108 @@
+import numpy as np
+
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app import db, taste_index
+from app.models import Book, Category, SavedBook, User
+from app.taste import TasteIndex
+from .conftest import AuthActions
+
+
+def test_index_recall_and_persistence(tmpdir) -> None:
+    """
+    Test that the approximate neighbours mostly match the exact ones, survive
+    a save and load, and follow updated vectors.
+
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    generator: np.random.Generator = np.random.default_rng(3)
+    centres: np.ndarray = generator.standard_normal((40, 16))
+    vectors: np.ndarray = centres[generator.integers(
+        0, 40, 2000)] + 0.3 * generator.standard_normal((2000, 16))
+
+    index: TasteIndex = TasteIndex(dimensions=16, tables=6, bits=8)
+    index.build(range(2000), vectors)
+
+    found: int = 0
+
+    for user_id in range(0, 2000, 40):
+        approximate: set = {pair[0] for pair in index.similar(user_id, 10)}
+        exact: set = {
+            pair[0]
+            for pair in index.exact(vectors[user_id], 10, (user_id, ))
+        }
+        found += len(approximate & exact)
+
+    assert found / 500 >= 0.9
+
+    path: str = str(tmpdir.join("taste.npz"))
+    index.save(path)
+
+    loaded: TasteIndex = TasteIndex()
+    loaded.load(path)
+
+    assert (loaded.dimensions, len(loaded)) == (16, 2000)
+    assert [pair[0] for pair in loaded.similar(7, 10)
+            ] == [pair[0] for pair in index.similar(7, 10)]
+
+    loaded.update(7, vectors[8])
+    loaded.update(2000, vectors[8])
+
+    assert loaded.similar(8, 2)[0][1] > 0.999
+    assert {pair[0] for pair in loaded.similar(8, 2)} == {7, 2000}
+
+
+def test_match_suggests_similar_taste(app: Flask, client: FlaskClient,
+                                      auth: AuthActions, tmpdir) -> None:
+    """
+    Test that matching suggests users with a similar taste who share no book.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param tmpdir: A temporary directory
+
+    :return: None
+    """
+    app.config["TASTE_INDEX_PATH"] = str(tmpdir.join("taste.npz"))
+
+    with app.app_context():
+        db.session.add_all([
+            User(username="other", display_name="Other", password="other"),
+            User(username="third", display_name="Third", password="third")
+        ])
+        fantasy: Category = Category(name="Fantasy")
+        history: Category = Category(name="History")
+
+        db.session.add_all([
+            Book(bookname="Dune", author="Herbert", isbn="1",
+                 genres=[fantasy]),
+            Book(bookname="Earthsea",
+                 author="Le Guin",
+                 isbn="2",
+                 genres=[fantasy]),
+            Book(bookname="SPQR", author="Beard", isbn="3", genres=[history])
+        ])
+        db.session.flush()
+
+        db.session.add_all(
+            SavedBook(user_id=user_id, book_id=user_id, to_be_read=True)
+            for user_id in (1, 2, 3))
+        db.session.commit()
+
+        output: str = app.test_cli_runner().invoke(
+            args=["match", "build-taste-index"]).output
+
+        assert "taste index of 3 users" in output
+        assert tmpdir.join("taste.npz").exists()
+
+    assert taste_index.similar(1, 1)[0][0] == 2
+
+    auth.login()
+    response = client.get("/match/")
+
+    assert b"Similar Taste" in response.data
+    assert b"Other" in response.data
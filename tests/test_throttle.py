@@ -0,0 +1,145 @@
+import logging
+import queue
+
+from flask import Flask
+from flask.testing import FlaskClient
+from types import SimpleNamespace
+
+from app import chat_throttle, db, message_buffer, socketio
+from app.models import User
+from app.throttle import ChatThrottle, TokenBucket
+from .conftest import AuthActions
+
+
+class FakeServer:
+    """
+    Define a Socket.IO server recording emitted events.
+
+    :attribute SimpleNamespace eio: The engine.io server with its sockets
+    :attribute list sent: The emitted (sid, event, data) tuples
+    """
+    def __init__(self, *sids: str) -> None:
+        self.eio: SimpleNamespace = SimpleNamespace(sockets={
+            sid: SimpleNamespace(queue=queue.Queue())
+            for sid in sids
+        })
+        self.sent: list = []
+
+    def start_background_task(self, target, *args) -> object:
+        return object()
+
+    def sleep(self, seconds: float) -> None:
+        pass
+
+    def _emit_internal(self, sid, event, data, namespace, id) -> None:
+        self.sent.append((sid, event, data))
+
+
+def test_token_bucket(monkeypatch) -> None:
+    """
+    Test that a token bucket allows a burst and then refills at its rate.
+
+    :param monkeypatch: A pytest monkeypatch fixture
+
+    :return: None
+    """
+    now: list = [100.0]
+    monkeypatch.setattr("app.throttle.time.monotonic", lambda: now[0])
+
+    bucket: TokenBucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+    now[0] += 1
+
+    assert [bucket.take() for _ in range(3)] == [True, True, False]
+
+
+def test_outbox_holds_events_of_slow_clients(caplog) -> None:
+    """
+    Test that events for a client that is behind are held in a bounded
+    outbox and flushed as one batch once the client catches up.
+
+    :param caplog: A pytest log capture fixture
+
+    :return: None
+    """
+    caplog.set_level(logging.INFO, logger="app.throttle")
+    throttle: ChatThrottle = ChatThrottle(outbox_size=2, backlog=1)
+    server: FakeServer = FakeServer("slow", "fast")
+    server.eio.sockets["slow"].queue.put("packet")
+
+    assert not throttle.hold(server, "fast", "/chat", "response", 0)
+    assert all(
+        throttle.hold(server, "slow", "/chat", "response", number)
+        for number in range(3))
+    assert throttle.stats()["dropped"] == 1
+    assert throttle.stats()["behind"] == 1
+
+    server.eio.sockets["slow"].queue.get()
+    throttle._flush(server)
+
+    assert server.sent == [("slow", "batch", [["response", 1], ["response",
+                                                                2]])]
+    assert throttle.stats()["behind"] == 0
+    assert "dropped 1 events, 1 in total" in caplog.text
+
+
+def test_chat_messages_limited(app: Flask, client: FlaskClient,
+                               auth: AuthActions, monkeypatch) -> None:
+    """
+    Test that chat messages over the length or rate limits are refused.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param AuthActions auth: An AuthActions instance
+    :param monkeypatch: A pytest monkeypatch fixture
+
+    :return: None
+    """
+    submitted: list = []
+    monkeypatch.setattr(message_buffer, "submit",
+                        lambda *job: submitted.append(job))
+    monkeypatch.setattr(chat_throttle, "rate", 0)
+    monkeypatch.setattr(chat_throttle, "burst", 3)
+    monkeypatch.setattr(chat_throttle, "max_length", 10)
+
+    with app.app_context():
+        db.session.add(
+            User(username="other", display_name="Other", password="other"))
+        db.session.commit()
+
+    auth.login()
+    client.post("/match/connect", data={"other_user_id": 2})
+
+    socket = socketio.test_client(app,
+                                  namespace="/match/connect",
+                                  flask_test_client=client)
+    socket.emit("join", {"other_user_id": 2}, namespace="/match/connect")
+    socket.emit("request", {
+        "other_user_id": 2,
+        "data": "x" * 11
+    },
+                namespace="/match/connect")
+
+    for number in range(5):
+        socket.emit("request", {
+            "other_user_id": 2,
+            "data": str(number)
+        },
+                    namespace="/match/connect")
+
+    assert [job[2] for job in submitted] == ["0", "1", "2"]
+    stats: dict = client.get("/match/chat/stats").get_json()
+
+    assert stats["accepted"] == 3
+    assert stats["oversized"] == 1
+    assert stats["throttled"] == 2
+
+    statuses: list = [
+        packet["args"][0]["data"]
+        for packet in socket.get_received("/match/connect")
+        if packet["name"] == "status"
+    ]
+
+    assert "You are sending messages too quickly." in statuses
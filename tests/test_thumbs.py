@@ -0,0 +1,134 @@
+import io
+import os
+import pytest
+
+from flask import Flask, Response
+from PIL import Image
+from flask.testing import FlaskClient
+
+from app import db, thumbs
+from app.models import Book
+
+PNG: bytes = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def test_thumbnail_proxy(app: Flask, client: FlaskClient, tmpdir,
+                         monkeypatch) -> None:
+    """
+    Test that thumbnails are fetched once, cached by digest and revalidated.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param tmpdir: A temporary directory
+    :param MonkeyPatch monkeypatch: A way to modify the application locally
+
+    :return: None
+    """
+    fetched: list = []
+
+    def fetch_image(url: str) -> bytes:
+        fetched.append(url)
+        return PNG
+
+    monkeypatch.setattr(thumbs, "fetch_image", fetch_image)
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmpdir)
+
+    with app.app_context():
+        db.session.add_all([
+            Book(bookname="Dune",
+                 author="Frank Herbert",
+                 isbn="1",
+                 thumbnail="http://books.google.com/dune"),
+            Book(bookname="Emma", author="Jane Austen", isbn="2")
+        ])
+        db.session.commit()
+
+    response: Response = client.get("/thumbs/1")
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.data == PNG
+    assert response.cache_control.public
+    assert response.cache_control.max_age == app.config["THUMBNAIL_MAX_AGE"]
+
+    etag, _ = response.get_etag()
+
+    assert os.path.exists(os.path.join(str(tmpdir), etag[:2], etag))
+
+    revalidated: Response = client.get("/thumbs/1",
+                                       headers={"If-None-Match": f'"{etag}"'})
+
+    assert revalidated.status_code == 304
+    assert client.get("/thumbs/1").data == PNG
+    assert fetched == ["http://books.google.com/dune"]
+    assert client.get("/thumbs/2").status_code == 404
+
+
+def test_thumbnail_fetch_limits(app: Flask, client: FlaskClient, tmpdir,
+                                monkeypatch) -> None:
+    """
+    Test that only HTTP images within the size limit are fetched and cached.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param tmpdir: A temporary directory
+    :param MonkeyPatch monkeypatch: A way to modify the application locally
+
+    :return: None
+    """
+    bodies: dict = {
+        "http://books.google.com/large": PNG * 100,
+        "http://books.google.com/page": b"<html></html>"
+    }
+    monkeypatch.setattr(thumbs.opener, "open",
+                        lambda url, timeout: io.BytesIO(bodies[url]))
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmpdir)
+    app.config["THUMBNAIL_MAX_BYTES"] = len(PNG) * 10
+
+    with app.app_context():
+        db.session.add_all([
+            Book(bookname=url, author="Author", isbn=url, thumbnail=url)
+            for url in ("file:///etc/passwd", *bodies)
+        ])
+        db.session.commit()
+
+        with pytest.raises(ValueError):
+            thumbs.fetch_image("file:///etc/passwd")
+
+    assert [
+        client.get(f"/thumbs/{book_id}").status_code for book_id in (1, 2, 3)
+    ] == [404, 404, 404]
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_small_thumbnail(app: Flask, client: FlaskClient, tmpdir,
+                         monkeypatch) -> None:
+    """
+    Test that size=small serves a downscaled JPEG copy.
+
+    :param Flask app: A test app instance
+    :param FlaskClient client: A test client for the given app instance
+    :param tmpdir: A temporary directory
+    :param MonkeyPatch monkeypatch: A way to modify the application locally
+
+    :return: None
+    """
+    output: io.BytesIO = io.BytesIO()
+    Image.new("RGB", (400, 600)).save(output, "PNG")
+
+    monkeypatch.setattr(thumbs, "fetch_image", lambda url: output.getvalue())
+    app.config["THUMBNAIL_CACHE_DIR"] = str(tmpdir)
+
+    with app.app_context():
+        db.session.add(
+            Book(bookname="Dune",
+                 author="Frank Herbert",
+                 isbn="1",
+                 thumbnail="http://books.google.com/dune"))
+        db.session.commit()
+
+    response: Response = client.get("/thumbs/1?size=small")
+
+    assert response.mimetype == "image/jpeg"
+    assert response.get_etag()[0].endswith("-small")
+    assert Image.open(io.BytesIO(response.data)).size == (128, 192)